@@ -39,3 +39,10 @@ class AsyncBackgroundTasks():
 
 	def have_task(self, name):
 		return name in self._tasks
+
+	def cancel_all(self):
+		for task in list(self._tasks.values()):
+			task.cancel()
+
+	def __len__(self):
+		return len(self._tasks)
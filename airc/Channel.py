@@ -19,17 +19,23 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
-import contextlib
 from airc.EventObject import EventObject
-from airc.Enums import StatEvent
+from airc.Enums import StatEvent, MemberMode
 
 class Channel(EventObject):
-	def __init__(self, channel_name: str):
+	"""The members of a channel are kept in the client's MembershipStore;
+	the channel only provides a view onto them. The users property is an
+	immutable snapshot that is rebuilt only after the membership changed."""
+
+	def __init__(self, channel_name: str, membership: "MembershipStore"):
 		super().__init__()
 		self._channel_name = channel_name
+		self._membership = membership
 		self._joined = False
-		self._users = set()
 		self._stats = { }
+		self._snapshot = frozenset()
+		self._snapshot_version = 0
+		self._membership.add_channel(channel_name)
 
 	@property
 	def name(self):
@@ -41,11 +47,33 @@ class Channel(EventObject):
 
 	@property
 	def user_count(self):
-		return len(self._users)
+		return self._membership.member_count(self._channel_name)
+
+	@property
+	def version(self):
+		return self._membership.version(self._channel_name)
 
 	@property
 	def users(self):
-		return iter(self._users)
+		version = self.version
+		if version != self._snapshot_version:
+			self._snapshot = frozenset(self._membership.members(self._channel_name))
+			self._snapshot_version = version
+		return self._snapshot
+
+	def users_added_since(self, version: int):
+		"""Returns a tuple of the current version and the set of users that
+		were added after the given version. Start with version 0 to get all
+		users."""
+		return (self.version, self._membership.members_added_since(self._channel_name, version))
+
+	@property
+	def ops(self):
+		return self._membership.members_with(self._channel_name, MemberMode.Op | MemberMode.Admin | MemberMode.Owner)
+
+	@property
+	def voiced(self):
+		return self._membership.members_with(self._channel_name, MemberMode.Voice)
 
 	@property
 	def stats(self):
@@ -58,17 +86,26 @@ class Channel(EventObject):
 		if change:
 			self.signal()
 
-	def add_user(self, nickname: str):
-		self._users.add(nickname)
+	def has_user(self, nickname: str):
+		return self._membership.is_member(self._channel_name, nickname)
+
+	def get_user_modes(self, nickname: str):
+		return self._membership.get_modes(self._channel_name, nickname)
+
+	def add_user(self, nickname: str, modes: int = 0):
+		self._membership.add(self._channel_name, nickname, modes)
+
+	def replace_users(self, members: list):
+		self._membership.replace_members(self._channel_name, members)
+
+	def change_user_modes(self, nickname: str, set_modes: int = 0, clear_modes: int = 0):
+		self._membership.change_modes(self._channel_name, nickname, set_modes, clear_modes)
 
 	def remove_user(self, nickname: str):
-		with contextlib.suppress(KeyError):
-			self._users.remove(nickname)
+		self._membership.remove(self._channel_name, nickname)
 
-	def rename_user(self, old_nickname: str, new_nickname: str):
-		if old_nickname in self._users:
-			self._users.remove(old_nickname)
-			self._users.add(new_nickname)
+	def clear_users(self):
+		self._membership.clear_channel(self._channel_name)
 
 	def record_stat(self, event: StatEvent):
 		self._stats[event] = self._stats.get(event, 0) + 1
@@ -0,0 +1,100 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import socket
+import asyncio
+
+class DNSCache():
+	"""Caches the addresses of server hostnames so that many networks (or
+	many reconnects) do not each occupy the resolver thread pool with the
+	same lookup. getaddrinfo() does not report a TTL, entries are therefore
+	kept for a fixed time; failed lookups are remembered for a shorter time.
+	Concurrent lookups of the same name are coalesced into one."""
+
+	def __init__(self, ttl_secs: float = 300, negative_ttl_secs: float = 10):
+		self._ttl_secs = ttl_secs
+		self._negative_ttl_secs = negative_ttl_secs
+		self._entries = { }
+		self._lookups = { }
+		self._hits = 0
+		self._misses = 0
+
+	async def resolve(self, hostname: str, port: int):
+		"""Returns the getaddrinfo() result for a TCP connection."""
+		key = (hostname, port)
+		entry = self._entries.get(key)
+		if (entry is not None) and (entry[0] > asyncio.get_running_loop().time()):
+			self._hits += 1
+			result = entry[1]
+			if isinstance(result, OSError):
+				raise type(result)(*result.args)
+			return result
+
+		lookup = self._lookups.get(key)
+		if lookup is None:
+			self._misses += 1
+			lookup = asyncio.ensure_future(self._lookup(key))
+			self._lookups[key] = lookup
+		else:
+			self._hits += 1
+		# One waiter being cancelled must not cancel the lookup for others.
+		return await asyncio.shield(lookup)
+
+	async def _lookup(self, key):
+		loop = asyncio.get_running_loop()
+		try:
+			result = await loop.getaddrinfo(key[0], key[1], type = socket.SOCK_STREAM)
+		except OSError as e:
+			self._entries[key] = (loop.time() + self._negative_ttl_secs, e)
+			raise
+		else:
+			self._entries[key] = (loop.time() + self._ttl_secs, result)
+			return result
+		finally:
+			del self._lookups[key]
+
+	@staticmethod
+	def interleave(addresses: list):
+		"""Orders the addresses so that address families alternate, starting
+		with the family of the first address (RFC8305)."""
+		by_family = { }
+		for address in addresses:
+			by_family.setdefault(address[0], [ ]).append(address)
+		result = [ ]
+		queues = list(by_family.values())
+		while len(queues) > 0:
+			for queue in queues:
+				result.append(queue.pop(0))
+			queues = [ queue for queue in queues if len(queue) > 0 ]
+		return result
+
+	def clear(self):
+		self._entries.clear()
+
+	def __len__(self):
+		return len(self._entries)
+
+	def get_status(self):
+		return {
+			"entries":	len(self._entries),
+			"hits":		self._hits,
+			"misses":	self._misses,
+		}
@@ -33,6 +33,7 @@ class IRCTimeout(enum.IntEnum):
 	RejoinChannelBannedTimeSecs = 8
 	DCCAckResumeTimeoutSecs = 9
 	DCCPassiveConnectTimeoutSecs = 10
+	CapabilityNegotiationTimeoutSecs = 11
 
 class IRCCallbackType(enum.Enum):
 	PrivateMessage = "priv_msg"
@@ -53,6 +54,26 @@ class Usermode(enum.IntEnum):
 	Voice = 1
 	Op = 2
 
+class MemberMode(enum.IntFlag):
+	Regular = 0
+	Voice = 1
+	HalfOp = 2
+	Op = 4
+	Admin = 8
+	Owner = 16
+
+	@classmethod
+	def from_mode_char(cls, mode_char: str):
+		return _MEMBER_MODE_CHARS.get(mode_char, cls.Regular)
+
+_MEMBER_MODE_CHARS = {
+	"v":	MemberMode.Voice,
+	"h":	MemberMode.HalfOp,
+	"o":	MemberMode.Op,
+	"a":	MemberMode.Admin,
+	"q":	MemberMode.Owner,
+}
+
 class DCCMessageType(enum.IntEnum):
 	Send = 0
 	Accept = 1
@@ -62,6 +83,12 @@ class ConnectionState(enum.Enum):
 	Registering = "registering"
 	Connected = "connected"
 
+class ChannelJoinState(enum.Enum):
+	Queued = "queued"
+	Joining = "joining"
+	Joined = "joined"
+	Backoff = "backoff"
+
 class StatEvent(enum.Enum):
 	ChannelKicked = "chan_kicked"
 	ChannelJoinAttempt = "chan_join_attempt"
@@ -71,6 +98,11 @@ class StatEvent(enum.Enum):
 	ChannelMessage = "chan_msg"
 	ChannelNotice = "chan_notice"
 
+class TxPriority(enum.IntEnum):
+	Urgent = 0
+	Control = 1
+	Bulk = 2
+
 class DCCTransferState(enum.IntEnum):
 	Pending = 0
 	Negotiating = 1
@@ -20,37 +20,91 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 import asyncio
+import collections
+from airc.ReplyCode import ReplyCode
 
 class ExpectedResponse():
-	def __init__(self, finish_conditions: tuple, record_conditions: tuple | None = None):
+	# Index keys tell the PendingResponses which messages can possibly
+	# satisfy this response: only messages with the given command code are
+	# fed and, if a locator is given, only those in which the located value
+	# (a parameter index or ORIGIN for the origin's nickname) case-insensitively
+	# equals the given value. Without index keys, every message is fed. Factory
+	# methods that compare names take the fold of the server's casemapping
+	# (e.g. ISupport.fold) so that their conditions agree with the index.
+	IndexKey = collections.namedtuple("IndexKey", [ "cmdcode", "locator", "value" ])
+	ORIGIN = "origin"
+
+	def __init__(self, finish_conditions: tuple, record_conditions: tuple | None = None, index_keys: tuple | None = None, timeout: float | None = None):
 		self._future = asyncio.Future()
 		self._finish_conditions = finish_conditions
 		self._record_conditions = record_conditions
+		self._index_keys = index_keys
+		self._timeout = timeout
 		self._messages = [ ]
 
 	@classmethod
-	def on_cmdcode(cls, finish_cmdcodes: tuple, record_cmdcodes: tuple | None = None):
+	def on_cmdcode(cls, finish_cmdcodes: tuple, record_cmdcodes: tuple | None = None, timeout: float | None = None):
 		finish_conditions = tuple(lambda msg, cmdcode = cmdcode: msg.is_cmdcode(cmdcode) for cmdcode in finish_cmdcodes)
 		if record_cmdcodes is not None:
 			record_conditions = tuple(lambda msg, cmdcode = cmdcode: msg.is_cmdcode(cmdcode) for cmdcode in record_cmdcodes)
+			index_cmdcodes = finish_cmdcodes + record_cmdcodes
 		else:
 			record_conditions = None
-		return cls(finish_conditions = finish_conditions, record_conditions = record_conditions)
+			index_cmdcodes = finish_cmdcodes
+		index_keys = tuple(set(cls.IndexKey(cmdcode = cmdcode, locator = None, value = None) for cmdcode in index_cmdcodes))
+		return cls(finish_conditions = finish_conditions, record_conditions = record_conditions, index_keys = index_keys, timeout = timeout)
 
 	@classmethod
-	def on_privmsg_from(cls, nickname: str, ctcp_message: bool = False):
+	def on_privmsg_from(cls, nickname: str, ctcp_message: bool = False, fold = str.lower, timeout: float | None = None):
 		conditions = [ ]
 		conditions.append(lambda msg: msg.is_cmdcode("PRIVMSG"))
-		conditions.append(lambda msg: msg.origin.has_nickname(nickname))
+		conditions.append(lambda msg: msg.origin.has_nickname(nickname, fold = fold))
 		conditions.append(lambda msg: not msg.get_param(0, "").startswith("#"))
 		if ctcp_message:
 			conditions.append(lambda msg: msg.get_param(1, "").startswith("\x01") and msg.get_param(1, "").endswith("\x01") and len(msg.get_param(1, "")) > 2)
-		return cls(finish_conditions = (lambda msg: all(condition(msg) for condition in conditions), ))
+		index_keys = (cls.IndexKey(cmdcode = "PRIVMSG", locator = cls.ORIGIN, value = nickname), )
+		return cls(finish_conditions = (lambda msg: all(condition(msg) for condition in conditions), ), index_keys = index_keys, timeout = timeout)
+
+	@classmethod
+	def on_join(cls, channel_name: str, fold = str.lower, timeout: float | None = None):
+		is_channel = lambda msg, param_index: (msg.get_param(param_index) is not None) and (fold(msg.get_param(param_index)) == fold(channel_name))
+		finish_conditions = (lambda msg: (msg.is_cmdcode("JOIN") and is_channel(msg, 0)) or (msg.is_cmdcode(ReplyCode.ERR_BANNEDFROMCHAN) and is_channel(msg, 1)), )
+		index_keys = (cls.IndexKey(cmdcode = "JOIN", locator = 0, value = channel_name), cls.IndexKey(cmdcode = ReplyCode.ERR_BANNEDFROMCHAN, locator = 1, value = channel_name))
+		return cls(finish_conditions = finish_conditions, index_keys = index_keys, timeout = timeout)
+
+	@classmethod
+	def on_capability_reply(cls, subcommands: tuple, timeout: float | None = None):
+		# Multiline replies mark all but the last line with an additional "*"
+		# parameter. Servers that do not know about CAP reject it as an
+		# unknown command or because we are not registered yet.
+		is_reply = lambda msg: msg.is_cmdcode("CAP") and (msg.get_param(1, "").upper() in subcommands)
+		finish_conditions = (
+			lambda msg: is_reply(msg) and (len(msg.params) < 4),
+			lambda msg: msg.is_cmdcode(ReplyCode.ERR_UNKNOWNCOMMAND) and msg.has_param(1, "CAP", ignore_case = True),
+			lambda msg: msg.is_cmdcode(ReplyCode.ERR_NOTREGISTERED),
+		)
+		index_keys = (cls.IndexKey(cmdcode = "CAP", locator = None, value = None), cls.IndexKey(cmdcode = ReplyCode.ERR_UNKNOWNCOMMAND, locator = 1, value = "CAP"), cls.IndexKey(cmdcode = ReplyCode.ERR_NOTREGISTERED, locator = None, value = None))
+		return cls(finish_conditions = finish_conditions, record_conditions = (is_reply, ), index_keys = index_keys, timeout = timeout)
 
 	@property
 	def future(self):
 		return self._future
 
+	@property
+	def index_keys(self):
+		return self._index_keys
+
+	@property
+	def timeout(self):
+		return self._timeout
+
+	def expire(self):
+		if not self._future.done():
+			self._future.set_exception(asyncio.exceptions.TimeoutError(f"Expected response did not arrive within {self._timeout} seconds."))
+
+	def cancel(self):
+		self._future.cancel()
+
 	@property
 	def finish_conditions(self):
 		return self._finish_conditions
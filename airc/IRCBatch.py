@@ -0,0 +1,62 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+class IRCBatch():
+	"""IRCv3 batch: all messages that the server tagged with the same batch
+	reference between BATCH +reference and BATCH -reference. A nested batch
+	is contained in the messages of its parent as an IRCBatch, at the
+	position where it was closed."""
+
+	def __init__(self, reference: str, batch_type: str, params: list, parent: "IRCBatch | None" = None):
+		self._reference = reference
+		self._batch_type = batch_type
+		self._params = params
+		self._parent = parent
+		self._messages = [ ]
+
+	@property
+	def reference(self):
+		return self._reference
+
+	@property
+	def batch_type(self):
+		return self._batch_type
+
+	@property
+	def params(self):
+		return self._params
+
+	@property
+	def parent(self):
+		return self._parent
+
+	@property
+	def messages(self):
+		return self._messages
+
+	def append(self, msg: "IRCMessage | IRCBatch"):
+		self._messages.append(msg)
+
+	def __len__(self):
+		return len(self._messages)
+
+	def __repr__(self):
+		return f"IRCBatch<{self.reference}, {self.batch_type}, {len(self)} messages>"
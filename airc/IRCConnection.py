@@ -23,26 +23,45 @@ import asyncio
 import logging
 from airc.IRCMessageHandler import IRCMessageHandler
 from airc.Exceptions import ServerSeveredConnectionException
-from airc.Enums import IRCTimeout
+from airc.Enums import IRCTimeout, TxPriority
 from airc.ExpectedResponse import ExpectedResponse
+from airc.PendingResponses import PendingResponses
+from airc.OutboundQueue import OutboundQueue
 from airc.ReplyCode import ReplyCode
+from airc.ISupport import ISupport
+from airc.NicknamePool import NicknamePool
 from airc.AsyncBackgroundTasks import AsyncBackgroundTasks
 
 _log = logging.getLogger(__spec__.name)
 
 class IRCConnection():
-	def __init__(self, irc_network, irc_server, reader, writer):
+	_COMMAND_PRIORITIES = {
+		"PASS":		TxPriority.Urgent,
+		"NICK":		TxPriority.Urgent,
+		"USER":		TxPriority.Urgent,
+		"PING":		TxPriority.Urgent,
+		"PONG":		TxPriority.Urgent,
+		"QUIT":		TxPriority.Urgent,
+		"PRIVMSG":	TxPriority.Bulk,
+		"NOTICE":	TxPriority.Bulk,
+	}
+
+	def __init__(self, irc_network, irc_server, protocol):
 		self._bg_tasks = AsyncBackgroundTasks()
 		self._irc_network = irc_network
 		self._irc_server = irc_server
-		self._reader = reader
-		self._writer = writer
+		self._protocol = protocol
 		self._shutdown = False
 		self._registration_complete = asyncio.Event()
-		self._msghandler = IRCMessageHandler()
+		config = self._irc_network.client_configuration
+		self._isupport = ISupport()
+		self._nickname_pool = NicknamePool(fold = self._isupport.fold)
+		self._msghandler = IRCMessageHandler(origin_cache = config.create_origin_cache(intern = self._nickname_pool.intern), cmdcode_filter = self._wants_cmdcode if config.selective_parsing else None, intern = self._nickname_pool.intern)
 		self._client = self._irc_network.irc_client_class(irc_network = self._irc_network, irc_connection = self)
 		self._identity = None
-		self._pending_responses = [ ]
+		self._capabilities = frozenset()
+		self._pending_responses = PendingResponses(fold = self._isupport.fold, timer_wheel = self._irc_network.timer_wheel)
+		self._tx_queue = OutboundQueue(protocol, token_bucket = self._irc_network.client_configuration.create_flood_control_bucket(), sent_callback = self._pending_responses.arm)
 
 	@property
 	def client(self):
@@ -56,45 +75,134 @@ class IRCConnection():
 	def irc_server(self):
 		return self._irc_server
 
+	@property
+	def capabilities(self):
+		return self._capabilities
+
+	def has_capability(self, capability: str):
+		return capability in self._capabilities
+
+	@property
+	def isupport(self):
+		return self._isupport
+
+	@property
+	def nickname_pool(self):
+		return self._nickname_pool
+
+	@property
+	def timer_wheel(self):
+		return self._irc_network.timer_wheel
+
 	@property
 	def registration_complete(self):
 		return self._registration_complete
 
+	@property
+	def tx_queue(self):
+		return self._tx_queue
+
+	@property
+	def msghandler(self):
+		return self._msghandler
+
+	def _wants_cmdcode(self, cmdcode):
+		# Only consulted if selective parsing is enabled: messages that no
+		# client handler and no pending response is interested in are
+		# dropped before an IRCMessage is constructed.
+		return (cmdcode == "ERROR") or (cmdcode == ReplyCode.RPL_ISUPPORT) or self._client.has_command_handler(cmdcode) or self._pending_responses.wants_cmdcode(cmdcode) or (cmdcode in self._irc_network.client_configuration.selective_parsing_cmdcodes)
+
 	def _rx_message(self, msg):
 		if msg.is_cmdcode("error"):
 			# Server aborted connection
 			self._shutdown = True
 			_log.error("Server aborted connection with error: %s", msg)
 			raise ServerSeveredConnectionException(msg)
-		self._pending_responses = [ response_obj for response_obj in self._pending_responses if response_obj.feed(msg) ]
-		self._client.handle_msg(msg)
+		elif msg.is_cmdcode(ReplyCode.RPL_ISUPPORT) and (len(msg.params) > 2):
+			# RFC2812 (ab)used 005 as RPL_BOUNCE with a single text parameter
+			self._isupport.feed(msg)
+		self._pending_responses.feed(msg)
 
-	def tx_message(self, text: str, expect: ExpectedResponse | None = None):
+	def tx_message(self, text: str, expect: ExpectedResponse | None = None, priority: TxPriority | None = None):
 		_log.trace("-> %s : %s", self.irc_server, text)
+		if priority is None:
+			command = text.split(" ", maxsplit = 1)[0].upper()
+			priority = self._COMMAND_PRIORITIES.get(command, TxPriority.Control)
 		binmsg = self._msghandler.encode(text)
-		self._writer.write(binmsg)
+		self._tx_queue.put(binmsg, expect, priority)
 		if expect is not None:
-			self._pending_responses.append(expect)
+			# Timeout starts counting once the line has actually been sent.
+			self._pending_responses.add(expect, arm = False)
 			return expect.future
 		else:
 			return None
 
+	def _rx_lines(self, lines):
+		eavesdrop = _log.isEnabledFor(logging.EAVESDROP)
+		msgs = [ ]
+		try:
+			for line in lines:
+				if (line == b"") or (line == b"\r"):
+					continue
+				if eavesdrop:
+					_log.eavesdrop("<- %s : %s", self.irc_server, line)
+				msg = self._msghandler.parse(line)
+				if msg is None:
+					continue
+				self._rx_message(msg)
+				msgs.append(msg)
+		finally:
+			# Even if processing is aborted, the client still sees everything
+			# that was received before the offending line.
+			if len(msgs) > 0:
+				self._client.handle_msg_batch(msgs)
+
 	async def _handle_rx(self):
-		while not self._shutdown:
-			line = await self._reader.readline()
-			if len(line) == 0:
-				# Remote disconnected
-				self._shutdown = True
-				self._writer.close()
-				break
-			_log.eavesdrop(f"<- {self.irc_server} : {line}")
-			msg = self._msghandler.parse(line)
-			self._rx_message(msg)
+		try:
+			await self._protocol.closed
+		finally:
+			# Remote disconnected or connection aborted
+			self._shutdown = True
+			self._protocol.close()
+			self._pending_responses.cancel_all()
+			self._client.handle_connection_lost()
+
+	@staticmethod
+	def _parse_capability_list(msgs):
+		capabilities = set()
+		for msg in msgs:
+			for capability in msg.params[-1].split():
+				# CAP LS 302 lists values as "name=value"
+				capabilities.add(capability.split("=", maxsplit = 1)[0])
+		return capabilities
+
+	async def _negotiate_capabilities(self):
+		wanted = set(self._irc_network.client_configuration.capabilities)
+		if len(wanted) == 0:
+			return
+		timeout = self._irc_network.client_configuration.timeout(IRCTimeout.CapabilityNegotiationTimeoutSecs)
+		try:
+			rsp = await self.tx_message("CAP LS 302", expect = ExpectedResponse.on_capability_reply(("LS", ), timeout = timeout), priority = TxPriority.Urgent)
+			if (len(rsp) == 0) or (not rsp[-1].is_cmdcode("CAP")):
+				_log.debug("Server %s does not support capability negotiation.", self._irc_server)
+				return
+
+			requested = wanted & self._parse_capability_list(rsp)
+			if len(requested) > 0:
+				rsp = await self.tx_message(f"CAP REQ :{' '.join(sorted(requested))}", expect = ExpectedResponse.on_capability_reply(("ACK", "NAK"), timeout = timeout), priority = TxPriority.Urgent)
+				acknowledged = set(capability for capability in self._parse_capability_list(msg for msg in rsp if msg.has_param(1, "ACK", ignore_case = True)) if not capability.startswith("-"))
+				self._capabilities = frozenset(acknowledged)
+				_log.debug("Capabilities enabled at server %s: %s", self._irc_server, ", ".join(sorted(self._capabilities)) or "none")
+		except asyncio.exceptions.TimeoutError:
+			_log.warning("Capability negotiation with server %s timed out after %d seconds, continuing without.", self._irc_server, timeout)
+		self.tx_message("CAP END", priority = TxPriority.Urgent)
 
 	async def _register(self):
 		if self._irc_server.password is not None:
 			rsp = self.tx_message(f"PASS :{self._irc_server.password}")
 
+		await self._negotiate_capabilities()
+
 		for irc_identity in self._irc_network.identity_generator:
 			self._identity = irc_identity
 			_log.debug("Registering at server %s using identity %s", self._irc_server, irc_identity)
@@ -105,11 +213,11 @@ class IRCConnection():
 			try:
 				hostname = "localhost"
 				servername = "*"
-				rsp = await asyncio.wait_for(self.tx_message(f"USER {irc_identity.username or irc_identity.nickname} {hostname} {servername} :{irc_identity.realname or irc_identity.nickname}", expect = ExpectedResponse.on_cmdcode(finish_cmdcodes = ("MODE", ReplyCode.ERR_NICKNAMEINUSE, ReplyCode.ERR_ERRONEUSNICKNAME, ReplyCode.RPL_ENDOFMOTD, ReplyCode.ERR_NOMOTD))), timeout = self._irc_network.client_configuration.timeout(IRCTimeout.RegistrationTimeoutSecs))
+				rsp = await self.tx_message(f"USER {irc_identity.username or irc_identity.nickname} {hostname} {servername} :{irc_identity.realname or irc_identity.nickname}", expect = ExpectedResponse.on_cmdcode(finish_cmdcodes = ("MODE", ReplyCode.ERR_NICKNAMEINUSE, ReplyCode.ERR_ERRONEUSNICKNAME, ReplyCode.RPL_ENDOFMOTD, ReplyCode.ERR_NOMOTD), timeout = self._irc_network.client_configuration.timeout(IRCTimeout.RegistrationTimeoutSecs)))
 				if rsp[0].is_cmdcode("MODE") or rsp[0].is_cmdcode(ReplyCode.RPL_ENDOFMOTD) or rsp[0].is_cmdcode(ReplyCode.ERR_NOMOTD):
 					_log.info("Registeration at server %s using identity %s completed successfully.", self._irc_server, irc_identity)
-					self._registration_complete.set()
 					self._client.our_nickname = rsp[0].params[0]
+					self._registration_complete.set()
 					break
 				elif rsp[0].is_cmdcode(ReplyCode.ERR_NICKNAMEINUSE):
 					_log.warning("Registration at server %s using identity %s did not let us use nickname (already in use).", self._irc_server, irc_identity)
@@ -121,7 +229,17 @@ class IRCConnection():
 				_log.error("Registration at server %s using identity %s timed out after %d seconds.", self._irc_server, irc_identity, self._irc_network.client_configuration.timeout(IRCTimeout.RegistrationTimeoutSecs))
 
 	def start(self):
+		self._protocol.set_line_handler(self._rx_lines)
 		rx_task = self._bg_tasks.create_task(self._handle_rx(), "rx_task")
 		register_task = self._bg_tasks.create_task(self._register(), "register_task")
-		rx_task.add_done_callback(register_task.cancel)
+		tx_task = self._bg_tasks.create_task(self._tx_queue.run(), "tx_task")
+		rx_task.add_done_callback(lambda task: register_task.cancel())
+		rx_task.add_done_callback(lambda task: tx_task.cancel())
+		register_task.add_done_callback(self._registration_done)
 		return rx_task
+
+	def _registration_done(self, task):
+		# A failed registration (e.g., all nicknames exhausted) ends the
+		# connection with that exception.
+		if (not task.cancelled()) and (task.exception() is not None):
+			self._protocol.abort(task.exception())
@@ -19,21 +19,87 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
+import re
 import logging
-from airc.ReplyCode import ReplyCode
+from airc.ReplyCode import NUMERIC_CMDCODES
 from airc.Origin import Origin
-from airc.Exceptions import ServerMessageParseException, InvalidOriginException
+from airc.OriginCache import OriginCache
+from airc.Exceptions import ServerMessageParseException
 
 _log = logging.getLogger(__spec__.name)
 
 class IRCMessage():
-	def __init__(self, origin, cmdcode, params):
-		self._origin = origin
+	"""Message that references the raw line it was parsed from. The command
+	code is determined (and normalized to upper case) by the parser; for
+	IRCv3 tags, origin and parameters only the offsets are known, they are
+	decoded when first accessed."""
+	__slots__ = ("_line", "_handler", "_tags_end", "_origin_start", "_origin_end", "_params_start", "_end", "_tags", "_origin", "_cmdcode", "_params")
+	_TAG_ESCAPE_RE = re.compile(r"\\(.?)", flags = re.DOTALL)
+	_TAG_ESCAPES = {
+		":":	";",
+		"s":	" ",
+		"\\":	"\\",
+		"r":	"\r",
+		"n":	"\n",
+	}
+
+	def __init__(self, line: bytes, handler: "IRCMessageHandler", origin_end: int, cmdcode: str | int, params_start: int, end: int, tags_end: int = 0, origin_start: int = 0):
+		self._line = line
+		self._handler = handler
+		self._tags_end = tags_end
+		self._origin_start = origin_start
+		self._origin_end = origin_end
 		self._cmdcode = cmdcode
-		self._params = params
+		self._params_start = params_start
+		self._end = end
+		self._tags = None
+		self._origin = None
+		self._params = None
+
+	@property
+	def raw(self):
+		return self._line[:self._end]
+
+	@property
+	def raw_tags(self):
+		if self._tags_end == 0:
+			return None
+		return self._line[1 : self._tags_end]
+
+	@property
+	def has_tags(self):
+		return self._tags_end > 0
+
+	@property
+	def tags(self):
+		if self._tags is None:
+			self._tags = self._parse_tags()
+		return self._tags
+
+	@classmethod
+	def _unescape_tag_value(cls, value: str):
+		if "\\" not in value:
+			return value
+		return cls._TAG_ESCAPE_RE.sub(lambda match: cls._TAG_ESCAPES.get(match.group(1), match.group(1)), value)
+
+	def _parse_tags(self):
+		tags = { }
+		if self._tags_end == 0:
+			return tags
+		for tag in self._line[1 : self._tags_end].decode(self._handler.codec, errors = "replace").split(";"):
+			if tag == "":
+				continue
+			(key, _, value) = tag.partition("=")
+			tags[key] = self._unescape_tag_value(value)
+		return tags
+
+	def get_tag(self, key, default_value = None):
+		return self.tags.get(key, default_value)
 
 	@property
 	def origin(self):
+		if (self._origin is None) and (self._origin_end > 0):
+			self._origin = self._handler.decode_origin(self._line[self._origin_start : self._origin_end])
 		return self._origin
 
 	@property
@@ -42,18 +108,32 @@ class IRCMessage():
 
 	@property
 	def params(self):
+		if self._params is None:
+			self._params = self._parse_params()
 		return self._params
 
-	def is_cmdcode(self, cmdcode):
-		if isinstance(self.cmdcode, str) and isinstance(cmdcode, str):
-			return self.cmdcode.lower() == cmdcode.lower()
+	def _parse_params(self):
+		if self._params_start >= self._end:
+			return [ ]
+		params = self._line[self._params_start : self._end].decode(self._handler.codec, errors = "replace")
+		if params.startswith(":"):
+			return [ params[1:] ]
+		elif " :" in params:
+			(pre, post) = params.split(" :", maxsplit = 1)
+			return pre.split(" ") + [ post ]
 		else:
-			return self.cmdcode == cmdcode
+			return params.split(" ")
+
+	def is_cmdcode(self, cmdcode):
+		if isinstance(cmdcode, str):
+			cmdcode = cmdcode.upper()
+		return self._cmdcode == cmdcode
 
 	def get_param(self, param_index, default_value = None):
-		if param_index >= len(self._params):
+		params = self.params
+		if param_index >= len(params):
 			return default_value
-		return self._params[param_index]
+		return params[param_index]
 
 	def has_param(self, param_index, value, ignore_case = False):
 		param_value = self.get_param(param_index)
@@ -71,43 +151,87 @@ class IRCMessage():
 			return f"IRCMessage<{self.cmdcode}>: {self.params}"
 
 class IRCMessageHandler():
-	def __init__(self, codec: str = "utf-8"):
+	def __init__(self, codec: str = "utf-8", origin_cache: OriginCache | None = None, cmdcode_filter = None, intern = None):
 		self._codec = codec
+		self._origin_cache = origin_cache
+		self._intern = intern
+		self._cmdcode_filter = cmdcode_filter
+		self._skipped_count = 0
+
+	@property
+	def codec(self):
+		return self._codec
+
+	@property
+	def origin_cache(self):
+		return self._origin_cache
+
+	@property
+	def skipped_count(self):
+		return self._skipped_count
+
+	def decode_origin(self, raw: bytes):
+		if self._origin_cache is not None:
+			return self._origin_cache.get(raw)
+		return Origin.deferred(raw.decode(self._codec, errors = "replace"), intern = self._intern)
 
 	def encode(self, text):
 		return (text + "\r\n").encode(self._codec)
 
-	def parse(self, text):
-		try:
-			msg = text.decode(self._codec, errors = "replace").rstrip("\r\n")
-			if msg.startswith(":"):
-				# Have origin
-				(origin_text, msg) = msg.split(" ", maxsplit = 1)
-				try:
-					origin = Origin.parse(origin_text)
-				except InvalidOriginException as e:
-					_log.error("Could not parse origin string %s using regular expression: %s", origin_text, e)
-					origin = Origin(hostname = origin_text, nickname = None, username = None)
-			else:
-				origin = None
-
-			(cmdcode, params) = msg.split(" ", maxsplit = 1)
-			if (len(cmdcode) == 3) and (cmdcode.isdigit()):
-				cmdcode = int(cmdcode)
-				try:
-					cmdcode = ReplyCode(cmdcode)
-				except ValueError:
-					pass
-
-			if params.startswith(":"):
-				params = [ params[1:] ]
-			elif " :" in params:
-				(pre, post) = params.split(" :", maxsplit = 1)
-				params = pre.split(" ") + [ post ]
-			else:
-				params = params.split(" ")
-			parsed_msg = IRCMessage(origin = origin, cmdcode = cmdcode, params = params)
-			_log.trace(parsed_msg)
-			return parsed_msg
-		except (ValueError, UnicodeDecodeError) as e:
-			raise ServerMessageParseException(f"Could not parse server message: {text}") from e
+	def parse(self, line: bytes | bytearray | memoryview):
+		"""Returns the parsed IRCMessage or None if a command code filter is
+		set and rejects the message."""
+		if not isinstance(line, bytes):
+			line = bytes(line)
+
+		end = len(line)
+		while (end > 0) and (line[end - 1] in b"\r\n"):
+			end -= 1
+
+		if line.startswith(b"@"):
+			# IRCv3 message tags, only the span is remembered here
+			tags_end = line.find(b" ", 0, end)
+			if tags_end == -1:
+				raise ServerMessageParseException(f"Could not parse server message, tags without command: {line}")
+			origin_start = tags_end + 1
+			while (origin_start < end) and (line[origin_start] == 0x20):
+				origin_start += 1
+		else:
+			tags_end = 0
+			origin_start = 0
+
+		if line.startswith(b":", origin_start):
+			# Have origin
+			origin_end = line.find(b" ", origin_start, end)
+			if origin_end == -1:
+				raise ServerMessageParseException(f"Could not parse server message, origin without command: {line}")
+			cmdcode_start = origin_end + 1
+		else:
+			origin_end = 0
+			cmdcode_start = origin_start
+
+		cmdcode_end = line.find(b" ", cmdcode_start, end)
+		if cmdcode_end == -1:
+			# Command without any parameters
+			cmdcode_end = end
+			params_start = end
+		else:
+			params_start = cmdcode_end + 1
+		if cmdcode_end == cmdcode_start:
+			raise ServerMessageParseException(f"Could not parse server message, no command code present: {line}")
+
+		cmdcode = line[cmdcode_start : cmdcode_end]
+		numeric_cmdcode = NUMERIC_CMDCODES.get(cmdcode)
+		if numeric_cmdcode is not None:
+			cmdcode = numeric_cmdcode
+		else:
+			cmdcode = cmdcode.decode(self._codec, errors = "replace").upper()
+
+		if (self._cmdcode_filter is not None) and (not self._cmdcode_filter(cmdcode)):
+			# Nobody is interested in this message, do not construct it.
+			self._skipped_count += 1
+			return None
+
+		parsed_msg = IRCMessage(line = line, handler = self, origin_end = origin_end, cmdcode = cmdcode, params_start = params_start, end = end, tags_end = tags_end, origin_start = origin_start)
+		_log.trace(parsed_msg)
+		return parsed_msg
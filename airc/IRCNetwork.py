@@ -23,49 +23,100 @@ import asyncio
 import logging
 import socket
 import ssl
+import functools
 import collections
 from airc.Enums import IRCTimeout, IRCCallbackType, ConnectionState
 from airc.Exceptions import OutOfValidNicknamesException, ServerSeveredConnectionException, ServerMessageParseException
 from airc.AsyncBackgroundTasks import AsyncBackgroundTasks
+from airc.EventObject import EventObject
+from airc.TimerWheel import TimerWheel
+from airc.ReconnectScheduler import ReconnectScheduler
+from airc.DNSCache import DNSCache
+from airc.Tools import AsyncTools
 from airc.client import ClientConfiguration
 from .IRCServer import IRCServer
 from .IRCIdentityGenerator import IRCIdentityGenerator
 from .IRCConnection import IRCConnection
+from .IRCProtocol import IRCProtocol
 
 _log = logging.getLogger(__spec__.name)
 
-class IRCNetwork():
-	def __init__(self, irc_client_class, irc_servers: list[IRCServer], identity_generator: IRCIdentityGenerator, client_configuration: ClientConfiguration | None, identifier = str | None):
+class IRCNetwork(EventObject):
+	# First match wins: SSLError is an OSError as well.
+	_RECONNECT_DELAYS = (
+		(ssl.SSLError, IRCTimeout.ReconnectTimeAfterTLSErrorSecs, "we encountered a TLS error"),
+		(OSError, IRCTimeout.ReconnectTimeAfterConnectionErrorSecs, "of socket error"),
+		(OutOfValidNicknamesException, IRCTimeout.ReconnectTimeAfterNicknameExhaustionSecs, "no nickname was acceptable"),
+		(ServerSeveredConnectionException, IRCTimeout.ReconnectTimeAfterSeveredConnectionSecs, "server severed the connection"),
+		(ServerMessageParseException, IRCTimeout.ReconnectTimeAfterServerParseExceptionSecs, "server sent a message we could not parse"),
+	)
+
+	def __init__(self, irc_client_class, irc_servers: list[IRCServer], identity_generator: IRCIdentityGenerator, client_configuration: ClientConfiguration | None, identifier = str | None, timer_wheel: TimerWheel | None = None, dns_cache: DNSCache | None = None):
+		super().__init__()
 		self._bg_tasks = AsyncBackgroundTasks()
+		self._timer_wheel = timer_wheel if (timer_wheel is not None) else TimerWheel()
+		self._dns_cache = dns_cache if (dns_cache is not None) else DNSCache()
 		self._irc_client_class = irc_client_class
 		self._irc_servers = irc_servers
 		self._identity_generator = identity_generator
 		self._shutdown = False
 		self._connection = None
+		self._connection_state = ConnectionState.Unconnected
 		self._client_configuration = client_configuration if (client_configuration is not None) else ClientConfiguration()
+		self._reconnect_scheduler = ReconnectScheduler(irc_servers, backoff_cap_secs = self._client_configuration.reconnect_backoff_cap_secs, clean_close_jitter_secs = self._client_configuration.reconnect_clean_close_jitter_secs)
 		self._identifier = identifier
 		self._callbacks = collections.defaultdict(list)
 
 	@property
 	def connection_state(self):
-		if self._connection is None:
-			return ConnectionState.Unconnected
-		elif not self._connection.registration_complete:
-			return ConnectionState.Registering
-		else:
-			return ConnectionState.Connected
+		return self._connection_state
+
+	@connection_state.setter
+	def connection_state(self, value: ConnectionState):
+		change = self._connection_state != value
+		self._connection_state = value
+		if change:
+			_log.debug("Connection state of %s is now %s", self.identifier, value.value)
+			self.signal("connection_state")
+
+	async def wait_for_state(self, *states: ConnectionState):
+		"""Returns as soon as the network is in one of the given states."""
+		while self._connection_state not in states:
+			await self.event("connection_state")
+		return self._connection_state
 
 	def get_status(self):
 		result = {
 			"name":		self.identifier,
 			"state":	self.connection_state.value,
+			"timer_wheel":	self._timer_wheel.get_status(),
+			"reconnect":	self._reconnect_scheduler.get_status(),
 		}
 		if self._connection is not None:
 			result["channels"] = [ channel.get_status() for channel in self._connection.client.channels ]
+			result["join_scheduler"] = self._connection.client.join_scheduler.get_status()
 			result["original_identity"] = self._connection.identity.as_dict() if (self._connection.identity is not None) else None
 			result["current_nickname"] = self._connection.client.our_nickname
+			result["tx_queue"] = self._connection.tx_queue.get_status()
+			result["rx_skipped"] = self._connection.msghandler.skipped_count
+			result["isupport"] = self._connection.isupport.get_status()
+			result["nickname_pool"] = self._connection.nickname_pool.get_status()
+			if self._connection.msghandler.origin_cache is not None:
+				result["origin_cache"] = self._connection.msghandler.origin_cache.get_status()
 		return result
 
+	@property
+	def timer_wheel(self):
+		return self._timer_wheel
+
+	@property
+	def dns_cache(self):
+		return self._dns_cache
+
+	@property
+	def reconnect_scheduler(self):
+		return self._reconnect_scheduler
+
 	@property
 	def irc_client_class(self):
 		return self._irc_client_class
@@ -93,11 +144,10 @@ class IRCNetwork():
 		return self._identity_generator
 
 	async def connection_established(self):
-		while True:
-			if self._connection is not None:
-				await self._connection.registration_complete.wait()
-				return
-			await asyncio.sleep(1)
+		await self.wait_for_state(ConnectionState.Connected)
+
+	async def connection_lost(self):
+		await self.wait_for_state(ConnectionState.Unconnected)
 
 	def add_listener(self, callback_type: IRCCallbackType, callback):
 		self._callbacks[callback_type].append(callback)
@@ -113,40 +163,120 @@ class IRCNetwork():
 	def get_listeners(self, callback_type: IRCCallbackType):
 		return iter(self._callbacks.get(callback_type, [ ]))
 
-	async def _connect(self, irc_server):
+	async def _establish(self, irc_server):
+		# Connects to the server and returns once registration is complete.
 		_log.info("Connecting to %s", irc_server)
+		loop = asyncio.get_running_loop()
+		start_time = loop.time()
+		sock = await self._open_socket(irc_server)
 		try:
-			writer = None
-			(reader, writer) = await asyncio.open_connection(host = irc_server.hostname, port = irc_server.port, ssl = irc_server.tls_ctx)
-			self._connection = IRCConnection(self, irc_server, reader, writer)
-			await self._connection.start()
+			tls_ctx = irc_server.tls_ctx
+			with irc_server.resume_tls_session():
+				(transport, protocol) = await loop.create_connection(lambda: IRCProtocol(max_line_length = self.client_configuration.max_line_length), sock = sock, ssl = tls_ctx, server_hostname = irc_server.hostname if (tls_ctx is not None) else None)
+		except BaseException:
+			sock.close()
+			raise
+		try:
+			connection = IRCConnection(self, irc_server, protocol)
+			ssl_object = transport.get_extra_info("ssl_object")
+			if ssl_object is not None:
+				_log.debug("TLS connection to %s established using %s, session %s.", irc_server, ssl_object.version(), "resumed" if ssl_object.session_reused else "not resumed")
+			rx_task = connection.start()
+			registered = asyncio.ensure_future(connection.registration_complete.wait())
+			try:
+				await asyncio.wait([ rx_task, registered ], return_when = asyncio.FIRST_COMPLETED)
+			finally:
+				registered.cancel()
+			if not connection.registration_complete.is_set():
+				await rx_task
+				raise ServerSeveredConnectionException(f"{irc_server} closed the connection before registration completed.")
+			self._reconnect_scheduler.record_success(irc_server, loop.time() - start_time)
+			return (irc_server, transport, connection, rx_task)
+		except BaseException:
+			irc_server.store_tls_session(transport.get_extra_info("ssl_object"))
+			transport.close()
+			raise
+
+	@staticmethod
+	async def _connect_socket(address):
+		(family, sock_type, proto, canonname, sockaddr) = address
+		sock = socket.socket(family, sock_type, proto)
+		try:
+			sock.setblocking(False)
+			await asyncio.get_running_loop().sock_connect(sock, sockaddr)
+			return sock
+		except BaseException:
+			sock.close()
+			raise
+
+	async def _open_socket(self, irc_server):
+		# Addresses come from the (possibly shared) DNS cache, so connecting
+		# to them Happy-Eyeballs style is done here instead of by asyncio.
+		addresses = DNSCache.interleave(await self._dns_cache.resolve(irc_server.hostname, irc_server.port))
+		(winner, failures) = await AsyncTools.staggered_race([ functools.partial(self._connect_socket, address) for address in addresses ], self.client_configuration.connect_stagger_secs, discard = lambda sock: sock.close())
+		if winner is None:
+			raise failures[0][1]
+		return winner[1]
+
+	async def _race(self, irc_servers):
+		"""Connects to the given servers, starting one after the other with a
+		stagger delay or as soon as the previous attempt failed. Returns the
+		first server to complete registration (all others are cancelled) and
+		the failures that occurred until then."""
+		(winner, failures) = await AsyncTools.staggered_race([ functools.partial(self._establish, irc_server) for irc_server in irc_servers ], self.client_configuration.connect_stagger_secs, discard = lambda result: result[1].close())
+		failures = [ (irc_servers[index], exception) for (index, exception) in failures ]
+		return (winner[1] if (winner is not None) else None, failures)
+
+	async def _run_connection(self, irc_server, transport, connection, rx_task):
+		try:
+			self._connection = connection
+			self.connection_state = ConnectionState.Connected
+			await rx_task
 		finally:
-			if writer is not None:
-				writer.close()
+			irc_server.store_tls_session(transport.get_extra_info("ssl_object"))
+			transport.close()
 			self._connection = None
+			self.connection_state = ConnectionState.Unconnected
+
+	def _reconnect_delay(self, irc_server, exception):
+		for (exception_class, timeout, reason) in self._RECONNECT_DELAYS:
+			if isinstance(exception, exception_class):
+				_log.warning("Connection to %s failed because %s: %s", irc_server, reason, exception)
+				return self.client_configuration.timeout(timeout)
+		raise exception
 
 	async def _connection_loop(self):
 		while not self._shutdown:
-			for irc_server in self._irc_servers:
-				delay = 0
-				try:
-					await self._connect(irc_server)
-				except OutOfValidNicknamesException as e:
-					delay = self.client_configuration.timeout(IRCTimeout.ReconnectTimeAfterNicknameExhaustionSecs)
-					_log.warning("Delaying reconnect to %s by %d seconds because no nickname was acceptable: %s", irc_server, delay, e)
-				except (socket.gaierror, ConnectionRefusedError, ConnectionResetError) as e:
-					delay = self.client_configuration.timeout(IRCTimeout.ReconnectTimeAfterConnectionErrorSecs)
-					_log.warning("Delaying reconnect to %s by %d seconds because of socket error: %s", irc_server, delay, e)
-				except ServerSeveredConnectionException as e:
-					delay = self.client_configuration.timeout(IRCTimeout.ReconnectTimeAfterSeveredConnectionSecs)
-					_log.warning("Delaying reconnect to %s by %d seconds because server severed the connection: %s", irc_server, delay, e)
-				except ServerMessageParseException as e:
-					delay = self.client_configuration.timeout(IRCTimeout.ReconnectTimeAfterServerParseExceptionSecs)
-					_log.warning("Delaying reconnect to %s by %d seconds because server sent a message we could not parse: %s", irc_server, delay, e)
-				except ssl.SSLError as e:
-					delay = self.client_configuration.timeout(IRCTimeout.ReconnectTimeAfterTLSErrorSecs)
-					_log.warning("Delaying reconnect to %s by %d seconds because we encountered a TLS error: %s", irc_server, delay, e)
-				await asyncio.sleep(delay)
+			race_count = max(1, self.client_configuration.connect_race_servers)
+			irc_servers = self._reconnect_scheduler.ordered_servers()
+			for offset in range(0, len(irc_servers), race_count):
+				self.connection_state = ConnectionState.Registering
+				(winner, failures) = await self._race(irc_servers[offset : offset + race_count])
+				for (irc_server, exception) in failures:
+					self._reconnect_scheduler.record_failure(irc_server)
+				if winner is not None:
+					stable_timer = self._timer_wheel.call_later(self.client_configuration.reconnect_stable_connection_secs, self._reconnect_scheduler.record_stable, winner[0])
+					try:
+						await self._run_connection(*winner)
+					except Exception as e:
+						self._reconnect_scheduler.record_failure(winner[0])
+						failures = [ (winner[0], e) ]
+					else:
+						failures = [ ]
+					finally:
+						stable_timer.cancel()
+				else:
+					self.connection_state = ConnectionState.Unconnected
+				base_delay = min((self._reconnect_delay(irc_server, exception) for (irc_server, exception) in failures), default = 0)
+				delay = self._reconnect_scheduler.next_delay(base_delay)
+				if delay > 0:
+					_log.info("Delaying reconnect of %s by %.1f seconds.", self.identifier, delay)
+				await self._timer_wheel.sleep(delay)
 
 	def start(self):
+		self._shutdown = False
 		self._bg_tasks.create_task(self._connection_loop(), "connection_loop")
+
+	def stop(self):
+		self._shutdown = True
+		self._bg_tasks.cancel_all()
@@ -0,0 +1,141 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import asyncio
+import logging
+from airc.Enums import ConnectionState
+from airc.TimerWheel import TimerWheel
+from airc.DNSCache import DNSCache
+from airc.client import ClientConfiguration
+from .IRCServer import IRCServer
+from .IRCIdentityGenerator import IRCIdentityGenerator
+from .IRCNetwork import IRCNetwork
+
+_log = logging.getLogger(__spec__.name)
+
+class IRCNetworkSupervisor():
+	"""Runs many IRCNetwork instances in one event loop. All networks created
+	through the supervisor share one timer wheel, one DNS cache and
+	(optionally) one DCC controller, which is only handed to networks whose
+	configuration enables DCC handling; TLS contexts are shared by IRCServer
+	anyways. Networks that are added while the supervisor is running are
+	started right away."""
+
+	def __init__(self, timer_wheel: TimerWheel | None = None, dns_cache: DNSCache | None = None, dcc_controller: "DCCController | None" = None):
+		self._timer_wheel = timer_wheel if (timer_wheel is not None) else TimerWheel()
+		self._dns_cache = dns_cache if (dns_cache is not None) else DNSCache()
+		self._dcc_controller = dcc_controller
+		self._networks = { }
+		self._network_counter = 0
+		self._running = False
+
+	@property
+	def timer_wheel(self):
+		return self._timer_wheel
+
+	@property
+	def dns_cache(self):
+		return self._dns_cache
+
+	@property
+	def dcc_controller(self):
+		return self._dcc_controller
+
+	@property
+	def running(self):
+		return self._running
+
+	def create_network(self, irc_client_class, irc_servers: list[IRCServer], identity_generator: IRCIdentityGenerator, client_configuration: ClientConfiguration | None = None, identifier: str | None = None):
+		if identifier is None:
+			identifier = f"network-{self._network_counter}"
+			self._network_counter += 1
+		if identifier in self._networks:
+			raise ValueError(f"A network named {identifier} is already supervised.")
+		if client_configuration is None:
+			client_configuration = ClientConfiguration()
+		if (self._dcc_controller is not None) and client_configuration.handle_dcc and (client_configuration.dcc_controller is None):
+			client_configuration.dcc_controller = self._dcc_controller
+		network = IRCNetwork(irc_client_class = irc_client_class, irc_servers = irc_servers, identity_generator = identity_generator, client_configuration = client_configuration, identifier = identifier, timer_wheel = self._timer_wheel, dns_cache = self._dns_cache)
+		self._networks[identifier] = network
+		if self._running:
+			network.start()
+		return network
+
+	def remove_network(self, identifier: str):
+		network = self._networks.pop(identifier)
+		network.stop()
+		return network
+
+	def get_network(self, identifier: str):
+		return self._networks.get(identifier)
+
+	def __iter__(self):
+		return iter(self._networks.values())
+
+	def __len__(self):
+		return len(self._networks)
+
+	def start(self):
+		self._running = True
+		for network in self._networks.values():
+			network.start()
+
+	def stop(self):
+		self._running = False
+		for network in self._networks.values():
+			network.stop()
+
+	async def all_connected(self):
+		await asyncio.gather(*(network.connection_established() for network in self._networks.values()))
+
+	def count_states(self):
+		result = { state: 0 for state in ConnectionState }
+		for network in self._networks.values():
+			result[network.connection_state] += 1
+		return result
+
+	def get_health(self):
+		states = self.count_states()
+		servers = 0
+		failing_servers = 0
+		for network in self._networks.values():
+			for server_status in network.reconnect_scheduler.get_status()["servers"]:
+				servers += 1
+				if server_status["consecutive_failures"] > 0:
+					failing_servers += 1
+		return {
+			"networks":			len(self._networks),
+			"connected":		states[ConnectionState.Connected],
+			"connected_ratio":	(states[ConnectionState.Connected] / len(self._networks)) if (len(self._networks) > 0) else None,
+			"servers":			servers,
+			"failing_servers":	failing_servers,
+		}
+
+	def get_status(self, include_networks: bool = True):
+		result = {
+			"states":		{ state.value: count for (state, count) in self.count_states().items() },
+			"health":		self.get_health(),
+			"timer_wheel":	self._timer_wheel.get_status(),
+			"dns_cache":	self._dns_cache.get_status(),
+		}
+		if include_networks:
+			result["networks"] = [ network.get_status() for network in self._networks.values() ]
+		return result
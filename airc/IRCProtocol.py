@@ -0,0 +1,157 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import asyncio
+import logging
+
+_log = logging.getLogger(__spec__.name)
+
+class IRCProtocol(asyncio.Protocol):
+	"""Receives data from the server in whatever chunks the transport
+	delivers and splits them into lines in bulk. Complete lines are handed
+	to the line handler as one batch per received chunk."""
+
+	def __init__(self, max_line_length: int):
+		self._max_line_length = max_line_length
+		self._transport = None
+		self._rx_buffer = b""
+		self._discarding = False
+		self._discarded_line_count = 0
+		self._line_handler = None
+		self._pending_lines = [ ]
+		self._write_paused = False
+		self._drain_waiter = None
+		self._closed = asyncio.get_running_loop().create_future()
+
+	@property
+	def closed(self):
+		return self._closed
+
+	@property
+	def discarded_line_count(self):
+		return self._discarded_line_count
+
+	@property
+	def transport(self):
+		return self._transport
+
+	def set_line_handler(self, line_handler):
+		self._line_handler = line_handler
+		if len(self._pending_lines) > 0:
+			(lines, self._pending_lines) = (self._pending_lines, [ ])
+			self._deliver(lines)
+
+	def write(self, data: bytes):
+		self._transport.write(data)
+
+	async def drain(self):
+		if (not self._write_paused) or self._closed.done():
+			return
+		if self._drain_waiter is None:
+			self._drain_waiter = asyncio.get_running_loop().create_future()
+		await self._drain_waiter
+
+	def _wake_drain_waiter(self):
+		if self._drain_waiter is not None:
+			if not self._drain_waiter.done():
+				self._drain_waiter.set_result(None)
+			self._drain_waiter = None
+
+	def pause_writing(self):
+		self._write_paused = True
+
+	def resume_writing(self):
+		self._write_paused = False
+		self._wake_drain_waiter()
+
+	def close(self):
+		if self._transport is not None:
+			self._transport.close()
+
+	def abort(self, exception: Exception):
+		"""Closes the connection and lets 'closed' fail with the exception."""
+		self._fail(exception)
+
+	def _fail(self, exception):
+		if not self._closed.done():
+			self._closed.set_exception(exception)
+		self.close()
+
+	def _deliver(self, lines):
+		try:
+			self._line_handler(lines)
+		except Exception as e:
+			self._fail(e)
+
+	def _discard_overlong(self, length):
+		self._discarded_line_count += 1
+		_log.warning("Discarding line received from server that exceeds maximum line length of %d bytes (at least %d bytes long).", self._max_line_length, length)
+
+	def connection_made(self, transport):
+		self._transport = transport
+
+	def data_received(self, data):
+		if self._closed.done():
+			return
+
+		if len(self._rx_buffer) > 0:
+			data = self._rx_buffer + data
+		lines = data.split(b"\n")
+		tail = lines.pop()
+
+		if self._discarding:
+			if len(lines) == 0:
+				# Still within the overlong line, nothing complete yet.
+				return
+			# First complete line is the end of the overlong line.
+			lines.pop(0)
+			self._discarding = False
+
+		if len(tail) > self._max_line_length:
+			self._discard_overlong(len(tail))
+			tail = b""
+			self._discarding = True
+		self._rx_buffer = tail
+
+		if (len(lines) > 0) and (max(map(len, lines)) > self._max_line_length):
+			for line in lines:
+				if len(line) > self._max_line_length:
+					self._discard_overlong(len(line))
+			lines = [ line for line in lines if len(line) <= self._max_line_length ]
+
+		if len(lines) == 0:
+			return
+		if self._line_handler is None:
+			self._pending_lines += lines
+		else:
+			self._deliver(lines)
+
+	def eof_received(self):
+		# Close the transport, connection_lost() finishes up.
+		return False
+
+	def connection_lost(self, exc):
+		self._wake_drain_waiter()
+		if not self._closed.done():
+			if exc is None:
+				self._closed.set_result(None)
+			else:
+				self._closed.set_exception(exc)
@@ -20,8 +20,45 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 import ssl
+import contextlib
+import contextvars
+
+class _ResumingTLSContext(ssl.SSLContext):
+	"""Client context that remembers the last TLS session of every server
+	(hostname and port) it connected to and offers it again on the next
+	connection, so that reconnects only need an abbreviated handshake.
+	asyncio does not allow to pass a session when connecting and only hands
+	the hostname to wrap_bio(), so the connecting task announces the server
+	through resume_session() and the session is supplied in wrap_bio()."""
+
+	_session_key = contextvars.ContextVar("session_key", default = None)
+
+	def __init__(self, *args, **kwargs):
+		super().__init__()
+		self._sessions = { }
+
+	def store_session(self, key: tuple, session: ssl.SSLSession):
+		self._sessions[key] = session
+
+	@contextlib.contextmanager
+	def resume_session(self, key: tuple):
+		token = self._session_key.set(key)
+		try:
+			yield
+		finally:
+			self._session_key.reset(token)
+
+	def wrap_bio(self, incoming, outgoing, server_side = False, server_hostname = None, session = None):
+		key = self._session_key.get()
+		if (session is None) and (not server_side) and (key is not None):
+			session = self._sessions.get(key)
+		return super().wrap_bio(incoming, outgoing, server_side = server_side, server_hostname = server_hostname, session = session)
 
 class IRCServer():
+	# Contexts only depend on the TLS configuration and are expensive to
+	# create (loading all CA certificates), so they are shared.
+	_TLS_CONTEXTS = { }
+
 	def __init__(self, hostname: str, port: int | None = None, use_tls: bool = False, tls_insecure: bool = False, password: str | None = None):
 		self._hostname = hostname
 		if port is not None:
@@ -54,22 +91,43 @@ class IRCServer():
 	def password(self):
 		return self._password
 
+	@classmethod
+	def _create_tls_ctx(cls, tls_insecure: bool):
+		tls_ctx = _ResumingTLSContext(ssl.PROTOCOL_TLS_CLIENT)
+		if not tls_insecure:
+			tls_ctx.options |= ssl.OP_NO_SSLv2 | ssl.OP_NO_SSLv3 | ssl.OP_NO_TLSv1 | ssl.OP_NO_TLSv1_1 | ssl.OP_NO_COMPRESSION
+			tls_ctx.load_verify_locations(capath = "/etc/ssl/certs")
+			tls_ctx.check_hostname = True
+			tls_ctx.set_ciphers("!NULL:!EXP:!LOW:!MEDIUM:!ADH:!AECDH:!IDEA:!SEED:!MD5:!RC4:!DES:!DSS:!CAMELLIA:!AESCCM8:HIGH+EECDH:HIGH+EDH:!SHA:+SHA256:+RSA:+AES:+DHE:+ARIA")
+		else:
+			tls_ctx.check_hostname = False
+			tls_ctx.verify_mode = ssl.CERT_NONE
+		return tls_ctx
+
 	@property
 	def tls_ctx(self):
 		if self._use_tls is False:
 			return None
-		else:
-			tls_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-			if not self._tls_insecure:
-				tls_ctx.options |= ssl.OP_NO_SSLv2 | ssl.OP_NO_SSLv3 | ssl.OP_NO_TLSv1 | ssl.OP_NO_TLSv1_1 | ssl.OP_NO_COMPRESSION
-				tls_ctx.load_verify_locations(capath = "/etc/ssl/certs")
-				tls_ctx.check_hostname = True
-				tls_ctx.set_ciphers("!NULL:!EXP:!LOW:!MEDIUM:!ADH:!AECDH:!IDEA:!SEED:!MD5:!RC4:!DES:!DSS:!CAMELLIA:!AESCCM8:HIGH+EECDH:HIGH+EDH:!SHA:+SHA256:+RSA:+AES:+DHE:+ARIA")
-			else:
-				tls_ctx.check_hostname = False
-				tls_ctx.verify_mode = ssl.CERT_NONE
-
-			return tls_ctx
+		tls_ctx = self._TLS_CONTEXTS.get(self._tls_insecure)
+		if tls_ctx is None:
+			tls_ctx = self._create_tls_ctx(self._tls_insecure)
+			self._TLS_CONTEXTS[self._tls_insecure] = tls_ctx
+		return tls_ctx
+
+	def store_tls_session(self, ssl_object: ssl.SSLObject | None):
+		"""Remembers the session of a connection to this server so that the
+		next connection can resume it. Called when the connection is closed,
+		since TLSv1.3 session tickets arrive after the handshake."""
+		if (ssl_object is None) or (ssl_object.session is None):
+			return
+		self.tls_ctx.store_session((self._hostname, self._port), ssl_object.session)
+
+	def resume_tls_session(self):
+		"""Returns a context manager within which TLS connections made with
+		tls_ctx offer the session last stored for this server."""
+		if self._use_tls is False:
+			return contextlib.nullcontext()
+		return self.tls_ctx.resume_session((self._hostname, self._port))
 
 	def __str__(self):
 		strs = [ f"{self.hostname}:{self.port}" ]
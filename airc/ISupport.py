@@ -0,0 +1,232 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import re
+import logging
+from airc.Enums import MemberMode
+
+_log = logging.getLogger(__spec__.name)
+
+class ISupport():
+	"""Features the server advertises in RPL_ISUPPORT (005). All derived
+	lookup tables (case folding, prefixes, channel types, target limits) are
+	computed once when the tokens are received so that helpers which are
+	used for every message are cheap."""
+
+	_DEFAULTS = {
+		"CASEMAPPING":	"rfc1459",
+		"PREFIX":		"(ov)@+",
+		"CHANTYPES":	"#&",
+		"CHANMODES":	"beI,k,l,imnpst",
+		"NICKLEN":		"9",
+	}
+	_CASEMAPPINGS = {
+		"ascii":			str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"),
+		"rfc1459":			str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ[]\\~", "abcdefghijklmnopqrstuvwxyz{}|^"),
+		"strict-rfc1459":	str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ[]\\", "abcdefghijklmnopqrstuvwxyz{}|"),
+	}
+	_PREFIX_RE = re.compile(r"\((?P<modes>[^)]*)\)(?P<prefixes>.*)")
+	_ESCAPE_RE = re.compile(r"\\x([0-9a-fA-F]{2})")
+
+	# Commands that accept a comma-separated list of targets by RFC even if
+	# the server does not advertise TARGMAX.
+	_LIST_COMMANDS = ("JOIN", "PART")
+
+	def __init__(self):
+		self._tokens = { }
+		self._update()
+
+	@property
+	def tokens(self):
+		return self._tokens
+
+	def get(self, key: str, default_value = None):
+		value = self._tokens.get(key)
+		if value is None:
+			value = self._DEFAULTS.get(key, default_value)
+		return value
+
+	def __contains__(self, key: str):
+		return key in self._tokens
+
+	@property
+	def casemapping(self):
+		return self._casemapping
+
+	@property
+	def prefixes(self):
+		"""Channel membership prefixes, highest first (e.g. "@+")."""
+		return self._prefixes
+
+	@property
+	def prefix_modes(self):
+		"""Dict of channel membership prefix to corresponding mode letter."""
+		return self._prefix_modes
+
+	@property
+	def prefix_flags(self):
+		"""Dict of channel membership prefix to corresponding MemberMode
+		value (as int)."""
+		return self._prefix_flags
+
+	@property
+	def mode_flags(self):
+		"""Dict of channel membership mode letter (e.g. "o") to corresponding
+		MemberMode value (as int)."""
+		return self._mode_flags
+
+	@property
+	def chantypes(self):
+		return self._chantypes
+
+	@property
+	def nicklen(self):
+		return self._nicklen
+
+	@property
+	def maxtargets(self):
+		return self._maxtargets
+
+	@property
+	def targmax(self):
+		return self._targmax
+
+	def fold(self, name: str):
+		return name.translate(self._fold_table)
+
+	def is_channel_name(self, name: str):
+		return (len(name) > 0) and (name[0] in self._chantypes)
+
+	def strip_prefixes(self, name: str):
+		"""Returns the tuple (prefixes, name) of a prefixed name as it appears
+		in NAMES replies."""
+		stripped = name.lstrip(self._prefixes)
+		return (name[ : len(name) - len(stripped)], stripped)
+
+	def prefix_to_flags(self, prefixes: str):
+		flags = 0
+		for prefix in prefixes:
+			flags |= self._prefix_flags.get(prefix, 0)
+		return flags
+
+	def parse_mode_changes(self, modestring: str, args: list):
+		"""Splits a channel MODE change into (adding, mode_char, argument)
+		tuples. CHANMODES and PREFIX determine which modes take an argument."""
+		changes = [ ]
+		args = iter(args)
+		adding = True
+		for mode_char in modestring:
+			if mode_char == "+":
+				adding = True
+			elif mode_char == "-":
+				adding = False
+			else:
+				if mode_char in self._mode_argument_always:
+					argument = next(args, None)
+				elif adding and (mode_char in self._mode_argument_when_set):
+					argument = next(args, None)
+				else:
+					argument = None
+				changes.append((adding, mode_char, argument))
+		return changes
+
+	def max_targets(self, command: str):
+		"""Returns the number of targets that the command accepts or None if
+		it is unlimited."""
+		command = command.upper()
+		if (self._targmax is not None) and (command in self._targmax):
+			return self._targmax[command]
+		if command in self._LIST_COMMANDS:
+			return None
+		if self._targmax is not None:
+			return 1
+		if (self._maxtargets is not None) and (command in ("PRIVMSG", "NOTICE")):
+			return self._maxtargets
+		return 1
+
+	@classmethod
+	def _unescape(cls, value: str):
+		return cls._ESCAPE_RE.sub(lambda match: chr(int(match.group(1), 16)), value)
+
+	def feed(self, msg):
+		"""Feeds a RPL_ISUPPORT message. The first parameter is our nickname,
+		the last one a human-readable text."""
+		for token in msg.params[1 : -1]:
+			if token.startswith("-"):
+				self._tokens.pop(token[1:].upper(), None)
+			else:
+				(key, _, value) = token.partition("=")
+				self._tokens[key.upper()] = self._unescape(value)
+		self._update()
+
+	def _update(self):
+		self._casemapping = self.get("CASEMAPPING").lower()
+		if self._casemapping not in self._CASEMAPPINGS:
+			_log.warning("Unsupported casemapping %s advertised, using rfc1459.", self._casemapping)
+			self._fold_table = self._CASEMAPPINGS["rfc1459"]
+		else:
+			self._fold_table = self._CASEMAPPINGS[self._casemapping]
+
+		match = self._PREFIX_RE.fullmatch(self.get("PREFIX"))
+		if (match is None) or (len(match["modes"]) != len(match["prefixes"])):
+			match = self._PREFIX_RE.fullmatch(self._DEFAULTS["PREFIX"])
+		self._prefixes = match["prefixes"]
+		self._prefix_modes = dict(zip(match["prefixes"], match["modes"]))
+		self._prefix_flags = { prefix: int(MemberMode.from_mode_char(mode_char)) for (prefix, mode_char) in self._prefix_modes.items() }
+		self._mode_flags = { mode_char: int(MemberMode.from_mode_char(mode_char)) for mode_char in match["modes"] }
+
+		# Type A (lists) and B modes always have an argument, type C only when
+		# set, type D never.
+		chanmodes = (self.get("CHANMODES").split(",") + [ "", "", "", "" ])[:4]
+		self._mode_argument_always = frozenset(chanmodes[0] + chanmodes[1] + match["modes"])
+		self._mode_argument_when_set = frozenset(chanmodes[2])
+
+		self._chantypes = self.get("CHANTYPES")
+		self._nicklen = self._parse_int(self.get("NICKLEN"))
+		self._maxtargets = self._parse_int(self.get("MAXTARGETS"))
+
+		targmax = self.get("TARGMAX")
+		if targmax is None:
+			self._targmax = None
+		else:
+			self._targmax = { }
+			for entry in targmax.split(","):
+				(command, _, limit) = entry.partition(":")
+				if command != "":
+					self._targmax[command.upper()] = self._parse_int(limit)
+
+	@staticmethod
+	def _parse_int(value: str | None):
+		if (value is None) or (value == ""):
+			return None
+		try:
+			return int(value)
+		except ValueError:
+			return None
+
+	def get_status(self):
+		return {
+			"casemapping":	self.casemapping,
+			"prefixes":		self.prefixes,
+			"chantypes":	self.chantypes,
+			"nicklen":		self.nicklen,
+			"targmax":		self.targmax,
+		}
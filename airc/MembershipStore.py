@@ -0,0 +1,274 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import bisect
+from airc.Enums import MemberMode
+from airc.NicknamePool import NicknamePool
+
+class _ChannelMembers():
+	# The version of a channel is incremented on every change of its
+	# membership. The join log records (in parallel lists, ordered by
+	# version) which members were added at which version.
+	__slots__ = ("key", "members", "version", "log_versions", "log_keys")
+
+	def __init__(self, key: str):
+		self.key = key
+		self.members = { }
+		self.version = 0
+		self.log_versions = [ ]
+		self.log_keys = [ ]
+
+	def log_added(self, nick_keys):
+		for nick_key in nick_keys:
+			self.log_versions.append(self.version)
+			self.log_keys.append(nick_key)
+		if len(self.log_keys) > (2 * len(self.members)) + 64:
+			self._compact_log()
+
+	def _compact_log(self):
+		# Only the most recent entry of every current member is relevant.
+		seen = set()
+		entries = [ ]
+		for (version, nick_key) in zip(reversed(self.log_versions), reversed(self.log_keys)):
+			if (nick_key in self.members) and (nick_key not in seen):
+				seen.add(nick_key)
+				entries.append((version, nick_key))
+		entries.reverse()
+		self.log_versions = [ version for (version, nick_key) in entries ]
+		self.log_keys = [ nick_key for (version, nick_key) in entries ]
+
+	def added_since(self, version: int):
+		start = bisect.bisect_right(self.log_versions, version)
+		members = self.members
+		return set(nick_key for nick_key in self.log_keys[start:] if nick_key in members)
+
+class MembershipStore():
+	"""Keeps track of which user is in which channel of a connection. Both
+	directions are indexed (channel to members and nickname to channels) so
+	that a QUIT or NICK only costs as much as the number of channels the
+	user shares with us, not the number of channels we are in. All keys are
+	folded according to the server's casemapping; nicknames and their keys
+	are held in the connection's NicknamePool with one reference per channel
+	membership. Per channel, every member maps to its channel membership
+	modes as plain int MemberMode bitflags.
+
+	Every channel carries a version that changes whenever its membership
+	does, so that consumers can cache derived data (see Channel.users) and
+	ask which members were added since a version they have seen."""
+
+	def __init__(self, nickname_pool: NicknamePool | None = None):
+		self._pool = nickname_pool if (nickname_pool is not None) else NicknamePool()
+		self._fold = self._pool.fold
+		self._channels = { }
+		self._channels_of = { }
+
+	@property
+	def nickname_pool(self):
+		return self._pool
+
+	def fold(self, name: str):
+		return self._fold(name)
+
+	def add_channel(self, channel_name: str):
+		channel_key = self._fold(channel_name)
+		if channel_key not in self._channels:
+			self._channels[channel_key] = _ChannelMembers(channel_key)
+
+	def remove_channel(self, channel_name: str):
+		self.clear_channel(channel_name)
+		self._channels.pop(self._fold(channel_name), None)
+
+	def clear_channel(self, channel_name: str):
+		channel = self._channels.get(self._fold(channel_name))
+		if (channel is None) or (len(channel.members) == 0):
+			return
+		for nick_key in channel.members:
+			self._unlink(nick_key, channel.key)
+		channel.members.clear()
+		channel.version += 1
+
+	def _unlink(self, nick_key: str, channel_key: str):
+		channels = self._channels_of[nick_key]
+		channels.discard(channel_key)
+		if len(channels) == 0:
+			del self._channels_of[nick_key]
+		self._pool.release(nick_key)
+
+	def add(self, channel_name: str, nickname: str, modes: int = 0):
+		channel = self._channels.get(self._fold(channel_name))
+		if channel is None:
+			# Not a channel we are tracking
+			return
+		nick_key = self._fold(nickname)
+		if nick_key in channel.members:
+			channel.members[nick_key] = modes
+			return
+		nick_key = self._pool.acquire(nickname)
+		channel.members[nick_key] = modes
+		self._channels_of.setdefault(nick_key, set()).add(channel.key)
+		channel.version += 1
+		channel.log_added((nick_key, ))
+
+	def replace_members(self, channel_name: str, members: list):
+		"""Replaces all members of the channel by the given list of (nickname,
+		modes) tuples at once, e.g. with the result of a NAMES query."""
+		channel = self._channels.get(self._fold(channel_name))
+		if channel is None:
+			return
+		new_members = { }
+		for (nickname, modes) in members:
+			nick_key = self._fold(nickname)
+			if nick_key in new_members:
+				new_members[nick_key] = modes
+			else:
+				new_members[self._pool.acquire(nickname)] = modes
+
+		old_members = channel.members
+		removed = old_members.keys() - new_members.keys()
+		added = new_members.keys() - old_members.keys()
+		for nick_key in removed:
+			channels = self._channels_of[nick_key]
+			channels.discard(channel.key)
+			if len(channels) == 0:
+				del self._channels_of[nick_key]
+		for nick_key in added:
+			self._channels_of.setdefault(nick_key, set()).add(channel.key)
+		# References of the new members were taken above, so members that
+		# stay are not dropped from the pool in between.
+		for nick_key in old_members:
+			self._pool.release(nick_key)
+		channel.members = new_members
+		if (len(removed) > 0) or (len(added) > 0):
+			channel.version += 1
+			channel.log_added(added)
+
+	def remove(self, channel_name: str, nickname: str):
+		channel = self._channels.get(self._fold(channel_name))
+		nick_key = self._fold(nickname)
+		if (channel is None) or (nick_key not in channel.members):
+			return
+		del channel.members[nick_key]
+		channel.version += 1
+		self._unlink(nick_key, channel.key)
+
+	def quit(self, nickname: str):
+		"""Removes the user from all channels and returns the folded names of
+		the channels it was in."""
+		nick_key = self._fold(nickname)
+		channel_keys = self._channels_of.pop(nick_key, None)
+		if channel_keys is None:
+			return set()
+		for channel_key in channel_keys:
+			channel = self._channels[channel_key]
+			del channel.members[nick_key]
+			channel.version += 1
+		self._pool.release(nick_key, len(channel_keys))
+		return channel_keys
+
+	def rename(self, old_nickname: str, new_nickname: str):
+		"""Renames the user in all channels and returns the folded names of the
+		channels it was in."""
+		old_key = self._fold(old_nickname)
+		channel_keys = self._channels_of.pop(old_key, None)
+		if channel_keys is None:
+			return set()
+		# Acquire before releasing so that a change of case only updates the
+		# pooled nickname.
+		new_key = self._pool.acquire(new_nickname, len(channel_keys))
+		self._pool.release(old_key, len(channel_keys))
+		self._channels_of.setdefault(new_key, set()).update(channel_keys)
+		for channel_key in channel_keys:
+			channel = self._channels[channel_key]
+			channel.members[new_key] = channel.members.pop(old_key)
+			channel.version += 1
+			channel.log_added((new_key, ))
+		return channel_keys
+
+	def get_modes(self, channel_name: str, nickname: str):
+		"""Returns the MemberMode of the user in the channel or None if it is
+		not a member."""
+		channel = self._channels.get(self._fold(channel_name))
+		if channel is None:
+			return None
+		modes = channel.members.get(self._fold(nickname))
+		if modes is None:
+			return None
+		return MemberMode(modes)
+
+	def change_modes(self, channel_name: str, nickname: str, set_modes: int = 0, clear_modes: int = 0):
+		channel = self._channels.get(self._fold(channel_name))
+		if channel is None:
+			return
+		nick_key = self._fold(nickname)
+		modes = channel.members.get(nick_key)
+		if modes is not None:
+			channel.members[nick_key] = (modes | set_modes) & ~clear_modes
+
+	def _channel_members(self, channel_name: str):
+		channel = self._channels.get(self._fold(channel_name))
+		if channel is None:
+			return { }
+		return channel.members
+
+	def members_with(self, channel_name: str, modes: int):
+		"""Iterates over the nicknames of all members of the channel that have
+		any of the given modes."""
+		nickname = self._pool.nickname
+		return (nickname(nick_key) for (nick_key, member_modes) in self._channel_members(channel_name).items() if (member_modes & modes))
+
+	def is_member(self, channel_name: str, nickname: str):
+		return self._fold(nickname) in self._channel_members(channel_name)
+
+	def member_count(self, channel_name: str):
+		return len(self._channel_members(channel_name))
+
+	def members(self, channel_name: str):
+		"""Iterates over the nicknames of all members of the channel."""
+		nickname = self._pool.nickname
+		return (nickname(nick_key) for nick_key in self._channel_members(channel_name))
+
+	def version(self, channel_name: str):
+		channel = self._channels.get(self._fold(channel_name))
+		if channel is None:
+			return None
+		return channel.version
+
+	def members_added_since(self, channel_name: str, version: int):
+		"""Returns the nicknames of all current members of the channel that
+		joined (or were renamed) after the given version. The cost is
+		proportional to the number of joins since then, not to the size of
+		the channel."""
+		channel = self._channels.get(self._fold(channel_name))
+		if channel is None:
+			return set()
+		nickname = self._pool.nickname
+		return set(nickname(nick_key) for nick_key in channel.added_since(version))
+
+	def channels_of(self, nickname: str):
+		return iter(self._channels_of.get(self._fold(nickname), ()))
+
+	@property
+	def user_count(self):
+		return len(self._channels_of)
+
+	@property
+	def channel_count(self):
+		return len(self._channels)
@@ -0,0 +1,90 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+class NicknamePool():
+	"""Connection-wide pool of the nicknames of all users that share a
+	channel with us. Every user is represented by exactly one (folded) key
+	string and one nickname string which membership tables, origins and
+	callbacks share instead of each holding their own copy. Entries are
+	reference counted by their holders (one reference per channel
+	membership) and are dropped once the last one is released, e.g. on
+	QUIT."""
+
+	def __init__(self, fold = str.lower):
+		self._fold = fold
+		self._entries = { }
+		self._by_nickname = { }
+
+	def fold(self, name: str):
+		return self._fold(name)
+
+	def acquire(self, nickname: str, count: int = 1):
+		"""Takes count references to the user and returns its canonical key.
+		The nickname is updated if it changed its case."""
+		key = self._fold(nickname)
+		entry = self._entries.get(key)
+		if entry is None:
+			entry = [ key, nickname, 0 ]
+			self._entries[key] = entry
+			self._by_nickname[nickname] = nickname
+		elif entry[1] != nickname:
+			del self._by_nickname[entry[1]]
+			entry[1] = nickname
+			self._by_nickname[nickname] = nickname
+		entry[2] += count
+		return entry[0]
+
+	def release(self, key: str, count: int = 1):
+		entry = self._entries[key]
+		entry[2] -= count
+		if entry[2] <= 0:
+			del self._entries[key]
+			del self._by_nickname[entry[1]]
+
+	def key(self, nickname: str):
+		"""Returns the canonical key of a pooled user or None."""
+		entry = self._entries.get(self._fold(nickname))
+		if entry is None:
+			return None
+		return entry[0]
+
+	def nickname(self, key: str):
+		return self._entries[key][1]
+
+	def refcount(self, nickname: str):
+		entry = self._entries.get(self._fold(nickname))
+		if entry is None:
+			return 0
+		return entry[2]
+
+	def intern(self, nickname: str):
+		"""Returns the pooled instance of an equal nickname string if there is
+		one, otherwise the nickname itself. Does not take a reference."""
+		return self._by_nickname.get(nickname, nickname)
+
+	def __len__(self):
+		return len(self._entries)
+
+	def get_status(self):
+		return {
+			"nicknames":	len(self._entries),
+			"references":	sum(entry[2] for entry in self._entries.values()),
+		}
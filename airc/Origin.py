@@ -20,12 +20,18 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 import re
+import logging
 from airc.Exceptions import InvalidOriginException
 
+_log = logging.getLogger(__spec__.name)
+
 class Origin():
 	_ORIGIN_REGEX = re.compile(r":((?P<nickname>[^!]+)!(?P<username_is_alias>~?)(?P<username>[^@]+)@)?(?P<hostname>.*)")
+	__slots__ = ("_raw", "_intern", "_nickname", "_username", "_hostname", "_username_is_alias")
 
 	def __init__(self, nickname: str | None, username: str | None, hostname: str, username_is_alias: bool = False):
+		self._raw = None
+		self._intern = None
 		self._nickname = nickname
 		self._username = username
 		self._hostname = hostname
@@ -39,20 +45,68 @@ class Origin():
 		result = result.groupdict()
 		return cls(nickname = result["nickname"], username = result["username"], hostname = result["hostname"], username_is_alias = result["username_is_alias"] is not None)
 
+	@classmethod
+	def deferred(cls, text, intern = None):
+		"""Creates an origin that only keeps the raw text. The nickname is
+		determined by a simple scan when first needed, the regular expression
+		only runs when username or hostname are accessed. If given, intern is
+		used to replace the parsed nickname by a shared instance (see
+		NicknamePool.intern)."""
+		origin = cls.__new__(cls)
+		origin._raw = text
+		origin._intern = intern
+		origin._nickname = None
+		return origin
+
+	def _parse_nickname(self):
+		# Equivalent to the nickname group of the regular expression: a
+		# nickname is only present if it is followed by a non-empty username
+		# and an '@'.
+		raw = self._raw
+		bang = raw.find("!", 1)
+		if (bang > 1) and (raw.find("@", bang + 1) > bang + 1):
+			self._nickname = raw[1 : bang]
+			if self._intern is not None:
+				self._nickname = self._intern(self._nickname)
+		else:
+			self._nickname = ""
+
+	def _parse_full(self):
+		raw = self._raw
+		try:
+			parsed = self.parse(raw)
+			(self._nickname, self._username, self._hostname, self._username_is_alias) = (parsed._nickname, parsed._username, parsed._hostname, parsed._username_is_alias)
+			if (self._nickname is not None) and (self._intern is not None):
+				self._nickname = self._intern(self._nickname)
+		except InvalidOriginException as e:
+			_log.error("Could not parse origin string %s using regular expression: %s", raw, e)
+			(self._nickname, self._username, self._hostname, self._username_is_alias) = (None, None, raw, False)
+		self._raw = None
+
 	@property
 	def nickname(self):
+		if self._raw is not None:
+			if self._nickname is None:
+				self._parse_nickname()
+			return self._nickname or None
 		return self._nickname
 
 	@property
 	def username(self):
+		if self._raw is not None:
+			self._parse_full()
 		return self._username
 
 	@property
 	def hostname(self):
+		if self._raw is not None:
+			self._parse_full()
 		return self._hostname
 
 	@property
 	def username_is_alias(self):
+		if self._raw is not None:
+			self._parse_full()
 		return self._username_is_alias
 
 	@property
@@ -63,8 +117,8 @@ class Origin():
 	def is_user_msg(self):
 		return self.nickname is not None
 
-	def has_nickname(self, nickname):
-		return self.is_user_msg and (nickname.lower() == self.nickname.lower())
+	def has_nickname(self, nickname, fold = str.lower):
+		return self.is_user_msg and (fold(nickname) == fold(self.nickname))
 
 	def __str__(self):
 		if self.is_server_msg:
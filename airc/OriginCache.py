@@ -0,0 +1,73 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import functools
+from airc.Origin import Origin
+
+class OriginCache():
+	"""Bounded LRU cache that maps the raw origin prefix of a line to one
+	shared Origin instance. On a hit, neither decoding nor parsing of the
+	prefix is necessary and no new object is allocated."""
+
+	def __init__(self, maxsize: int, codec: str = "utf-8", intern = None):
+		self._codec = codec
+		self._intern = intern
+		self._maxsize = maxsize
+		self._lookup = functools.lru_cache(maxsize = maxsize)(self._create)
+
+	def _create(self, raw: bytes):
+		return Origin.deferred(raw.decode(self._codec, errors = "replace"), intern = self._intern)
+
+	def get(self, raw: bytes):
+		return self._lookup(raw)
+
+	def clear(self):
+		self._lookup.cache_clear()
+
+	@property
+	def maxsize(self):
+		return self._maxsize
+
+	@property
+	def hits(self):
+		return self._lookup.cache_info().hits
+
+	@property
+	def misses(self):
+		return self._lookup.cache_info().misses
+
+	@property
+	def hit_rate(self):
+		info = self._lookup.cache_info()
+		total = info.hits + info.misses
+		if total == 0:
+			return None
+		return info.hits / total
+
+	def get_status(self):
+		info = self._lookup.cache_info()
+		return {
+			"size":			info.currsize,
+			"maxsize":		self._maxsize,
+			"hits":			info.hits,
+			"misses":		info.misses,
+			"hit_rate":		self.hit_rate,
+		}
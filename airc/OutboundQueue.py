@@ -0,0 +1,151 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import asyncio
+import collections
+from airc.TokenBucket import TokenBucket
+from airc.Enums import TxPriority
+
+class OutboundQueue():
+	"""Paces all lines sent to the server. Lines are queued per priority
+	class and released strictly in priority order according to the token
+	bucket (if any); all lines released at once are coalesced into a single
+	write. After each write the transport is drained so that the queue, not
+	the transport buffer, absorbs backlog. Bulk traffic never consumes the
+	last reserved tokens (as far as the burst size permits), so keepalive
+	and registration lines can always be sent right away."""
+
+	_Entry = collections.namedtuple("Entry", [ "data", "expect", "enqueued" ])
+
+	def __init__(self, protocol, token_bucket: TokenBucket | None = None, sent_callback = None, bulk_reserved_tokens: int = 1):
+		self._protocol = protocol
+		self._token_bucket = token_bucket
+		self._sent_callback = sent_callback
+		if token_bucket is None:
+			self._bulk_reserved_tokens = 0
+		else:
+			# Bulk traffic must always be able to get at least one token once
+			# the bucket is full, otherwise it would starve with small bursts.
+			self._bulk_reserved_tokens = max(0, min(bulk_reserved_tokens, int(token_bucket.burst) - 1))
+		self._queues = { priority: collections.deque() for priority in TxPriority }
+		self._wakeup = None
+		self._stats = { priority: { "sent": 0, "total_wait": 0, "max_wait": 0 } for priority in TxPriority }
+		self._bytes_sent = 0
+		self._writes = 0
+
+	@property
+	def depth(self):
+		return sum(len(queue) for queue in self._queues.values())
+
+	def class_depth(self, priority: TxPriority):
+		return len(self._queues[priority])
+
+	@property
+	def token_bucket(self):
+		return self._token_bucket
+
+	def _wake(self):
+		if (self._wakeup is not None) and (not self._wakeup.done()):
+			self._wakeup.set_result(None)
+
+	async def _wait(self, timeout = None):
+		loop = asyncio.get_running_loop()
+		self._wakeup = loop.create_future()
+		timer = None if (timeout is None) else loop.call_later(timeout, self._wake)
+		try:
+			await self._wakeup
+		finally:
+			self._wakeup = None
+			if timer is not None:
+				timer.cancel()
+
+	def put(self, data: bytes, expect = None, priority: TxPriority = TxPriority.Control):
+		self._queues[priority].append(self._Entry(data = data, expect = expect, enqueued = asyncio.get_running_loop().time()))
+		self._wake()
+
+	def _take_entries(self):
+		if self._token_bucket is None:
+			available = self.depth
+		else:
+			available = int(self._token_bucket.tokens)
+
+		entries = [ ]
+		for (priority, queue) in self._queues.items():
+			limit = available
+			if priority == TxPriority.Bulk:
+				limit -= self._bulk_reserved_tokens
+			while (len(queue) > 0) and (len(entries) < limit):
+				entries.append((priority, queue.popleft()))
+
+		if self._token_bucket is not None:
+			self._token_bucket.consume(len(entries))
+		return entries
+
+	def _tokens_needed(self):
+		if (len(self._queues[TxPriority.Urgent]) > 0) or (len(self._queues[TxPriority.Control]) > 0):
+			return 1
+		return 1 + self._bulk_reserved_tokens
+
+	def _record_sent(self, entries):
+		now = asyncio.get_running_loop().time()
+		for (priority, entry) in entries:
+			wait = now - entry.enqueued
+			stats = self._stats[priority]
+			stats["sent"] += 1
+			stats["total_wait"] += wait
+			stats["max_wait"] = max(stats["max_wait"], wait)
+			if (entry.expect is not None) and (self._sent_callback is not None):
+				self._sent_callback(entry.expect)
+
+	async def run(self):
+		while True:
+			if self.depth == 0:
+				await self._wait()
+				continue
+
+			entries = self._take_entries()
+			if len(entries) == 0:
+				await self._wait(self._token_bucket.delay(self._tokens_needed()))
+				continue
+
+			data = b"".join(entry.data for (priority, entry) in entries)
+			self._protocol.write(data)
+			self._bytes_sent += len(data)
+			self._writes += 1
+			self._record_sent(entries)
+			await self._protocol.drain()
+
+	def get_status(self):
+		classes = { }
+		for (priority, stats) in self._stats.items():
+			classes[priority.name.lower()] = {
+				"depth":		len(self._queues[priority]),
+				"sent":			stats["sent"],
+				"avg_wait":		(stats["total_wait"] / stats["sent"]) if (stats["sent"] > 0) else None,
+				"max_wait":		stats["max_wait"],
+			}
+		return {
+			"depth":		self.depth,
+			"lines_sent":	sum(stats["sent"] for stats in self._stats.values()),
+			"bytes_sent":	self._bytes_sent,
+			"writes":		self._writes,
+			"classes":		classes,
+		}
@@ -0,0 +1,178 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+from airc.ExpectedResponse import ExpectedResponse
+from airc.TimerWheel import TimerWheel
+
+class PendingResponses():
+	"""Keeps track of all ExpectedResponse objects that are waiting for
+	messages on a connection. Responses are indexed by their index keys so
+	that a received message is only fed to the responses it can possibly
+	satisfy. Dicts serve as insertion-ordered sets with O(1) removal.
+
+	Responses that carry a timeout are expired by the timer wheel of the
+	connection; a response whose future is done (completed, expired or
+	cancelled by its awaiter) is removed immediately."""
+
+	def __init__(self, fold = str.lower, timer_wheel: TimerWheel | None = None):
+		# fold is the server's casemapping, e.g. ISupport.fold
+		self._fold = fold
+		self._timer_wheel = timer_wheel if (timer_wheel is not None) else TimerWheel()
+		self._unindexed = { }
+		self._keys = { }
+		self._by_cmdcode = { }
+		self._by_key = { }
+		self._locators = { }
+		self._count = 0
+		self._timers = { }
+
+	@staticmethod
+	def _normalize_cmdcode(cmdcode):
+		if isinstance(cmdcode, str):
+			return cmdcode.upper()
+		return cmdcode
+
+	def _locate(self, msg, locator):
+		if locator == ExpectedResponse.ORIGIN:
+			if msg.origin is None:
+				return None
+			return msg.origin.nickname
+		return msg.get_param(locator)
+
+	def _add_to(self, index, key, expect):
+		bucket = index.get(key)
+		if bucket is None:
+			bucket = { }
+			index[key] = bucket
+		bucket[expect] = None
+
+	def _remove_from(self, index, key, expect):
+		bucket = index[key]
+		del bucket[expect]
+		if len(bucket) == 0:
+			del index[key]
+
+	def _normalized_keys(self, expect):
+		return set((self._normalize_cmdcode(key.cmdcode), key.locator, None if (key.locator is None) else self._fold(key.value)) for key in expect.index_keys)
+
+	def add(self, expect: ExpectedResponse, arm: bool = True):
+		"""Adds the response to the index. Its timeout (if any) starts
+		counting when it is armed, by default right away."""
+		if not expect.index_keys:
+			self._unindexed[expect] = None
+		else:
+			# Keys are remembered as they were folded when adding so that
+			# removal still works if the casemapping changes in between.
+			keys = self._normalized_keys(expect)
+			self._keys[expect] = keys
+			for (cmdcode, locator, value) in keys:
+				if locator is None:
+					self._add_to(self._by_cmdcode, cmdcode, expect)
+				else:
+					self._add_to(self._by_key, (cmdcode, locator, value), expect)
+					locators = self._locators.setdefault(cmdcode, { })
+					locators[locator] = locators.get(locator, 0) + 1
+		self._count += 1
+		expect.future.add_done_callback(lambda future: self.remove(expect))
+		if arm:
+			self.arm(expect)
+
+	def arm(self, expect: ExpectedResponse):
+		if (expect.timeout is not None) and (not expect.future.done()) and (expect not in self._timers):
+			self._timers[expect] = self._timer_wheel.call_later(expect.timeout, self._expire, expect)
+
+	def remove(self, expect: ExpectedResponse):
+		timer = self._timers.pop(expect, None)
+		if timer is not None:
+			timer.cancel()
+		if not expect.index_keys:
+			if expect not in self._unindexed:
+				return
+			del self._unindexed[expect]
+		else:
+			keys = self._keys.pop(expect, None)
+			if keys is None:
+				return
+
+			for (cmdcode, locator, value) in keys:
+				if locator is None:
+					self._remove_from(self._by_cmdcode, cmdcode, expect)
+				else:
+					self._remove_from(self._by_key, (cmdcode, locator, value), expect)
+					locators = self._locators[cmdcode]
+					locators[locator] -= 1
+					if locators[locator] == 0:
+						del locators[locator]
+						if len(locators) == 0:
+							del self._locators[cmdcode]
+		self._count -= 1
+
+	def _expire(self, expect: ExpectedResponse):
+		self.remove(expect)
+		expect.expire()
+
+	def cancel_all(self):
+		for expect in list(self):
+			expect.cancel()
+		for timer in self._timers.values():
+			timer.cancel()
+		self._timers.clear()
+
+	def wants_cmdcode(self, cmdcode):
+		"""Returns if any pending response might be interested in a message
+		with the given (normalized) command code."""
+		return (len(self._unindexed) > 0) or (cmdcode in self._by_cmdcode) or (cmdcode in self._locators)
+
+	def candidates(self, msg):
+		"""Returns all responses that need to be fed the given message."""
+		candidates = dict(self._unindexed)
+		cmdcode = msg.cmdcode
+		bucket = self._by_cmdcode.get(cmdcode)
+		if bucket is not None:
+			candidates.update(bucket)
+		locators = self._locators.get(cmdcode)
+		if locators is not None:
+			for locator in locators:
+				value = self._locate(msg, locator)
+				if value is None:
+					continue
+				bucket = self._by_key.get((cmdcode, locator, self._fold(value)))
+				if bucket is not None:
+					candidates.update(bucket)
+		return candidates
+
+	def feed(self, msg):
+		if self._count == 0:
+			return
+		for expect in self.candidates(msg):
+			if not expect.feed(msg):
+				self.remove(expect)
+
+	def __len__(self):
+		return self._count
+
+	def __iter__(self):
+		responses = dict(self._unindexed)
+		for bucket in self._by_cmdcode.values():
+			responses.update(bucket)
+		for bucket in self._by_key.values():
+			responses.update(bucket)
+		return iter(responses)
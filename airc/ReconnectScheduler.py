@@ -0,0 +1,129 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import time
+import random
+
+class _ServerHealth():
+	__slots__ = [ "index", "successes", "failures", "consecutive_failures", "latency", "last_failure" ]
+
+	def __init__(self, index):
+		self.index = index
+		self.successes = 0
+		self.failures = 0
+		self.consecutive_failures = 0
+		self.latency = None
+		self.last_failure = None
+
+	@property
+	def sort_key(self):
+		# Healthy before failing servers, the fastest known ones first and
+		# servers without measurement in between. Ties keep the configured
+		# order.
+		return (self.consecutive_failures, 0 if (self.latency is not None) else 1, self.latency or 0, self.index)
+
+	def as_dict(self):
+		return {
+			"successes":			self.successes,
+			"failures":				self.failures,
+			"consecutive_failures":	self.consecutive_failures,
+			"latency":				self.latency,
+			"last_failure":			self.last_failure,
+		}
+
+class ReconnectScheduler():
+	"""Decides the order in which the servers of a network are tried and how
+	long to wait in between. Every server gets a health record from its
+	connection attempts (successes, failures and an exponentially weighted
+	average of the time it took to register) and servers are tried in the
+	order of their health.
+
+	Delays use "decorrelated jitter" exponential backoff: each delay is drawn
+	uniformly between the base delay (as configured for the kind of failure)
+	and three times the previous delay, capped. Many clients that lost their
+	connection at the same time therefore do not reconnect in lockstep. The
+	backoff (and the failure count of the server) is only reset once a
+	connection has proven to be stable, so servers that accept registration
+	and then drop the connection right away keep backing off. After a clean close (no
+	base delay) a short random delay is still applied so that a server
+	restart does not get all clients back at the same instant."""
+
+	_LATENCY_WEIGHT = 0.3
+
+	def __init__(self, irc_servers: list, backoff_cap_secs: float = 300, clean_close_jitter_secs: float = 5, rng: random.Random | None = None):
+		self._health = { irc_server: _ServerHealth(index) for (index, irc_server) in enumerate(irc_servers) }
+		self._backoff_cap_secs = backoff_cap_secs
+		self._clean_close_jitter_secs = clean_close_jitter_secs
+		self._rng = rng if (rng is not None) else random.Random()
+		self._previous_delay = None
+
+	@property
+	def backoff_cap_secs(self):
+		return self._backoff_cap_secs
+
+	@backoff_cap_secs.setter
+	def backoff_cap_secs(self, value: float):
+		self._backoff_cap_secs = value
+
+	@property
+	def clean_close_jitter_secs(self):
+		return self._clean_close_jitter_secs
+
+	@clean_close_jitter_secs.setter
+	def clean_close_jitter_secs(self, value: float):
+		self._clean_close_jitter_secs = value
+
+	def ordered_servers(self):
+		return sorted(self._health, key = lambda irc_server: self._health[irc_server].sort_key)
+
+	def record_success(self, irc_server, latency: float):
+		health = self._health[irc_server]
+		health.successes += 1
+		if health.latency is None:
+			health.latency = latency
+		else:
+			health.latency += self._LATENCY_WEIGHT * (latency - health.latency)
+
+	def record_stable(self, irc_server):
+		health = self._health[irc_server]
+		health.consecutive_failures = 0
+		self._previous_delay = None
+
+	def record_failure(self, irc_server):
+		health = self._health[irc_server]
+		health.failures += 1
+		health.consecutive_failures += 1
+		health.last_failure = time.time()
+
+	def next_delay(self, base_delay: float):
+		if base_delay <= 0:
+			# Clean close: does not count towards the backoff
+			return self._rng.uniform(0, self._clean_close_jitter_secs)
+		previous_delay = self._previous_delay if (self._previous_delay is not None) else base_delay
+		delay = min(self._backoff_cap_secs, self._rng.uniform(base_delay, max(base_delay, 3 * previous_delay)))
+		self._previous_delay = delay
+		return delay
+
+	def get_status(self):
+		return {
+			"servers":			[ dict(self._health[irc_server].as_dict(), server = str(irc_server)) for irc_server in self.ordered_servers() ],
+			"previous_delay":	self._previous_delay,
+		}
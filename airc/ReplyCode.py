@@ -27,6 +27,7 @@ class ReplyCode(enum.IntEnum):
 	RPL_CREATED = 3
 	RPL_MYINFO = 4
 	RPL_BOUNCE = 5
+	RPL_ISUPPORT = 5
 	RPL_USERHOST = 302
 	RPL_ISON = 303
 	RPL_AWAY = 301
@@ -173,3 +174,8 @@ class ReplyCode(enum.IntEnum):
 	ERR_NOOPERHOST = 491
 	ERR_UMODEUNKNOWNFLAG = 501
 	ERR_USERSDONTMATCH = 502
+
+# Maps every three-digit numeric command code as received on the wire to
+# its ReplyCode or, for numerics unknown to us, to the plain integer.
+NUMERIC_CMDCODES = { f"{value:03d}".encode("ascii"): value for value in range(1000) }
+NUMERIC_CMDCODES.update({ f"{member.value:03d}".encode("ascii"): member for member in ReplyCode })
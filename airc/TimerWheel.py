@@ -0,0 +1,277 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import math
+import asyncio
+import logging
+
+_log = logging.getLogger(__spec__.name)
+
+class TimerHandle():
+	__slots__ = [ "_wheel", "_tick", "_when", "_callback", "_args", "_slot" ]
+
+	def __init__(self, wheel: "TimerWheel", tick: int, when: float, callback, args: tuple):
+		self._wheel = wheel
+		self._tick = tick
+		self._when = when
+		self._callback = callback
+		self._args = args
+		self._slot = None
+
+	@property
+	def when(self):
+		return self._when
+
+	@property
+	def active(self):
+		return self._slot is not None
+
+	@property
+	def cancelled(self):
+		return (self._callback is None) and (self._slot is None)
+
+	def cancel(self):
+		if self._slot is not None:
+			self._wheel._remove(self)
+		self._callback = None
+		self._args = None
+
+	def __repr__(self):
+		return f"TimerHandle<{self._when:.1f}, {'active' if self.active else 'inactive'}>"
+
+class TimerWheel():
+	"""Hierarchical timing wheel that serves all timeouts of one or more
+	connections off a single event loop timer. Time is divided into ticks of
+	the given resolution; every level has 2^slot_bits slots, each slot of a
+	level spanning a whole revolution of the level below. A timer is put into
+	the level of the most significant tick digit in which its deadline
+	differs from the current tick and is moved down ("cascaded") once the
+	wheel reaches that digit, so scheduling and cancelling are O(1).
+
+	Timers never fire early, but up to one tick late. The event loop is only
+	woken up for ticks at which a timer expires or needs to be cascaded; an
+	idle wheel has no loop timer at all."""
+
+	def __init__(self, resolution: float = 0.1, slot_bits: int = 6, levels: int = 4):
+		self._resolution = resolution
+		self._slot_bits = slot_bits
+		self._slot_mask = (1 << slot_bits) - 1
+		self._levels = [ [ { } for _ in range(1 << slot_bits) ] for _ in range(levels) ]
+		self._overflow = { }
+		self._tick = 0
+		self._count = 0
+		self._fired = 0
+		self._timer = None
+		self._timer_tick = None
+
+	@property
+	def resolution(self):
+		return self._resolution
+
+	@staticmethod
+	def time():
+		return asyncio.get_running_loop().time()
+
+	def call_later(self, delay: float, callback, *args):
+		return self.call_at(self.time() + delay, callback, *args)
+
+	def call_at(self, when: float, callback, *args):
+		"""Calls callback(*args) once the event loop time reaches 'when'.
+		Returns a TimerHandle that can be used to cancel the call."""
+		if self._count == 0:
+			# Idle wheel, nothing to cascade: just jump to the present.
+			self._tick = math.floor(self.time() / self._resolution)
+		tick = max(math.ceil(when / self._resolution), self._tick + 1)
+		handle = TimerHandle(self, tick, when, callback, args)
+		event_tick = self._place(handle)
+		self._count += 1
+		if (self._timer_tick is None) or (event_tick < self._timer_tick):
+			self._arm(event_tick)
+		return handle
+
+	async def sleep(self, delay: float):
+		if delay <= 0:
+			await asyncio.sleep(0)
+			return
+		future = asyncio.get_running_loop().create_future()
+		handle = self.call_later(delay, self._resolve, future)
+		try:
+			await future
+		finally:
+			handle.cancel()
+
+	async def wait_for(self, awaitable, timeout: float | None):
+		"""Like asyncio.wait_for(), but the timeout is served by the wheel."""
+		future = asyncio.ensure_future(awaitable)
+		if timeout is None:
+			return await future
+
+		timed_out = False
+		def _expire():
+			nonlocal timed_out
+			timed_out = True
+			future.cancel()
+
+		handle = self.call_later(timeout, _expire)
+		try:
+			return await future
+		except asyncio.exceptions.CancelledError as e:
+			if timed_out:
+				raise asyncio.exceptions.TimeoutError(f"Timed out after {timeout} seconds.") from e
+			raise
+		finally:
+			handle.cancel()
+
+	@staticmethod
+	def _resolve(future):
+		if not future.done():
+			future.set_result(None)
+
+	def _place(self, handle: TimerHandle):
+		# Returns the tick at which the wheel next needs to look at the
+		# handle, i.e., its deadline or the tick it needs to be cascaded at.
+		difference = handle._tick ^ self._tick
+		level = (difference.bit_length() - 1) // self._slot_bits if (difference > 0) else 0
+		if level >= len(self._levels):
+			slot = self._overflow
+			shift = len(self._levels) * self._slot_bits
+			event_tick = ((self._tick >> shift) + 1) << shift
+		else:
+			shift = level * self._slot_bits
+			slot = self._levels[level][(handle._tick >> shift) & self._slot_mask]
+			event_tick = (handle._tick >> shift) << shift
+		slot[handle] = None
+		handle._slot = slot
+		return event_tick
+
+	def _remove(self, handle: TimerHandle):
+		del handle._slot[handle]
+		handle._slot = None
+		self._count -= 1
+		if self._count == 0:
+			self._disarm()
+
+	def _next_event_tick(self):
+		# Levels are ordered: anything pending on a lower level is due
+		# before anything on a higher level needs cascading.
+		for (level, slots) in enumerate(self._levels):
+			shift = level * self._slot_bits
+			for index in range(((self._tick >> shift) & self._slot_mask) + 1, len(slots)):
+				if len(slots[index]) > 0:
+					return (((self._tick >> shift) & ~self._slot_mask) | index) << shift
+		if len(self._overflow) > 0:
+			shift = len(self._levels) * self._slot_bits
+			return ((self._tick >> shift) + 1) << shift
+		return None
+
+	def _cascade(self, previous_tick: int):
+		shift = len(self._levels) * self._slot_bits
+		if (len(self._overflow) > 0) and ((self._tick >> shift) != (previous_tick >> shift)):
+			handles = list(self._overflow)
+			self._overflow.clear()
+			for handle in handles:
+				self._place(handle)
+		for level in range(len(self._levels) - 1, 0, -1):
+			shift = level * self._slot_bits
+			if (self._tick >> shift) == (previous_tick >> shift):
+				continue
+			slot = self._levels[level][(self._tick >> shift) & self._slot_mask]
+			if len(slot) > 0:
+				handles = list(slot)
+				slot.clear()
+				for handle in handles:
+					self._place(handle)
+
+	def _advance(self, target_tick: int):
+		while self._count > 0:
+			event_tick = self._next_event_tick()
+			if event_tick > target_tick:
+				break
+			previous_tick = self._tick
+			self._tick = event_tick
+			self._cascade(previous_tick)
+
+			slot = self._levels[0][event_tick & self._slot_mask]
+			if len(slot) == 0:
+				continue
+			handles = list(slot)
+			slot.clear()
+			self._count -= len(handles)
+			for handle in handles:
+				handle._slot = None
+			for handle in handles:
+				# A callback may have cancelled another handle of this tick.
+				(callback, args) = (handle._callback, handle._args)
+				if callback is None:
+					continue
+				handle._callback = None
+				handle._args = None
+				self._fired += 1
+				try:
+					callback(*args)
+				except Exception:
+					_log.exception("Timer callback %s raised an exception.", callback)
+
+	def expire(self, now: float | None = None):
+		"""Runs all timers that are due at the given event loop time (by
+		default the current one)."""
+		if now is None:
+			now = self.time()
+		self._advance(math.floor(now / self._resolution))
+		self._schedule()
+
+	def _run(self):
+		# The loop timer may fire a hair early, the tick it was armed for is
+		# due nonetheless.
+		fired_tick = self._timer_tick
+		self._timer = None
+		self._timer_tick = None
+		self._advance(max(math.floor(self.time() / self._resolution), fired_tick))
+		self._schedule()
+
+	def _schedule(self):
+		event_tick = self._next_event_tick()
+		if event_tick is None:
+			self._disarm()
+		elif event_tick != self._timer_tick:
+			self._arm(event_tick)
+
+	def _arm(self, event_tick: int):
+		if self._timer is not None:
+			self._timer.cancel()
+		self._timer_tick = event_tick
+		self._timer = asyncio.get_running_loop().call_at(event_tick * self._resolution, self._run)
+
+	def _disarm(self):
+		if self._timer is not None:
+			self._timer.cancel()
+		self._timer = None
+		self._timer_tick = None
+
+	def __len__(self):
+		return self._count
+
+	def get_status(self):
+		return {
+			"timers":		self._count,
+			"fired":		self._fired,
+			"resolution":	self._resolution,
+		}
@@ -0,0 +1,62 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import time
+
+class TokenBucket():
+	def __init__(self, rate: float, burst: float, clock = time.monotonic):
+		self._rate = rate
+		self._burst = burst
+		self._clock = clock
+		self._tokens = burst
+		self._last_refill = clock()
+
+	@property
+	def rate(self):
+		return self._rate
+
+	@property
+	def burst(self):
+		return self._burst
+
+	def _refill(self):
+		now = self._clock()
+		self._tokens = min(self._burst, self._tokens + ((now - self._last_refill) * self._rate))
+		self._last_refill = now
+
+	@property
+	def tokens(self):
+		self._refill()
+		return self._tokens
+
+	def consume(self, count: float = 1):
+		self._refill()
+		if self._tokens < count:
+			return False
+		self._tokens -= count
+		return True
+
+	def delay(self, count: float = 1):
+		"""Returns the number of seconds until 'count' tokens are available."""
+		self._refill()
+		if self._tokens >= count:
+			return 0
+		return (count - self._tokens) / self._rate
@@ -23,25 +23,80 @@ import collections
 import datetime
 import asyncio
 import re
-from airc.Enums import Usermode
+from airc.Enums import Usermode, MemberMode
 
 class NameTools():
-	_Nickname = collections.namedtuple("Nickname", [ "nickname", "mode" ])
+	_Nickname = collections.namedtuple("Nickname", [ "nickname", "mode", "userhost", "modes" ], defaults = [ None, 0 ])
+	_PREFIXES = "~&@%+"
+	_PREFIX_FLAGS = {
+		"~":	int(MemberMode.Owner),
+		"&":	int(MemberMode.Admin),
+		"@":	int(MemberMode.Op),
+		"%":	int(MemberMode.HalfOp),
+		"+":	int(MemberMode.Voice),
+	}
 
 	@classmethod
-	def parse_nickname(cls, nickname: str):
-		if nickname.startswith("@"):
-			nickname = nickname[1:]
+	def parse_nickname(cls, nickname: str, isupport: "ISupport | None" = None):
+		# With multi-prefix, all prefixes of a user are listed ("@+nick"), with
+		# userhost-in-names the name is given as "nick!user@host". If the
+		# server's ISUPPORT is given, its PREFIX is used to interpret them.
+		if isupport is None:
+			stripped = nickname.lstrip(cls._PREFIXES)
+			prefixes = nickname[ : len(nickname) - len(stripped)]
+			modes = 0
+			for prefix in prefixes:
+				modes |= cls._PREFIX_FLAGS[prefix]
+		else:
+			(prefixes, stripped) = isupport.strip_prefixes(nickname)
+			modes = isupport.prefix_to_flags(prefixes)
+		if modes & (MemberMode.Op | MemberMode.Admin | MemberMode.Owner):
 			mode = Usermode.Op
-		elif nickname.startswith("+"):
-			nickname = nickname[1:]
+		elif modes & MemberMode.Voice:
 			mode = Usermode.Voice
 		else:
 			mode = Usermode.Regular
-		return cls._Nickname(nickname = nickname, mode = mode)
+		if "!" in stripped:
+			(stripped, userhost) = stripped.split("!", maxsplit = 1)
+		else:
+			userhost = None
+		return cls._Nickname(nickname = stripped, mode = mode, userhost = userhost, modes = modes)
+
+	@classmethod
+	def parse_names(cls, names: list, isupport: "ISupport | None" = None):
+		"""Bulk variant of parse_nickname() for all entries of a NAMES reply.
+		Returns a list of (nickname, modes) tuples. Prefixes are stripped from
+		all names in one pass and the modes of every distinct prefix
+		combination are only computed once."""
+		if isupport is None:
+			(prefixes, prefix_flags) = (cls._PREFIXES, cls._PREFIX_FLAGS)
+		else:
+			(prefixes, prefix_flags) = (isupport.prefixes, isupport.prefix_flags)
+		names = [ name for name in names if name != "" ]
+		stripped = [ name.lstrip(prefixes) for name in names ]
+		if any("!" in name for name in stripped):
+			# userhost-in-names
+			nicknames = [ name.partition("!")[0] for name in stripped ]
+		else:
+			nicknames = stripped
+
+		modes_of_prefix = { "": 0 }
+		result = [ ]
+		for (name, stripped_name, nickname) in zip(names, stripped, nicknames):
+			prefix = name[ : len(name) - len(stripped_name)]
+			modes = modes_of_prefix.get(prefix)
+			if modes is None:
+				modes = 0
+				for prefix_char in prefix:
+					modes |= prefix_flags[prefix_char]
+				modes_of_prefix[prefix] = modes
+			result.append((nickname, modes))
+		return result
 
 	@classmethod
-	def is_channel_name(cls, name: str):
+	def is_channel_name(cls, name: str, isupport: "ISupport | None" = None):
+		if isupport is not None:
+			return isupport.is_channel_name(name)
 		return (len(name) > 0) and (name[0] in "#&+!")
 
 class TextTools():
@@ -79,6 +134,40 @@ class AsyncTools():
 		server = await asyncio.start_server(accept_callback, host, port, backlog = 1, reuse_address = True, reuse_port = True)
 		return (server, future)
 
+	@classmethod
+	async def staggered_race(cls, attempts: list, stagger: float | None, discard = None):
+		"""Runs the coroutine functions in the given order. Each one is started
+		once the previous one failed or 'stagger' seconds after it was started,
+		whatever comes first. The first one to succeed wins, all others are
+		cancelled; results of attempts that succeeded at the same time are passed
+		to 'discard'. Returns a tuple of (index, result) of the winner (or None)
+		and a list of (index, exception) of all failed attempts."""
+		remaining = list(enumerate(attempts))
+		tasks = { }
+		failures = [ ]
+		winner = None
+		try:
+			while (winner is None) and ((len(remaining) > 0) or (len(tasks) > 0)):
+				if len(remaining) > 0:
+					(index, attempt) = remaining.pop(0)
+					tasks[asyncio.create_task(attempt())] = index
+				timeout = stagger if (len(remaining) > 0) else None
+				(done, pending) = await asyncio.wait(tasks, timeout = timeout, return_when = asyncio.FIRST_COMPLETED)
+				for task in done:
+					index = tasks.pop(task)
+					if task.exception() is not None:
+						failures.append((index, task.exception()))
+					elif winner is None:
+						winner = (index, task.result())
+					elif discard is not None:
+						discard(task.result())
+		finally:
+			for task in tasks:
+				task.cancel()
+			if len(tasks) > 0:
+				await asyncio.wait(tasks)
+		return (winner, failures)
+
 class NumberTools():
 	@classmethod
 	def round_down(cls, value, boundary):
@@ -28,5 +28,6 @@ from .IRCServer import IRCServer
 from .IRCIdentity import IRCIdentity
 from .IRCIdentityGenerator import ListIRCIdentityGenerator
 from .IRCNetwork import IRCNetwork
+from .IRCNetworkSupervisor import IRCNetworkSupervisor
 
 VERSION = "0.0.1"
@@ -19,17 +19,18 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
-import asyncio
 import logging
 import datetime
 from airc.Channel import Channel
-from airc.ExpectedResponse import ExpectedResponse
-from airc.Enums import IRCTimeout, IRCCallbackType, DCCMessageType, StatEvent
+from airc.MembershipStore import MembershipStore
+from airc.Enums import IRCCallbackType, DCCMessageType, StatEvent
 from airc.ReplyCode import ReplyCode
 from airc.Tools import NameTools, TimeTools
 from airc.dcc.DCCRequest import DCCRequestParser
 from airc.AsyncBackgroundTasks import AsyncBackgroundTasks
 from .RawIRCClient import RawIRCClient
+from .JoinScheduler import JoinScheduler
+from .CommandDispatcher import command_handler
 
 _log = logging.getLogger(__spec__.name)
 
@@ -39,52 +40,33 @@ class BasicIRCClient(RawIRCClient):
 		self._bg_tasks = AsyncBackgroundTasks()
 		self._bg_tasks.create_task(self._autojoin_channel_coroutine())
 		self._channels = { }
+		self._membership = MembershipStore(nickname_pool = self._irc_connection.nickname_pool)
+		self._names_staging = { }
+		self._join_scheduler = JoinScheduler(self)
 
 	@property
 	def channels(self):
 		return self._channels.values()
 
+	@property
+	def membership(self):
+		return self._membership
+
+	@property
+	def join_scheduler(self):
+		return self._join_scheduler
+
 	def get_channel(self, channel_name):
 		if channel_name is None:
 			return None
-		return self._channels.get(channel_name.lower())
-
-	async def _join_channel_loop(self, channel_name):
-		channel = Channel(channel_name)
-		self._channels[channel_name.lower()] = channel
-		while True:
-			if not channel.joined:
-				channel.record_stat(StatEvent.ChannelJoinAttempt)
-				finish_conditions = tuple([lambda msg: (msg.is_cmdcode("join") and msg.has_param(0, channel.name, ignore_case = True)) or (msg.is_cmdcode(ReplyCode.ERR_BANNEDFROMCHAN) and msg.has_param(1, channel.name, ignore_case = True)) ])
-				try:
-					response = await asyncio.wait_for(self._irc_connection.tx_message(f"JOIN {channel.name}", expect = ExpectedResponse(finish_conditions = finish_conditions)), timeout = self.config.timeout(IRCTimeout.JoinChannelTimeoutSecs))
-					response = response[0]
-					if response.is_cmdcode("JOIN"):
-						channel.joined = True
-						channel.record_stat(StatEvent.ChannelJoinSuccess)
-					else:
-						reason = response.get_param(2)
-						delay = self.config.timeout(IRCTimeout.RejoinChannelBannedTimeSecs)
-						_log.error("Joining of %s did not work because we are banned (%s), waiting for %d seconds before retrying.", channel.name, reason, delay)
-						channel.record_stat(StatEvent.ChannelJoinFailureBanned)
-				except asyncio.exceptions.TimeoutError:
-					delay = self.config.timeout(IRCTimeout.JoinChannelTimeoutSecs)
-					_log.error("Joining of %s timed out, waiting for %d seconds before retrying.", channel.name, delay)
-					channel.record_stat(StatEvent.ChannelJoinFailureTimeout)
-					await asyncio.sleep(delay)
-
-			joined_before = channel.joined
-			await channel.event()
-			if joined_before and (not channel.joined):
-				# We were kicked. Delay and retry
-				delay = self.config.timeout(IRCTimeout.RejoinChannelTimeSecs)
-				_log.info("Will rejoin %s after %d seconds.", channel.name, delay)
-				await asyncio.sleep(delay)
+		return self._channels.get(self.fold(channel_name))
 
 	def _add_autojoin_channel(self, channel_name):
-		taskname = f"autojoin-{channel_name}"
-		if not self._bg_tasks.have_task(taskname):
-			self._bg_tasks.create_task(self._join_channel_loop(channel_name), taskname)
+		key = self.fold(channel_name)
+		if key not in self._channels:
+			channel = Channel(channel_name, self._membership)
+			self._channels[key] = channel
+			self._join_scheduler.join(channel)
 
 	async def _autojoin_channel_coroutine(self):
 		await self._irc_connection.registration_complete.wait()
@@ -94,6 +76,13 @@ class BasicIRCClient(RawIRCClient):
 			self.config.autojoin_channels_changed.clear()
 			await self.config.autojoin_channels_changed.wait()
 
+	def handle_connection_lost(self):
+		super().handle_connection_lost()
+		self._join_scheduler.cancel_all()
+
+	def _is_our_nickname(self, nickname):
+		return (self.our_nickname is not None) and (self.fold(nickname) == self.fold(self.our_nickname))
+
 	def _handle_ctcp_request(self, nickname, text):
 		# If it's already handled internally, return True. Otherwise return
 		# False and it will be propagated to the application.
@@ -128,72 +117,132 @@ class BasicIRCClient(RawIRCClient):
 		# False and it will be propagated to the application.
 		pass
 
-	def handle_msg(self, msg):
-		super().handle_msg(msg)
-
+	@command_handler(ReplyCode.RPL_NAMREPLY)
+	def _handle_namreply(self, msg):
 		if msg.origin is None:
 			return
+		channel = self.get_channel(msg.get_param(2))
+		if channel is not None:
+			# Names are only collected here, the roster is replaced as a whole
+			# once the end of the list is reached.
+			self._names_staging.setdefault(self.fold(channel.name), [ ]).extend(msg.get_param(3, "").split(" "))
+
+	@command_handler(ReplyCode.RPL_ENDOFNAMES)
+	def _handle_endofnames(self, msg):
+		channel = self.get_channel(msg.get_param(1))
+		if channel is None:
+			return
+		names = self._names_staging.pop(self.fold(channel.name), None)
+		if names is not None:
+			channel.replace_users(NameTools.parse_names(names, self.isupport))
 
-		if msg.is_cmdcode(ReplyCode.RPL_NAMREPLY):
-			channel = self.get_channel(msg.get_param(2))
-			if channel is not None:
-				nicknames = msg.get_param(3, "").split(" ")
-				for nickname in nicknames:
-					nickname = NameTools.parse_nickname(nickname)
-					channel.add_user(nickname.nickname)
-		elif msg.is_cmdcode("JOIN") and msg.origin.is_user_msg:
-			channel = self.get_channel(msg.get_param(0))
-			if channel is not None:
-				channel.add_user(msg.origin.nickname)
-		elif msg.is_cmdcode("PART") and msg.origin.is_user_msg:
-			channel = self.get_channel(msg.get_param(0))
-			if channel is not None:
-				channel.remove_user(msg.origin.nickname)
-		elif msg.is_cmdcode("QUIT") and msg.origin.is_user_msg:
-			for channel in self._channels.values():
-				channel.remove_user(msg.origin.nickname)
-		elif msg.is_cmdcode("NICK") and msg.origin.is_user_msg:
-			for channel in self._channels.values():
-				channel.rename_user(msg.origin.nickname, msg.get_param(0))
-		elif msg.is_cmdcode("KICK"):
-			channel = self.get_channel(msg.get_param(0))
-			nickname = msg.get_param(1)
-			reason = msg.get_param(2)
-			if channel is not None:
-				channel.remove_user(nickname)
-			if nickname == self.our_nickname:
-				channel.record_stat(StatEvent.ChannelKicked)
-				_log.warning("We were kicked out of %s by %s: %s", channel.name, msg.origin, reason)
-				channel.joined = False
-				self.fire_callback(IRCCallbackType.KickedFromChannel, channel.name, msg.origin.nickname, reason)
-		elif msg.is_cmdcode("PRIVMSG") and msg.origin.is_user_msg:
-			# We received a private message or channel message
-			is_chanmsg = NameTools.is_channel_name(msg.get_param(0))
-			text = msg.get_param(1)
-			if (not is_chanmsg) and (len(text) >= 2) and text.startswith("\x01") and text.endswith("\x01"):
-				text = text[1 : -1]
-				if not self._handle_ctcp_request(msg.origin.nickname, text):
-					self.fire_callback(IRCCallbackType.CTCPRequest, msg.origin.nickname, text)
-			elif is_chanmsg:
-				channel_name = msg.get_param(0)
-				channel = self.get_channel(channel_name)
-				channel.record_stat(StatEvent.ChannelMessage)
-				self.fire_callback(IRCCallbackType.ChannelMessage, msg.origin.nickname, channel_name, text)
+	@command_handler("JOIN")
+	def _handle_join(self, msg):
+		if (msg.origin is None) or (not msg.origin.is_user_msg):
+			return
+		channel = self.get_channel(msg.get_param(0))
+		if channel is not None:
+			if self._is_our_nickname(msg.origin.nickname):
+				self._join_scheduler.joined(channel.name)
+			channel.add_user(msg.origin.nickname)
+
+	@command_handler(ReplyCode.ERR_BANNEDFROMCHAN)
+	def _handle_bannedfromchan(self, msg):
+		channel = self.get_channel(msg.get_param(1))
+		if channel is not None:
+			self._join_scheduler.banned(channel.name, msg.get_param(2))
+
+	@command_handler("PART")
+	def _handle_part(self, msg):
+		if (msg.origin is None) or (not msg.origin.is_user_msg):
+			return
+		channel = self.get_channel(msg.get_param(0))
+		if channel is not None:
+			if self._is_our_nickname(msg.origin.nickname):
+				channel.clear_users()
 			else:
-				self.fire_callback(IRCCallbackType.PrivateMessage, msg.origin.nickname, text)
-
-		elif msg.is_cmdcode("NOTICE") and msg.origin.is_user_msg:
-			# We received a notice
-			is_chanmsg = NameTools.is_channel_name(msg.get_param(0))
-			text = msg.get_param(1)
-			if (not is_chanmsg) and (len(text) >= 2) and text.startswith("\x01") and text.endswith("\x01"):
-				text = text[1 : -1]
-				if not self._handle_ctcp_reply(msg.origin.nickname, text):
-					self.fire_callback(IRCCallbackType.CTCPReply, msg.origin.nickname, text)
-			elif is_chanmsg:
-				channel_name = msg.get_param(0)
-				channel = self.get_channel(channel_name)
-				channel.record_stat(StatEvent.ChannelNotice)
-				self.fire_callback(IRCCallbackType.ChannelNotice, msg.origin.nickname, channel_name, text)
+				channel.remove_user(msg.origin.nickname)
+
+	@command_handler("QUIT")
+	def _handle_quit(self, msg):
+		if (msg.origin is None) or (not msg.origin.is_user_msg):
+			return
+		self._membership.quit(msg.origin.nickname)
+
+	@command_handler("NICK")
+	def _handle_user_nick(self, msg):
+		if (msg.origin is None) or (not msg.origin.is_user_msg) or (msg.get_param(0) is None):
+			return
+		self._membership.rename(msg.origin.nickname, msg.get_param(0))
+
+	@command_handler("MODE")
+	def _handle_mode(self, msg):
+		channel = self.get_channel(msg.get_param(0))
+		if (channel is None) or (len(msg.params) < 2):
+			return
+		mode_flags = self.isupport.mode_flags
+		for (adding, mode_char, argument) in self.isupport.parse_mode_changes(msg.params[1], msg.params[2:]):
+			flag = mode_flags.get(mode_char)
+			if (flag is None) or (argument is None):
+				continue
+			if adding:
+				channel.change_user_modes(argument, set_modes = flag)
 			else:
-				self.fire_callback(IRCCallbackType.PrivateNotice, msg.origin.nickname, text)
+				channel.change_user_modes(argument, clear_modes = flag)
+
+	@command_handler("KICK")
+	def _handle_kick(self, msg):
+		if msg.origin is None:
+			return
+		channel = self.get_channel(msg.get_param(0))
+		nickname = msg.get_param(1)
+		reason = msg.get_param(2)
+		if (channel is None) or (nickname is None):
+			return
+		if self._is_our_nickname(nickname):
+			channel.clear_users()
+			channel.record_stat(StatEvent.ChannelKicked)
+			_log.warning("We were kicked out of %s by %s: %s", channel.name, msg.origin, reason)
+			channel.joined = False
+			self._join_scheduler.kicked(channel.name)
+			self.fire_callback(IRCCallbackType.KickedFromChannel, channel.name, msg.origin.nickname, reason)
+		else:
+			channel.remove_user(nickname)
+
+	@command_handler("PRIVMSG")
+	def _handle_privmsg(self, msg):
+		if (msg.origin is None) or (not msg.origin.is_user_msg):
+			return
+		# We received a private message or channel message
+		is_chanmsg = self.isupport.is_channel_name(msg.get_param(0))
+		text = msg.get_param(1)
+		if (not is_chanmsg) and (len(text) >= 2) and text.startswith("\x01") and text.endswith("\x01"):
+			text = text[1 : -1]
+			if not self._handle_ctcp_request(msg.origin.nickname, text):
+				self.fire_callback(IRCCallbackType.CTCPRequest, msg.origin.nickname, text)
+		elif is_chanmsg:
+			channel_name = msg.get_param(0)
+			channel = self.get_channel(channel_name)
+			channel.record_stat(StatEvent.ChannelMessage)
+			self.fire_callback(IRCCallbackType.ChannelMessage, msg.origin.nickname, channel_name, text)
+		else:
+			self.fire_callback(IRCCallbackType.PrivateMessage, msg.origin.nickname, text)
+
+	@command_handler("NOTICE")
+	def _handle_notice(self, msg):
+		if (msg.origin is None) or (not msg.origin.is_user_msg):
+			return
+		# We received a notice
+		is_chanmsg = self.isupport.is_channel_name(msg.get_param(0))
+		text = msg.get_param(1)
+		if (not is_chanmsg) and (len(text) >= 2) and text.startswith("\x01") and text.endswith("\x01"):
+			text = text[1 : -1]
+			if not self._handle_ctcp_reply(msg.origin.nickname, text):
+				self.fire_callback(IRCCallbackType.CTCPReply, msg.origin.nickname, text)
+		elif is_chanmsg:
+			channel_name = msg.get_param(0)
+			channel = self.get_channel(channel_name)
+			channel.record_stat(StatEvent.ChannelNotice)
+			self.fire_callback(IRCCallbackType.ChannelNotice, msg.origin.nickname, channel_name, text)
+		else:
+			self.fire_callback(IRCCallbackType.PrivateNotice, msg.origin.nickname, text)
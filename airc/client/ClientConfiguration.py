@@ -1,5 +1,7 @@
 import asyncio
 from airc.Enums import IRCTimeout
+from airc.TokenBucket import TokenBucket
+from airc.OriginCache import OriginCache
 from airc.dcc.DCCController import DCCController
 
 class ClientConfiguration():
@@ -16,6 +18,7 @@ class ClientConfiguration():
 			IRCTimeout.RejoinChannelBannedTimeSecs:						1800,
 			IRCTimeout.DCCAckResumeTimeoutSecs:							20,
 			IRCTimeout.DCCPassiveConnectTimeoutSecs:					20,
+			IRCTimeout.CapabilityNegotiationTimeoutSecs:				15,
 		}
 		self._autojoin_channels = set()
 		self._autojoin_channels_changed = asyncio.Event()
@@ -26,6 +29,19 @@ class ClientConfiguration():
 		self._handle_ctcp_ping = False
 		self._handle_dcc = False
 		self._dcc_controller = None
+		self._max_line_length = 16 * 1024
+		self._max_batch_messages = 10000
+		self._flood_control_lines_per_sec = 0.5
+		self._flood_control_burst_lines = 5
+		self._origin_cache_size = None
+		self._selective_parsing = False
+		self._selective_parsing_cmdcodes = set()
+		self._capabilities = set([ "multi-prefix", "userhost-in-names", "away-notify", "batch", "server-time" ])
+		self._connect_race_servers = 1
+		self._connect_stagger_secs = 0.25
+		self._reconnect_backoff_cap_secs = 300
+		self._reconnect_clean_close_jitter_secs = 5
+		self._reconnect_stable_connection_secs = 60
 
 	def timeout(self, key: IRCTimeout):
 		return self._timeouts[key]
@@ -33,6 +49,143 @@ class ClientConfiguration():
 	def set_timeout(self, key: IRCTimeout, value: int | float):
 		self._timeouts[key] = value
 
+	@property
+	def max_line_length(self):
+		return self._max_line_length
+
+	@max_line_length.setter
+	def max_line_length(self, value: int):
+		self._max_line_length = value
+
+	@property
+	def max_batch_messages(self):
+		return self._max_batch_messages
+
+	@max_batch_messages.setter
+	def max_batch_messages(self, value: int):
+		# IRCv3 batches that grow larger than this are no longer buffered,
+		# their messages are handled one by one instead.
+		self._max_batch_messages = value
+
+	@property
+	def flood_control_lines_per_sec(self):
+		return self._flood_control_lines_per_sec
+
+	@flood_control_lines_per_sec.setter
+	def flood_control_lines_per_sec(self, value: float | None):
+		self._flood_control_lines_per_sec = value
+
+	@property
+	def flood_control_burst_lines(self):
+		return self._flood_control_burst_lines
+
+	@flood_control_burst_lines.setter
+	def flood_control_burst_lines(self, value: int):
+		self._flood_control_burst_lines = value
+
+	def create_flood_control_bucket(self):
+		if self._flood_control_lines_per_sec is None:
+			return None
+		return TokenBucket(rate = self._flood_control_lines_per_sec, burst = self._flood_control_burst_lines)
+
+	@property
+	def origin_cache_size(self):
+		return self._origin_cache_size
+
+	@origin_cache_size.setter
+	def origin_cache_size(self, value: int | None):
+		self._origin_cache_size = value
+
+	def create_origin_cache(self, intern = None):
+		if self._origin_cache_size is None:
+			return None
+		return OriginCache(maxsize = self._origin_cache_size, intern = intern)
+
+	@property
+	def selective_parsing(self):
+		return self._selective_parsing
+
+	@selective_parsing.setter
+	def selective_parsing(self, value: bool):
+		# When enabled, only messages for which the client has a registered
+		# command handler (or for which an expected response is pending) are
+		# parsed and passed to the client. Clients that override handle_msg()
+		# instead of registering command handlers need to list additionally
+		# required command codes in selective_parsing_cmdcodes.
+		self._selective_parsing = value
+
+	@property
+	def selective_parsing_cmdcodes(self):
+		return self._selective_parsing_cmdcodes
+
+	def add_selective_parsing_cmdcode(self, cmdcode: str | int):
+		if isinstance(cmdcode, str):
+			cmdcode = cmdcode.upper()
+		self._selective_parsing_cmdcodes.add(cmdcode)
+
+	@property
+	def connect_race_servers(self):
+		return self._connect_race_servers
+
+	@connect_race_servers.setter
+	def connect_race_servers(self, value: int):
+		# Number of servers of a network that are connected to in parallel
+		# (with staggered starts); the first one to complete registration is
+		# kept, the others are dropped. 1 tries the servers one at a time.
+		self._connect_race_servers = value
+
+	@property
+	def connect_stagger_secs(self):
+		return self._connect_stagger_secs
+
+	@connect_stagger_secs.setter
+	def connect_stagger_secs(self, value: float | None):
+		# Delay before the next racing server is connected to, also used
+		# between the addresses (IPv6/IPv4) of a single server.
+		self._connect_stagger_secs = value
+
+	@property
+	def reconnect_backoff_cap_secs(self):
+		return self._reconnect_backoff_cap_secs
+
+	@reconnect_backoff_cap_secs.setter
+	def reconnect_backoff_cap_secs(self, value: float):
+		# Reconnect delays grow (randomized) from the ReconnectTimeAfter*
+		# timeouts after repeated failures, but never beyond this.
+		self._reconnect_backoff_cap_secs = value
+
+	@property
+	def reconnect_clean_close_jitter_secs(self):
+		return self._reconnect_clean_close_jitter_secs
+
+	@reconnect_clean_close_jitter_secs.setter
+	def reconnect_clean_close_jitter_secs(self, value: float):
+		# Reconnecting after a clean close is delayed by a random time of up
+		# to this many seconds.
+		self._reconnect_clean_close_jitter_secs = value
+
+	@property
+	def reconnect_stable_connection_secs(self):
+		return self._reconnect_stable_connection_secs
+
+	@reconnect_stable_connection_secs.setter
+	def reconnect_stable_connection_secs(self, value: float):
+		# A connection needs to stay up for this long before the reconnect
+		# backoff and the failure count of its server are reset.
+		self._reconnect_stable_connection_secs = value
+
+	@property
+	def capabilities(self):
+		# IRCv3 capabilities requested during registration (as far as the
+		# server offers them). If empty, no capability negotiation is done.
+		return iter(self._capabilities)
+
+	def add_capability(self, capability: str):
+		self._capabilities.add(capability)
+
+	def remove_capability(self, capability: str):
+		self._capabilities.discard(capability)
+
 	@property
 	def autojoin_channels(self):
 		return iter(self._autojoin_channels)
@@ -0,0 +1,66 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+def command_handler(*cmdcodes):
+	"""Marks a method of a CommandDispatcher subclass as handler for all
+	messages with the given command codes."""
+	def decorator(method):
+		method.handled_cmdcodes = getattr(method, "handled_cmdcodes", ( )) + cmdcodes
+		return method
+	return decorator
+
+class CommandDispatcher():
+	"""Maps command codes to handler methods through a table that is built
+	once per class from all methods marked with @command_handler along the
+	MRO. Handlers of base classes run before those of derived classes;
+	overriding a handler method by name replaces it."""
+
+	@staticmethod
+	def normalize_cmdcode(cmdcode):
+		if isinstance(cmdcode, str):
+			return cmdcode.upper()
+		return cmdcode
+
+	def __init_subclass__(cls, **kwargs):
+		super().__init_subclass__(**kwargs)
+		table = { }
+		for klass in reversed(cls.__mro__):
+			for (name, member) in vars(klass).items():
+				for cmdcode in getattr(member, "handled_cmdcodes", ( )):
+					handler_names = table.setdefault(cls.normalize_cmdcode(cmdcode), [ ])
+					if name not in handler_names:
+						handler_names.append(name)
+		cls._command_handler_table = { cmdcode: tuple(handler_names) for (cmdcode, handler_names) in table.items() }
+
+	def __init__(self):
+		self._command_handlers = { cmdcode: [ getattr(self, name) for name in handler_names ] for (cmdcode, handler_names) in self._command_handler_table.items() }
+
+	def add_command_handler(self, cmdcode, handler):
+		self._command_handlers.setdefault(self.normalize_cmdcode(cmdcode), [ ]).append(handler)
+
+	def has_command_handler(self, cmdcode):
+		return self.normalize_cmdcode(cmdcode) in self._command_handlers
+
+	def dispatch(self, msg):
+		handlers = self._command_handlers.get(msg.cmdcode)
+		if handlers is not None:
+			for handler in handlers:
+				handler(msg)
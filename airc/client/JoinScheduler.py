@@ -0,0 +1,224 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import asyncio
+import logging
+from airc.ReplyCode import ReplyCode
+from airc.ExpectedResponse import ExpectedResponse
+from airc.Enums import IRCTimeout, StatEvent, ChannelJoinState
+
+_log = logging.getLogger(__spec__.name)
+
+class _JoinEntry():
+	__slots__ = [ "channel", "state", "batch", "timer" ]
+
+	def __init__(self, channel):
+		self.channel = channel
+		self.state = ChannelJoinState.Queued
+		self.batch = None
+		self.timer = None
+
+class _JoinBatch():
+	__slots__ = [ "expect", "outstanding" ]
+
+	def __init__(self, expect, outstanding):
+		self.expect = expect
+		self.outstanding = outstanding
+
+class JoinScheduler():
+	"""Joins the channels of a client. All channels that are due to be
+	joined in one event loop iteration are packed into as few comma-separated
+	JOIN commands as the server's TARGMAX and the line length allow; the
+	outbound queue paces these under flood control. The state of every
+	channel is kept in a single table. Channels are retried after a timeout,
+	a ban or a kick with the respective delays of the client configuration."""
+
+	# RFC1459 limits lines to 512 bytes including CR-LF
+	MAX_LINE_LENGTH = 510
+
+	def __init__(self, irc_client):
+		self._irc_client = irc_client
+		self._entries = { }
+		self._flush_handle = None
+
+	@property
+	def _timer_wheel(self):
+		return self._irc_client.irc_connection.timer_wheel
+
+	def _timeout(self, timeout: IRCTimeout):
+		return self._irc_client.config.timeout(timeout)
+
+	@classmethod
+	def pack_channels(cls, channel_names: list, max_targets: int | None = None, max_length: int | None = None):
+		"""Splits the channel names into groups that each fit into a single
+		JOIN command."""
+		if max_length is None:
+			max_length = cls.MAX_LINE_LENGTH
+		groups = [ ]
+		group = [ ]
+		length = len("JOIN")
+		for channel_name in channel_names:
+			# Separated by either a space or a comma
+			name_length = 1 + len(channel_name.encode("utf-8"))
+			if (len(group) > 0) and (((max_targets is not None) and (len(group) >= max_targets)) or (length + name_length > max_length)):
+				groups.append(group)
+				group = [ ]
+				length = len("JOIN")
+			group.append(channel_name)
+			length += name_length
+		if len(group) > 0:
+			groups.append(group)
+		return groups
+
+	def join(self, channel):
+		key = self._irc_client.fold(channel.name)
+		if key in self._entries:
+			return
+		self._entries[key] = _JoinEntry(channel)
+		self._schedule_flush()
+
+	def _schedule_flush(self):
+		if self._flush_handle is None:
+			self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+
+	def _flush(self):
+		self._flush_handle = None
+		queued = [ (key, entry) for (key, entry) in self._entries.items() if entry.state == ChannelJoinState.Queued ]
+		if len(queued) == 0:
+			return
+
+		entries = dict(queued)
+		names = { entry.channel.name: key for (key, entry) in queued }
+		timeout = self._timeout(IRCTimeout.JoinChannelTimeoutSecs)
+		for group in self.pack_channels(list(names), max_targets = self._irc_client.isupport.max_targets("JOIN")):
+			keys = [ names[channel_name] for channel_name in group ]
+
+			# The response only carries the timeout, which starts counting
+			# once the line was sent; answers are tracked by the scheduler
+			# itself and it is cancelled once all channels were answered.
+			index_keys = [ ]
+			for channel_name in group:
+				index_keys.append(ExpectedResponse.IndexKey(cmdcode = "JOIN", locator = 0, value = channel_name))
+				index_keys.append(ExpectedResponse.IndexKey(cmdcode = ReplyCode.ERR_BANNEDFROMCHAN, locator = 1, value = channel_name))
+			expect = ExpectedResponse(finish_conditions = ( ), index_keys = tuple(index_keys), timeout = timeout)
+			batch = _JoinBatch(expect, set(keys))
+			for key in keys:
+				entry = entries[key]
+				entry.state = ChannelJoinState.Joining
+				entry.batch = batch
+				entry.channel.record_stat(StatEvent.ChannelJoinAttempt)
+			future = self._irc_client.irc_connection.tx_message(f"JOIN {','.join(group)}", expect = expect)
+			future.add_done_callback(lambda future, batch = batch: self._batch_done(batch, future))
+
+	def _resolve(self, entry, key):
+		batch = entry.batch
+		entry.batch = None
+		if batch is not None:
+			batch.outstanding.discard(key)
+			if len(batch.outstanding) == 0:
+				batch.expect.cancel()
+
+	def _backoff(self, key, entry, delay):
+		entry.state = ChannelJoinState.Backoff
+		entry.timer = self._timer_wheel.call_later(delay, self._requeue, key)
+
+	def _requeue(self, key):
+		entry = self._entries.get(key)
+		if (entry is None) or (entry.state != ChannelJoinState.Backoff):
+			return
+		entry.timer = None
+		entry.state = ChannelJoinState.Queued
+		self._schedule_flush()
+
+	def _batch_done(self, batch, future):
+		if future.cancelled():
+			return
+		if not isinstance(future.exception(), asyncio.exceptions.TimeoutError):
+			return
+		delay = self._timeout(IRCTimeout.JoinChannelTimeoutSecs)
+		for key in batch.outstanding:
+			entry = self._entries.get(key)
+			if (entry is None) or (entry.batch is not batch):
+				continue
+			entry.batch = None
+			_log.error("Joining of %s timed out, waiting for %d seconds before retrying.", entry.channel.name, delay)
+			entry.channel.record_stat(StatEvent.ChannelJoinFailureTimeout)
+			self._backoff(key, entry, delay)
+		batch.outstanding.clear()
+
+	def joined(self, channel_name: str):
+		"""Called when we have joined the channel."""
+		key = self._irc_client.fold(channel_name)
+		entry = self._entries.get(key)
+		if (entry is None) or (entry.state == ChannelJoinState.Joined):
+			return
+		if entry.state == ChannelJoinState.Joining:
+			entry.channel.record_stat(StatEvent.ChannelJoinSuccess)
+		self._resolve(entry, key)
+		if entry.timer is not None:
+			entry.timer.cancel()
+			entry.timer = None
+		entry.state = ChannelJoinState.Joined
+		entry.channel.joined = True
+
+	def banned(self, channel_name: str, reason: str | None = None):
+		"""Called when the server refused to let us join because we are banned."""
+		key = self._irc_client.fold(channel_name)
+		entry = self._entries.get(key)
+		if (entry is None) or (entry.state != ChannelJoinState.Joining):
+			return
+		self._resolve(entry, key)
+		delay = self._timeout(IRCTimeout.RejoinChannelBannedTimeSecs)
+		_log.error("Joining of %s did not work because we are banned (%s), waiting for %d seconds before retrying.", entry.channel.name, reason, delay)
+		entry.channel.record_stat(StatEvent.ChannelJoinFailureBanned)
+		self._backoff(key, entry, delay)
+
+	def kicked(self, channel_name: str):
+		"""Called when we were kicked out of the channel."""
+		key = self._irc_client.fold(channel_name)
+		entry = self._entries.get(key)
+		if (entry is None) or (entry.state != ChannelJoinState.Joined):
+			return
+		delay = self._timeout(IRCTimeout.RejoinChannelTimeSecs)
+		_log.info("Will rejoin %s after %d seconds.", entry.channel.name, delay)
+		self._backoff(key, entry, delay)
+
+	def get_state(self, channel_name: str):
+		entry = self._entries.get(self._irc_client.fold(channel_name))
+		return None if (entry is None) else entry.state
+
+	def cancel_all(self):
+		if self._flush_handle is not None:
+			self._flush_handle.cancel()
+			self._flush_handle = None
+		for entry in self._entries.values():
+			if entry.timer is not None:
+				entry.timer.cancel()
+				entry.timer = None
+			if entry.batch is not None:
+				entry.batch.expect.cancel()
+				entry.batch = None
+
+	def get_status(self):
+		result = { state.value: 0 for state in ChannelJoinState }
+		for entry in self._entries.values():
+			result[entry.state.value] += 1
+		return result
@@ -22,20 +22,24 @@
 import logging
 import collections
 from airc.ReplyCode import ReplyCode
-from airc.Enums import IRCCallbackType
+from airc.Enums import IRCCallbackType, TxPriority
 from airc.ExpectedResponse import ExpectedResponse
 from airc.AsyncBackgroundTasks import AsyncBackgroundTasks
+from airc.IRCBatch import IRCBatch
+from .CommandDispatcher import CommandDispatcher, command_handler
 
 _log = logging.getLogger(__spec__.name)
 
-class RawIRCClient():
+class RawIRCClient(CommandDispatcher):
 	ServerChannel = collections.namedtuple("ServerChannel", [ "name", "user_count", "topic" ])
 
 	def __init__(self, irc_network, irc_connection):
+		super().__init__()
 		self._bg_tasks = AsyncBackgroundTasks()
 		self._irc_network = irc_network
 		self._irc_connection = irc_connection
 		self._our_nickname = None
+		self._open_batches = { }
 		self.__server_channel_list = None
 
 	@property
@@ -59,23 +63,32 @@ class RawIRCClient():
 	def irc_connection(self):
 		return self._irc_connection
 
+	@property
+	def isupport(self):
+		return self._irc_connection.isupport
+
+	def fold(self, name: str):
+		"""Case-folds a nickname or channel name according to the server's
+		casemapping."""
+		return self._irc_connection.isupport.fold(name)
+
 	def fire_callback(self, callback_type: IRCCallbackType, *args):
 		tasks = [ ]
 		for callback in self.irc_network.get_listeners(callback_type):
 			tasks.append(self._bg_tasks.create_task(callback(self, *args)))
 		return tasks
 
-	def privmsg(self, nickname, text, expect = None):
-		return self._irc_connection.tx_message(f"PRIVMSG {nickname} :{text}", expect = expect)
+	def privmsg(self, nickname, text, expect = None, priority = TxPriority.Bulk):
+		return self._irc_connection.tx_message(f"PRIVMSG {nickname} :{text}", expect = expect, priority = priority)
 
-	def notice(self, nickname, text, expect = None):
-		return self._irc_connection.tx_message(f"NOTICE {nickname} :{text}", expect = expect)
+	def notice(self, nickname, text, expect = None, priority = TxPriority.Bulk):
+		return self._irc_connection.tx_message(f"NOTICE {nickname} :{text}", expect = expect, priority = priority)
 
-	def ctcp_request(self, nickname, text, expect = None):
-		return self.privmsg(nickname, "\x01" + text + "\x01", expect = expect)
+	def ctcp_request(self, nickname, text, expect = None, priority = TxPriority.Bulk):
+		return self.privmsg(nickname, "\x01" + text + "\x01", expect = expect, priority = priority)
 
-	def ctcp_reply(self, nickname, text, expect = None):
-		return self.notice(nickname, "\x01" + text + "\x01", expect = expect)
+	def ctcp_reply(self, nickname, text, expect = None, priority = TxPriority.Bulk):
+		return self.notice(nickname, "\x01" + text + "\x01", expect = expect, priority = priority)
 
 	async def list_channels(self, cached_result: bool = True):
 		if (not cached_result) or (self.__server_channel_list is None):
@@ -84,11 +97,66 @@ class RawIRCClient():
 			self.__server_channel_list = [ self.ServerChannel(name = msg.get_param(1), user_count = int(msg.get_param(2, "0")), topic = msg.get_param(3)) for msg in result ]
 		return self.__server_channel_list
 
+	def handle_msg_batch(self, msgs):
+		for msg in msgs:
+			if (len(self._open_batches) > 0) and msg.has_tags and (not msg.is_cmdcode("BATCH")) and (msg.get_tag("batch") in self._open_batches):
+				self._buffer_in_batch(self._open_batches[msg.get_tag("batch")], msg)
+			else:
+				self.handle_msg(msg)
+
+	def _buffer_in_batch(self, batch: IRCBatch, msg):
+		batch.append(msg)
+		if len(batch) >= self.config.max_batch_messages:
+			# Server never closes the batch or it is simply too large; stop
+			# buffering and handle what we have so far right away.
+			_log.warning("Batch %s exceeded %d messages, handling its messages individually.", batch.reference, self.config.max_batch_messages)
+			del self._open_batches[batch.reference]
+			self._handle_batch_messages(batch)
+
+	def _handle_batch_messages(self, batch: IRCBatch):
+		for msg in batch.messages:
+			if isinstance(msg, IRCBatch):
+				self.handle_batch(msg)
+			else:
+				self.handle_msg(msg)
+
+	def handle_batch(self, batch: IRCBatch):
+		"""Called once all messages of a batch have been received. Nested
+		batches are only delivered as part of their parent. By default, the
+		messages are handled one by one; subclasses may override this to
+		process certain batch types in bulk."""
+		self._handle_batch_messages(batch)
+
 	def handle_msg(self, msg):
-		if msg.is_cmdcode("ping"):
-			data = msg.params[0]
-			_log.trace("Sending PONG reply to PING request (%s) on %s.", data, self._irc_connection.irc_server)
-			self._irc_connection.tx_message(f"PONG :{data}")
-		elif msg.is_cmdcode("nick") and msg.origin.has_nickname(self.our_nickname):
+		self.dispatch(msg)
+
+	def handle_connection_lost(self):
+		"""Called once the connection this client runs on is gone."""
+		self._open_batches.clear()
+
+	@command_handler("BATCH")
+	def _handle_batch_boundary(self, msg):
+		reference = msg.get_param(0, "")
+		if reference.startswith("+"):
+			parent = self._open_batches.get(msg.get_tag("batch")) if msg.has_tags else None
+			self._open_batches[reference[1:]] = IRCBatch(reference = reference[1:], batch_type = msg.get_param(1), params = msg.params[2:], parent = parent)
+		elif reference.startswith("-"):
+			batch = self._open_batches.pop(reference[1:], None)
+			if batch is None:
+				return
+			if (batch.parent is not None) and (self._open_batches.get(batch.parent.reference) is batch.parent):
+				self._buffer_in_batch(batch.parent, batch)
+			else:
+				self.handle_batch(batch)
+
+	@command_handler("PING")
+	def _handle_ping(self, msg):
+		data = msg.get_param(0, "")
+		_log.trace("Sending PONG reply to PING request (%s) on %s.", data, self._irc_connection.irc_server)
+		self._irc_connection.tx_message(f"PONG :{data}", priority = TxPriority.Urgent)
+
+	@command_handler("NICK")
+	def _handle_nick(self, msg):
+		if (msg.origin is not None) and (self.our_nickname is not None) and msg.origin.has_nickname(self.our_nickname, fold = self.fold):
 			# Server changed our nickname
 			self.our_nickname = msg.params[0]
@@ -20,5 +20,6 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 from .ClientConfiguration import ClientConfiguration
+from .CommandDispatcher import CommandDispatcher, command_handler
 from .RawIRCClient import RawIRCClient
 from .BasicIRCClient import BasicIRCClient
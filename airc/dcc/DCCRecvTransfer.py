@@ -33,7 +33,7 @@ from airc.dcc.DCCRequest import DCCRequestParser
 from airc.Exceptions import DCCTransferAbortedException, DCCTransferDataMismatchException, DCCTransferTimeoutException, DCCResourcesExhaustedException, DCCPassiveTransferUnderconfiguredException
 from airc.Tools import NumberTools
 from airc.ExpectedResponse import ExpectedResponse
-from airc.Enums import IRCTimeout, IRCCallbackType, DCCTransferState
+from airc.Enums import IRCTimeout, IRCCallbackType, DCCTransferState, TxPriority
 from airc.FilesizeFormatter import FilesizeFormatter
 from .SpeedAverager import SpeedAverager
 from .SpeedThrottler import SpeedThrottler
@@ -272,7 +272,7 @@ class DCCRecvTransfer():
 			if self._dcc_request.is_passive:
 				text += f" {self._dcc_request.passive_token}"
 			try:
-				response = await asyncio.wait_for(self._irc_client.ctcp_request(self._nickname, text, expect = ExpectedResponse.on_privmsg_from(nickname = self._nickname, ctcp_message = True)), timeout = self._irc_client.config.timeout(IRCTimeout.DCCAckResumeTimeoutSecs))
+				response = await self._irc_client.ctcp_request(self._nickname, text, expect = ExpectedResponse.on_privmsg_from(nickname = self._nickname, ctcp_message = True, fold = self._irc_client.fold, timeout = self._irc_client.config.timeout(IRCTimeout.DCCAckResumeTimeoutSecs)), priority = TxPriority.Control)
 			except asyncio.exceptions.TimeoutError as e:
 				raise DCCTransferTimeoutException(f"DCC RESUME was never acknowledged by peer {self._nickname}, refusing to start transfer.") from e
 
@@ -297,9 +297,9 @@ class DCCRecvTransfer():
 			with await self._dcc_controller.allocate_passive_port() as server:
 				# Let the peer know which port we're listening on
 				public_ip = await self._dcc_controller.get_public_ip()
-				self._irc_client.ctcp_request(self._nickname, f"DCC SEND {self._dcc_request.filename} {int(public_ip)} {server.port} {self._dcc_request.filesize} {self._dcc_request.passive_token}")
+				self._irc_client.ctcp_request(self._nickname, f"DCC SEND {self._dcc_request.filename} {int(public_ip)} {server.port} {self._dcc_request.filesize} {self._dcc_request.passive_token}", priority = TxPriority.Control)
 				try:
-					(reader, writer) = await asyncio.wait_for(server, timeout = self._irc_client.config.timeout(IRCTimeout.DCCPassiveConnectTimeoutSecs))
+					(reader, writer) = await self._irc_client.irc_connection.timer_wheel.wait_for(server, timeout = self._irc_client.config.timeout(IRCTimeout.DCCPassiveConnectTimeoutSecs))
 
 					if resume_offset == 0:
 						_log.info("Starting passive DCC transfer from %s", self._nickname)
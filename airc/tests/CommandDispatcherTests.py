@@ -0,0 +1,83 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from airc.IRCMessageHandler import IRCMessageHandler
+from airc.ReplyCode import ReplyCode
+from airc.client.CommandDispatcher import CommandDispatcher, command_handler
+
+class BaseDispatcher(CommandDispatcher):
+	def __init__(self):
+		super().__init__()
+		self.calls = [ ]
+
+	@command_handler("privmsg")
+	def _handle_privmsg(self, msg):
+		self.calls.append("base_privmsg")
+
+	@command_handler("NICK", "QUIT")
+	def _handle_user(self, msg):
+		self.calls.append("base_user")
+
+class DerivedDispatcher(BaseDispatcher):
+	@command_handler("PRIVMSG")
+	def _handle_privmsg_derived(self, msg):
+		self.calls.append("derived_privmsg")
+
+	@command_handler(ReplyCode.RPL_NAMREPLY)
+	def _handle_namreply(self, msg):
+		self.calls.append("namreply")
+
+	def _handle_user(self, msg):
+		self.calls.append("derived_user")
+
+class CommandDispatcherTests(unittest.TestCase):
+	def setUp(self):
+		self._imh = IRCMessageHandler()
+
+	def _dispatch(self, dispatcher, line):
+		dispatcher.dispatch(self._imh.parse(line.encode() + b"\r\n"))
+		calls = dispatcher.calls
+		dispatcher.calls = [ ]
+		return calls
+
+	def test_cmdcode_normalized(self):
+		msg = self._imh.parse(b":nick!~user@host privmsg #chan :hello\r\n")
+		self.assertEqual(msg.cmdcode, "PRIVMSG")
+		self.assertTrue(msg.is_cmdcode("PrivMsg"))
+
+	def test_base(self):
+		dispatcher = BaseDispatcher()
+		self.assertEqual(self._dispatch(dispatcher, ":nick!~user@host PRIVMSG #chan :hello"), [ "base_privmsg" ])
+		self.assertEqual(self._dispatch(dispatcher, ":srv 353 me = #chan :a b c"), [ ])
+
+	def test_derived(self):
+		dispatcher = DerivedDispatcher()
+		self.assertEqual(self._dispatch(dispatcher, ":nick!~user@host privmsg #chan :hello"), [ "base_privmsg", "derived_privmsg" ])
+		self.assertEqual(self._dispatch(dispatcher, ":srv 353 me = #chan :a b c"), [ "namreply" ])
+		self.assertEqual(self._dispatch(dispatcher, ":nick!~user@host QUIT :bye"), [ "derived_user" ])
+		self.assertTrue(dispatcher.has_command_handler("nick"))
+		self.assertFalse(dispatcher.has_command_handler("MODE"))
+
+	def test_add_command_handler(self):
+		dispatcher = BaseDispatcher()
+		dispatcher.add_command_handler("mode", lambda msg: dispatcher.calls.append("mode"))
+		self.assertEqual(self._dispatch(dispatcher, ":nick!~user@host MODE #chan +o nick"), [ "mode" ])
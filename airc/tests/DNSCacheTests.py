@@ -0,0 +1,43 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import socket
+import asyncio
+import unittest
+from airc.DNSCache import DNSCache
+
+class DNSCacheTests(unittest.IsolatedAsyncioTestCase):
+	async def test_resolve(self):
+		cache = DNSCache()
+		results = await asyncio.gather(*(cache.resolve("127.0.0.1", 6667) for _ in range(5)))
+		self.assertEqual(cache.get_status(), { "entries": 1, "hits": 4, "misses": 1 })
+		self.assertEqual(results[0][0][4], ("127.0.0.1", 6667))
+		self.assertIs(await cache.resolve("127.0.0.1", 6667), results[0])
+		self.assertEqual(cache.get_status()["misses"], 1)
+		await cache.resolve("127.0.0.1", 6697)
+		self.assertEqual(len(cache), 2)
+
+	def test_interleave(self):
+		v4 = lambda i: (socket.AF_INET, socket.SOCK_STREAM, 6, "", (f"10.0.0.{i}", 6667))
+		v6 = lambda i: (socket.AF_INET6, socket.SOCK_STREAM, 6, "", (f"fd00::{i}", 6667, 0, 0))
+		self.assertEqual(DNSCache.interleave([ v6(1), v6(2), v6(3), v4(1) ]), [ v6(1), v4(1), v6(2), v6(3) ])
+		self.assertEqual(DNSCache.interleave([ v4(1), v4(2), v6(1), v6(2) ]), [ v4(1), v6(1), v4(2), v6(2) ])
+		self.assertEqual(DNSCache.interleave([ ]), [ ])
@@ -0,0 +1,91 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from airc.IRCMessageHandler import IRCMessageHandler
+from airc.client import ClientConfiguration
+from airc.client.RawIRCClient import RawIRCClient
+from airc.client.CommandDispatcher import command_handler
+
+class FakeNetwork():
+	def __init__(self):
+		self.client_configuration = ClientConfiguration()
+
+class RecordingClient(RawIRCClient):
+	def __init__(self):
+		super().__init__(irc_network = FakeNetwork(), irc_connection = None)
+		self.handled = [ ]
+		self.batches = [ ]
+
+	def handle_batch(self, batch):
+		self.batches.append(batch)
+		super().handle_batch(batch)
+
+	@command_handler("PRIVMSG", "QUIT")
+	def _handle_record(self, msg):
+		self.handled.append(msg.get_param(0))
+
+class IRCBatchTests(unittest.TestCase):
+	def setUp(self):
+		self._imh = IRCMessageHandler()
+		self._client = RecordingClient()
+
+	def _feed(self, *lines):
+		self._client.handle_msg_batch([ self._imh.parse(line.encode() + b"\r\n") for line in lines ])
+
+	def test_unbatched(self):
+		self._feed("@time=now :a!u@h PRIVMSG #chan :one", ":a!u@h PRIVMSG #chan :two")
+		self.assertEqual(self._client.handled, [ "#chan", "#chan" ])
+		self.assertEqual(self._client.batches, [ ])
+
+	def test_batch_delivered_at_end(self):
+		self._feed(":srv BATCH +ref netsplit irc.a.net irc.b.net", "@batch=ref :a!u@h QUIT :irc.a.net irc.b.net", "@batch=other :b!u@h PRIVMSG #x :not in batch")
+		self.assertEqual(self._client.handled, [ "#x" ])
+		self._feed("@batch=ref :c!u@h QUIT :irc.a.net irc.b.net")
+		self.assertEqual(self._client.handled, [ "#x" ])
+		self._feed(":srv BATCH -ref")
+		self.assertEqual(self._client.handled, [ "#x", "irc.a.net irc.b.net", "irc.a.net irc.b.net" ])
+		self.assertEqual(len(self._client.batches), 1)
+		batch = self._client.batches[0]
+		self.assertEqual(batch.reference, "ref")
+		self.assertEqual(batch.batch_type, "netsplit")
+		self.assertEqual(batch.params, [ "irc.a.net", "irc.b.net" ])
+		self.assertEqual(len(batch), 2)
+
+	def test_nested_batch(self):
+		self._feed(":srv BATCH +outer example", "@batch=outer :a!u@h PRIVMSG #before :x", "@batch=outer :srv BATCH +inner example", "@batch=inner :a!u@h PRIVMSG #inner :x", "@batch=outer :srv BATCH -inner", "@batch=outer :a!u@h PRIVMSG #after :x")
+		self.assertEqual(self._client.batches, [ ])
+		self.assertEqual(self._client.handled, [ ])
+		self._feed(":srv BATCH -outer")
+		self.assertEqual([ batch.reference for batch in self._client.batches ], [ "outer", "inner" ])
+		self.assertEqual(self._client.batches[1].parent.reference, "outer")
+		self.assertIs(self._client.batches[0].messages[1], self._client.batches[1])
+		self.assertEqual(self._client.handled, [ "#before", "#inner", "#after" ])
+
+	def test_oversized_batch(self):
+		self._client.config.max_batch_messages = 3
+		self._feed(":srv BATCH +ref example", "@batch=ref :a!u@h PRIVMSG #one :x", "@batch=ref :a!u@h PRIVMSG #two :x")
+		self.assertEqual(self._client.handled, [ ])
+		self._feed("@batch=ref :a!u@h PRIVMSG #three :x", "@batch=ref :a!u@h PRIVMSG #four :x")
+		self.assertEqual(self._client.handled, [ "#one", "#two", "#three", "#four" ])
+		self._feed(":srv BATCH -ref")
+		self.assertEqual(self._client.batches, [ ])
+		self.assertEqual(self._client.handled, [ "#one", "#two", "#three", "#four" ])
@@ -0,0 +1,49 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from airc.IRCConnection import IRCConnection
+from airc.IRCProtocol import IRCProtocol
+from airc.IRCServer import IRCServer
+from airc.TimerWheel import TimerWheel
+from airc.client import ClientConfiguration, RawIRCClient
+
+class RecordingIRCClient(RawIRCClient):
+	def __init__(self, irc_network, irc_connection):
+		super().__init__(irc_network = irc_network, irc_connection = irc_connection)
+		self.handled = [ ]
+
+	def handle_msg(self, msg):
+		self.handled.append(msg)
+		super().handle_msg(msg)
+
+class FakeNetwork():
+	def __init__(self):
+		self.client_configuration = ClientConfiguration()
+		self.irc_client_class = RecordingIRCClient
+		self.timer_wheel = TimerWheel()
+
+class IRCConnectionTests(unittest.IsolatedAsyncioTestCase):
+	async def test_rx_lines_handled_once(self):
+		connection = IRCConnection(irc_network = FakeNetwork(), irc_server = IRCServer("irc.a.net"), protocol = IRCProtocol(max_line_length = 512))
+		connection._rx_lines([ b":nick!user@host PRIVMSG #chan :foo\r", b"", b":nick!user@host PRIVMSG #chan :bar\r", b"PING :baz\r" ])
+		self.assertEqual([ msg.cmdcode for msg in connection.client.handled ], [ "PRIVMSG", "PRIVMSG", "PING" ])
+		self.assertEqual([ msg.get_param(1) for msg in connection.client.handled[:2] ], [ "foo", "bar" ])
@@ -22,6 +22,7 @@
 import unittest
 from airc.IRCMessageHandler import IRCMessageHandler
 from airc.ReplyCode import ReplyCode
+from airc.Exceptions import ServerMessageParseException
 
 class IRCMessageHandlerTests(unittest.TestCase):
 	def setUp(self):
@@ -52,3 +53,78 @@ class IRCMessageHandlerTests(unittest.TestCase):
 		text = b':MustyHay.eu.ix.Undernet.org 322 x0f495180 #aaaaaaaa 5 :\x02\x030,4 #aaaaaaaa \x02\x030,12 \x8fxxxxxxxxxxxxxxxxxxxxxxxx \x02\x030,4 #aaaaaaaa\r\n'
 		msg = self._imh.parse(text)
 		self.assertTrue(msg.is_cmdcode(ReplyCode.RPL_LIST))
+
+	def test_no_params(self):
+		msg = self._imh.parse(b":nick!~user@host AWAY\r\n")
+		self.assertTrue(msg.is_cmdcode("AWAY"))
+		self.assertEqual(msg.params, [ ])
+		self.assertEqual(msg.get_param(0), None)
+
+	def test_memoryview(self):
+		msg = self._imh.parse(memoryview(b"PING :irc.example.com\r\n"))
+		self.assertTrue(msg.is_cmdcode("PING"))
+		self.assertEqual(msg.origin, None)
+		self.assertEqual(msg.params, [ "irc.example.com" ])
+
+	def test_trailing_with_middle_params(self):
+		msg = self._imh.parse(b":srv 353 ourself = #chan :@op +voice regular\r\n")
+		self.assertTrue(msg.is_cmdcode(ReplyCode.RPL_NAMREPLY))
+		self.assertEqual(msg.params, [ "ourself", "=", "#chan", "@op +voice regular" ])
+
+	def test_unknown_numeric(self):
+		msg = self._imh.parse(b":srv 999 ourself :vendor specific\r\n")
+		self.assertEqual(msg.cmdcode, 999)
+		self.assertNotIsInstance(msg.cmdcode, ReplyCode)
+
+	def test_numeric_table(self):
+		self.assertIs(self._imh.parse(b":srv 001 ourself :Welcome\r\n").cmdcode, ReplyCode.RPL_WELCOME)
+		self.assertIs(self._imh.parse(bytearray(b":srv 474 ourself #chan :Banned\r\n")).cmdcode, ReplyCode.ERR_BANNEDFROMCHAN)
+		self.assertEqual(self._imh.parse(b":srv 000 ourself :zero\r\n").cmdcode, 0)
+		self.assertEqual(self._imh.parse(b":srv 1234 ourself :four digits\r\n").cmdcode, "1234")
+
+	def test_invalid(self):
+		with self.assertRaises(ServerMessageParseException):
+			self._imh.parse(b":origin_only\r\n")
+		with self.assertRaises(ServerMessageParseException):
+			self._imh.parse(b"\r\n")
+
+	def test_cmdcode_filter(self):
+		imh = IRCMessageHandler(cmdcode_filter = lambda cmdcode: cmdcode in ("PRIVMSG", ReplyCode.RPL_NAMREPLY))
+		self.assertIsNone(imh.parse(b":srv 372 ourself :- MOTD line\r\n"))
+		self.assertIsNone(imh.parse(b":nick!~user@host MODE #chan +v nick\r\n"))
+		self.assertEqual(imh.skipped_count, 2)
+		self.assertTrue(imh.parse(b":nick!~user@host privmsg #chan :hi\r\n").is_cmdcode("PRIVMSG"))
+		self.assertTrue(imh.parse(b":srv 353 ourself = #chan :a b\r\n").is_cmdcode(ReplyCode.RPL_NAMREPLY))
+
+	def test_tags(self):
+		msg = self._imh.parse(b"@time=2022-05-01T12:00:00.000Z;msgid=abc;+draft/reply=x :nick!~user@host PRIVMSG #chan :hello there\r\n")
+		self.assertTrue(msg.has_tags)
+		self.assertEqual(msg.raw_tags, b"time=2022-05-01T12:00:00.000Z;msgid=abc;+draft/reply=x")
+		self.assertTrue(msg.is_cmdcode("PRIVMSG"))
+		self.assertEqual(msg.origin.nickname, "nick")
+		self.assertEqual(msg.params, [ "#chan", "hello there" ])
+		self.assertEqual(msg.tags, { "time": "2022-05-01T12:00:00.000Z", "msgid": "abc", "+draft/reply": "x" })
+		self.assertEqual(msg.get_tag("msgid"), "abc")
+		self.assertIsNone(msg.get_tag("batch"))
+
+	def test_tags_without_origin(self):
+		msg = self._imh.parse(b"@batch=ref PING :irc.example.com\r\n")
+		self.assertIsNone(msg.origin)
+		self.assertEqual(msg.cmdcode, "PING")
+		self.assertEqual(msg.get_tag("batch"), "ref")
+
+	def test_tag_escapes(self):
+		msg = self._imh.parse(b"@a=semi\\:colon\\sspace\\\\back\\r\\nnl;b;c=;d=\\x\\ :srv NOTICE * :x\r\n")
+		self.assertEqual(msg.tags, { "a": "semi;colon space\\back\r\nnl", "b": "", "c": "", "d": "x" })
+
+	def test_no_tags(self):
+		msg = self._imh.parse(b":srv NOTICE * :x\r\n")
+		self.assertFalse(msg.has_tags)
+		self.assertIsNone(msg.raw_tags)
+		self.assertEqual(msg.tags, { })
+
+	def test_tags_invalid(self):
+		with self.assertRaises(ServerMessageParseException):
+			self._imh.parse(b"@time=now\r\n")
+		with self.assertRaises(ServerMessageParseException):
+			self._imh.parse(b"@time=now :origin_only\r\n")
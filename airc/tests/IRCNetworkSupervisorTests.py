@@ -0,0 +1,81 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from airc.IRCNetworkSupervisor import IRCNetworkSupervisor
+from airc.IRCServer import IRCServer
+from airc.Enums import ConnectionState
+from airc.client import ClientConfiguration
+
+class FakeDCCController():
+	pass
+
+class IRCNetworkSupervisorTests(unittest.IsolatedAsyncioTestCase):
+	async def test_shared_resources(self):
+		dcc_controller = FakeDCCController()
+		supervisor = IRCNetworkSupervisor(dcc_controller = dcc_controller)
+		net1 = supervisor.create_network(irc_client_class = None, irc_servers = [ IRCServer("irc.a.net") ], identity_generator = None)
+		dcc_config = ClientConfiguration()
+		dcc_config.handle_dcc = True
+		net2 = supervisor.create_network(irc_client_class = None, irc_servers = [ IRCServer("irc.b.net"), IRCServer("irc.c.net") ], identity_generator = None, client_configuration = dcc_config, identifier = "b")
+		self.assertEqual(len(supervisor), 2)
+		self.assertIs(supervisor.get_network("b"), net2)
+		self.assertEqual(net1.identifier, "network-0")
+		self.assertIs(net1.timer_wheel, net2.timer_wheel)
+		self.assertIs(net1.dns_cache, supervisor.dns_cache)
+		self.assertIs(net2.client_configuration.dcc_controller, dcc_controller)
+
+		# Networks that do not handle DCC are left alone
+		self.assertFalse(net1.client_configuration.handle_dcc)
+		self.assertIsNone(net1.client_configuration.dcc_controller)
+		with self.assertRaises(ValueError):
+			supervisor.create_network(irc_client_class = None, irc_servers = [ ], identity_generator = None, identifier = "b")
+
+		own_controller = FakeDCCController()
+		config = ClientConfiguration()
+		config.dcc_controller = own_controller
+		net3 = supervisor.create_network(irc_client_class = None, irc_servers = [ ], identity_generator = None, client_configuration = config)
+		self.assertIs(net3.client_configuration.dcc_controller, own_controller)
+		self.assertIs(supervisor.remove_network(net3.identifier), net3)
+
+	async def test_generated_identifiers(self):
+		supervisor = IRCNetworkSupervisor()
+		net1 = supervisor.create_network(irc_client_class = None, irc_servers = [ ], identity_generator = None)
+		net2 = supervisor.create_network(irc_client_class = None, irc_servers = [ ], identity_generator = None)
+		supervisor.remove_network(net1.identifier)
+		net3 = supervisor.create_network(irc_client_class = None, irc_servers = [ ], identity_generator = None)
+		self.assertEqual([ network.identifier for network in supervisor ], [ "network-1", "network-2" ])
+		self.assertIs(supervisor.get_network(net2.identifier), net2)
+		self.assertIs(supervisor.get_network(net3.identifier), net3)
+
+	async def test_status(self):
+		supervisor = IRCNetworkSupervisor()
+		networks = [ supervisor.create_network(irc_client_class = None, irc_servers = [ IRCServer("irc.a.net") ], identity_generator = None) for _ in range(4) ]
+		networks[0].connection_state = ConnectionState.Connected
+		networks[1].connection_state = ConnectionState.Registering
+		networks[2].reconnect_scheduler.record_failure(networks[2].reconnect_scheduler.ordered_servers()[0])
+		status = supervisor.get_status(include_networks = False)
+		self.assertEqual(status["states"], { "unconnected": 2, "registering": 1, "connected": 1 })
+		self.assertEqual(status["health"]["connected"], 1)
+		self.assertEqual(status["health"]["connected_ratio"], 0.25)
+		self.assertEqual(status["health"]["failing_servers"], 1)
+		self.assertNotIn("networks", status)
+		self.assertEqual(len(supervisor.get_status()["networks"]), 4)
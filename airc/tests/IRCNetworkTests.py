@@ -0,0 +1,129 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import asyncio
+import unittest
+from airc.IRCNetwork import IRCNetwork
+from airc.TimerWheel import TimerWheel
+from airc.Exceptions import ServerSeveredConnectionException
+from airc.Enums import ConnectionState, IRCTimeout
+
+class IRCNetworkTests(unittest.IsolatedAsyncioTestCase):
+	async def test_state_transitions(self):
+		network = IRCNetwork(irc_client_class = None, irc_servers = [ ], identity_generator = None, client_configuration = None, identifier = "test")
+		self.assertEqual(network.connection_state, ConnectionState.Unconnected)
+		established = asyncio.create_task(network.connection_established())
+		registering = asyncio.create_task(network.wait_for_state(ConnectionState.Registering, ConnectionState.Connected))
+		await asyncio.sleep(0)
+		self.assertFalse(established.done())
+
+		network.connection_state = ConnectionState.Registering
+		await asyncio.sleep(0)
+		self.assertEqual(registering.result(), ConnectionState.Registering)
+		self.assertFalse(established.done())
+
+		network.connection_state = ConnectionState.Connected
+		await asyncio.sleep(0)
+		self.assertTrue(established.done())
+
+		lost = asyncio.create_task(network.connection_lost())
+		await asyncio.sleep(0)
+		self.assertFalse(lost.done())
+		network.connection_state = ConnectionState.Unconnected
+		await asyncio.sleep(0)
+		self.assertTrue(lost.done())
+
+		# Already in the state: returns right away
+		await asyncio.wait_for(network.connection_lost(), timeout = 1)
+
+	async def test_race(self):
+		started = [ ]
+		cancelled = [ ]
+		class RacingNetwork(IRCNetwork):
+			async def _establish(self, irc_server):
+				(delay, fail) = irc_server
+				started.append(irc_server)
+				try:
+					await asyncio.sleep(delay)
+				except asyncio.CancelledError:
+					cancelled.append(irc_server)
+					raise
+				if fail:
+					raise ConnectionRefusedError(irc_server)
+				return (irc_server, None, None, None)
+
+		network = RacingNetwork(irc_client_class = None, irc_servers = [ ], identity_generator = None, client_configuration = None, identifier = "test")
+		network.client_configuration.connect_stagger_secs = 0.05
+
+		# First one fails right away, so the second is started without
+		# waiting for the stagger delay; the slow third one loses.
+		servers = [ (0, True), (0.01, False), (1, False) ]
+		(winner, failures) = await network._race(servers)
+		self.assertEqual(winner[0], servers[1])
+		self.assertEqual([ irc_server for (irc_server, exception) in failures ], [ servers[0] ])
+		self.assertEqual(started, servers[:2])
+		self.assertEqual(cancelled, [ ])
+
+		started.clear()
+		servers = [ (1, False), (0.01, False) ]
+		(winner, failures) = await network._race(servers)
+		self.assertEqual(winner[0], servers[1])
+		self.assertEqual(cancelled, [ servers[0] ])
+
+		(winner, failures) = await network._race([ (0, True), (0, True) ])
+		self.assertIsNone(winner)
+		self.assertEqual(len(failures), 2)
+
+	async def test_flapping_server(self):
+		connects = [ ]
+		class FlappingNetwork(IRCNetwork):
+			async def _establish(self, irc_server):
+				connects.append(irc_server)
+				self.reconnect_scheduler.record_success(irc_server, 0.01)
+				return (irc_server, None, None, None)
+
+			async def _run_connection(self, irc_server, transport, connection, rx_task):
+				if irc_server == "flapping":
+					raise ServerSeveredConnectionException("Closing Link")
+				self.connection_state = ConnectionState.Connected
+				await asyncio.Future()
+
+		network = FlappingNetwork(irc_client_class = None, irc_servers = [ "flapping" ], identity_generator = None, client_configuration = None, identifier = "test", timer_wheel = TimerWheel(resolution = 0.01))
+		network.client_configuration.set_timeout(IRCTimeout.ReconnectTimeAfterSeveredConnectionSecs, 0.01)
+		network.client_configuration.reconnect_stable_connection_secs = 0.05
+		network.start()
+		await asyncio.sleep(0.3)
+		network.stop()
+		status = network.reconnect_scheduler.get_status()
+		self.assertGreater(len(connects), 2)
+		self.assertEqual(status["servers"][0]["consecutive_failures"], len(connects))
+
+		connects.clear()
+		network = FlappingNetwork(irc_client_class = None, irc_servers = [ "flapping", "healthy" ], identity_generator = None, client_configuration = None, identifier = "test", timer_wheel = TimerWheel(resolution = 0.01))
+		network.client_configuration.set_timeout(IRCTimeout.ReconnectTimeAfterSeveredConnectionSecs, 0.01)
+		network.client_configuration.reconnect_stable_connection_secs = 0.05
+		network.start()
+		await asyncio.wait_for(network.connection_established(), timeout = 1)
+		await asyncio.sleep(0.1)
+		network.stop()
+		self.assertEqual(connects, [ "flapping", "healthy" ])
+		self.assertEqual(network.reconnect_scheduler.ordered_servers(), [ "healthy", "flapping" ])
+		self.assertIsNone(network.reconnect_scheduler.get_status()["previous_delay"])
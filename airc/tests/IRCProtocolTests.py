@@ -0,0 +1,87 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from airc.IRCProtocol import IRCProtocol
+
+class FakeTransport():
+	def __init__(self):
+		self.written = [ ]
+		self.closed = False
+
+	def write(self, data):
+		self.written.append(data)
+
+	def close(self):
+		self.closed = True
+
+class IRCProtocolTests(unittest.IsolatedAsyncioTestCase):
+	def _create_protocol(self, max_line_length = 512):
+		batches = [ ]
+		protocol = IRCProtocol(max_line_length = max_line_length)
+		protocol.connection_made(FakeTransport())
+		protocol.set_line_handler(batches.append)
+		return (protocol, batches)
+
+	async def test_split_chunks(self):
+		(protocol, batches) = self._create_protocol()
+		protocol.data_received(b"PING :a\r\nPING :b\r\nPI")
+		protocol.data_received(b"NG :c\r\n")
+		self.assertEqual(batches, [ [ b"PING :a\r", b"PING :b\r" ], [ b"PING :c\r" ] ])
+
+	async def test_pending_before_handler(self):
+		protocol = IRCProtocol(max_line_length = 512)
+		protocol.connection_made(FakeTransport())
+		protocol.data_received(b"PING :a\r\n")
+		batches = [ ]
+		protocol.set_line_handler(batches.append)
+		self.assertEqual(batches, [ [ b"PING :a\r" ] ])
+
+	async def test_overlong_complete_line(self):
+		(protocol, batches) = self._create_protocol(max_line_length = 16)
+		protocol.data_received(b"PING :a\r\n" + (b"x" * 100) + b"\r\nPING :b\r\n")
+		self.assertEqual(batches, [ [ b"PING :a\r", b"PING :b\r" ] ])
+		self.assertEqual(protocol.discarded_line_count, 1)
+
+	async def test_overlong_partial_line(self):
+		(protocol, batches) = self._create_protocol(max_line_length = 16)
+		protocol.data_received(b"x" * 100)
+		protocol.data_received(b"x" * 100)
+		protocol.data_received(b"xxx\r\nPING :a\r\n")
+		self.assertEqual(batches, [ [ b"PING :a\r" ] ])
+		self.assertEqual(protocol.discarded_line_count, 1)
+
+	async def test_handler_exception(self):
+		def handler(lines):
+			raise ValueError("foo")
+		protocol = IRCProtocol(max_line_length = 512)
+		transport = FakeTransport()
+		protocol.connection_made(transport)
+		protocol.set_line_handler(handler)
+		protocol.data_received(b"PING :a\r\n")
+		self.assertTrue(transport.closed)
+		with self.assertRaises(ValueError):
+			await protocol.closed
+
+	async def test_connection_lost(self):
+		(protocol, batches) = self._create_protocol()
+		protocol.connection_lost(None)
+		self.assertIsNone(await protocol.closed)
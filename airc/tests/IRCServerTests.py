@@ -19,9 +19,15 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
+import ssl
 import unittest
+import unittest.mock
 from airc.IRCServer import IRCServer
 
+class StubSSLObject():
+	def __init__(self, session):
+		self.session = session
+
 class IRCServerTests(unittest.TestCase):
 	def test_basic_functionality(self):
 		srv = IRCServer(hostname = "google.com", port = 80)
@@ -45,3 +51,35 @@ class IRCServerTests(unittest.TestCase):
 	def test_password(self):
 		srv = IRCServer(hostname = "freenode.org", password = "secret")
 		self.assertEqual(srv.password, "secret")
+
+	def test_tls_ctx_shared(self):
+		srv1 = IRCServer(hostname = "irc.a.net", use_tls = True, tls_insecure = True)
+		srv2 = IRCServer(hostname = "irc.b.net", use_tls = True, tls_insecure = True)
+		self.assertIs(srv1.tls_ctx, srv1.tls_ctx)
+		self.assertIs(srv1.tls_ctx, srv2.tls_ctx)
+		self.assertIsNone(IRCServer(hostname = "irc.a.net").tls_ctx)
+		srv1.store_tls_session(None)
+
+	def test_tls_session_resumption(self):
+		srv1 = IRCServer(hostname = "irc.resume.net", use_tls = True, tls_insecure = True)
+		srv2 = IRCServer(hostname = "irc.resume.net", port = 7000, use_tls = True, tls_insecure = True)
+		(session1, session2) = (object(), object())
+		srv1.store_tls_session(StubSSLObject(session1))
+		srv2.store_tls_session(StubSSLObject(session2))
+		srv2.store_tls_session(StubSSLObject(None))
+
+		with unittest.mock.patch.object(ssl.SSLContext, "wrap_bio") as wrap_bio:
+			with srv1.resume_tls_session():
+				srv1.tls_ctx.wrap_bio(ssl.MemoryBIO(), ssl.MemoryBIO(), server_hostname = "irc.resume.net")
+			self.assertIs(wrap_bio.call_args.kwargs["session"], session1)
+			with srv2.resume_tls_session():
+				srv2.tls_ctx.wrap_bio(ssl.MemoryBIO(), ssl.MemoryBIO(), server_hostname = "irc.resume.net")
+			self.assertIs(wrap_bio.call_args.kwargs["session"], session2)
+
+			# Unknown servers and connections outside of the context offer
+			# no session
+			with IRCServer(hostname = "irc.other.net", use_tls = True, tls_insecure = True).resume_tls_session():
+				srv1.tls_ctx.wrap_bio(ssl.MemoryBIO(), ssl.MemoryBIO(), server_hostname = "irc.other.net")
+			self.assertIsNone(wrap_bio.call_args.kwargs["session"])
+			srv1.tls_ctx.wrap_bio(ssl.MemoryBIO(), ssl.MemoryBIO(), server_hostname = "irc.resume.net")
+			self.assertIsNone(wrap_bio.call_args.kwargs["session"])
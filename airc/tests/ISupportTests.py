@@ -0,0 +1,92 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from airc.IRCMessageHandler import IRCMessageHandler
+from airc.ISupport import ISupport
+from airc.Tools import NameTools
+from airc.Enums import Usermode, MemberMode
+
+class ISupportTests(unittest.TestCase):
+	def setUp(self):
+		self._imh = IRCMessageHandler()
+		self._isupport = ISupport()
+
+	def _feed(self, tokens):
+		self._isupport.feed(self._imh.parse(f":srv 005 ourself {tokens} :are supported by this server\r\n".encode()))
+
+	def test_defaults(self):
+		self.assertEqual(self._isupport.casemapping, "rfc1459")
+		self.assertEqual(self._isupport.fold("Nick[A]\\~"), "nick{a}|^")
+		self.assertEqual(self._isupport.prefixes, "@+")
+		self.assertTrue(self._isupport.is_channel_name("#chan"))
+		self.assertFalse(self._isupport.is_channel_name("!chan"))
+		self.assertFalse(self._isupport.is_channel_name(""))
+		self.assertEqual(self._isupport.nicklen, 9)
+		self.assertIsNone(self._isupport.max_targets("JOIN"))
+		self.assertEqual(self._isupport.max_targets("PRIVMSG"), 1)
+
+	def test_casemapping(self):
+		self._feed("CASEMAPPING=ascii")
+		self.assertEqual(self._isupport.fold("Nick[A]"), "nick[a]")
+		self._feed("CASEMAPPING=strict-rfc1459")
+		self.assertEqual(self._isupport.fold("N[\\]~"), "n{|}~")
+
+	def test_prefix(self):
+		self._feed("PREFIX=(qaohv)~&@%+ CHANTYPES=#&!")
+		self.assertEqual(self._isupport.prefixes, "~&@%+")
+		self.assertEqual(self._isupport.prefix_modes["%"], "h")
+		self.assertEqual(self._isupport.strip_prefixes("~@+nick"), ("~@+", "nick"))
+		self.assertTrue(self._isupport.is_channel_name("!chan"))
+		self.assertEqual(NameTools.parse_nickname("%+nick", self._isupport), ("nick", Usermode.Voice, None, MemberMode.HalfOp | MemberMode.Voice))
+		self.assertEqual(NameTools.parse_nickname("~nick!u@h", self._isupport), ("nick", Usermode.Op, "u@h", MemberMode.Owner))
+		self.assertEqual(self._isupport.mode_flags["h"], MemberMode.HalfOp)
+
+	def test_targets(self):
+		self._feed("MAXTARGETS=3 NICKLEN=30")
+		self.assertEqual(self._isupport.max_targets("privmsg"), 3)
+		self.assertEqual(self._isupport.nicklen, 30)
+		self._feed("TARGMAX=JOIN:,PRIVMSG:4,NOTICE:4,KICK:1")
+		self.assertIsNone(self._isupport.max_targets("JOIN"))
+		self.assertEqual(self._isupport.max_targets("PRIVMSG"), 4)
+		self.assertIsNone(self._isupport.max_targets("PART"))
+		self.assertEqual(self._isupport.max_targets("KICK"), 1)
+		self.assertEqual(self._isupport.max_targets("WHOIS"), 1)
+		self._feed("TARGMAX=JOIN:2,PRIVMSG:4")
+		self.assertEqual(self._isupport.max_targets("JOIN"), 2)
+
+	def test_negation_and_escapes(self):
+		self._feed("CASEMAPPING=ascii NETWORK=Example\\x20Net EXCEPTS")
+		self.assertEqual(self._isupport.get("NETWORK"), "Example Net")
+		self.assertEqual(self._isupport.get("EXCEPTS"), "")
+		self.assertIn("EXCEPTS", self._isupport)
+		self._feed("-CASEMAPPING")
+		self.assertEqual(self._isupport.casemapping, "rfc1459")
+
+	def test_invalid_prefix(self):
+		self._feed("PREFIX=(ov)@")
+		self.assertEqual(self._isupport.prefixes, "@+")
+
+	def test_mode_changes(self):
+		self._feed("CHANMODES=beI,k,l,imnpst")
+		self.assertEqual(self._isupport.parse_mode_changes("+ov-v", [ "a", "b", "c" ]), [ (True, "o", "a"), (True, "v", "b"), (False, "v", "c") ])
+		self.assertEqual(self._isupport.parse_mode_changes("+lkb-lm+o", [ "10", "key", "*!*@host", "op" ]), [ (True, "l", "10"), (True, "k", "key"), (True, "b", "*!*@host"), (False, "l", None), (False, "m", None), (True, "o", "op") ])
+		self.assertEqual(self._isupport.parse_mode_changes("+oo", [ "a" ]), [ (True, "o", "a"), (True, "o", None) ])
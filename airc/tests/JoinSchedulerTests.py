@@ -0,0 +1,122 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import asyncio
+import unittest
+from airc.Channel import Channel
+from airc.MembershipStore import MembershipStore
+from airc.PendingResponses import PendingResponses
+from airc.TimerWheel import TimerWheel
+from airc.ISupport import ISupport
+from airc.IRCMessageHandler import IRCMessageHandler
+from airc.Enums import IRCTimeout, StatEvent, ChannelJoinState
+from airc.client.JoinScheduler import JoinScheduler
+
+class FakeConfiguration():
+	def timeout(self, timeout):
+		return {
+			IRCTimeout.JoinChannelTimeoutSecs:		0.05,
+			IRCTimeout.RejoinChannelTimeSecs:		0.02,
+			IRCTimeout.RejoinChannelBannedTimeSecs:	0.3,
+		}[timeout]
+
+class FakeClient():
+	def __init__(self):
+		self.isupport = ISupport()
+		self.config = FakeConfiguration()
+		self.irc_connection = self
+		self.timer_wheel = TimerWheel(resolution = 0.01)
+		self.pending = PendingResponses(timer_wheel = self.timer_wheel)
+		self.lines = [ ]
+
+	def fold(self, name):
+		return self.isupport.fold(name)
+
+	def tx_message(self, text, expect = None):
+		self.lines.append(text)
+		self.pending.add(expect)
+		return expect.future
+
+class JoinSchedulerTests(unittest.IsolatedAsyncioTestCase):
+	def test_pack_channels(self):
+		names = [ f"#chan{i}" for i in range(10) ]
+		self.assertEqual(JoinScheduler.pack_channels(names), [ names ])
+		self.assertEqual(JoinScheduler.pack_channels(names, max_targets = 4), [ names[0:4], names[4:8], names[8:10] ])
+		self.assertEqual(JoinScheduler.pack_channels([ ]), [ ])
+		for group in JoinScheduler.pack_channels(names, max_length = 20):
+			self.assertLessEqual(len("JOIN " + ",".join(group)), 20)
+		self.assertEqual(sum(JoinScheduler.pack_channels(names, max_length = 20), [ ]), names)
+
+		long_names = [ "#" + ("x" * 100) + str(i) for i in range(20) ]
+		groups = JoinScheduler.pack_channels(long_names)
+		self.assertEqual(sum(groups, [ ]), long_names)
+		for group in groups:
+			self.assertLessEqual(len("JOIN " + ",".join(group)), JoinScheduler.MAX_LINE_LENGTH)
+
+	async def test_batched_join(self):
+		client = FakeClient()
+		scheduler = JoinScheduler(client)
+		membership = MembershipStore()
+		channels = [ Channel(f"#chan{i}", membership) for i in range(5) ]
+		for channel in channels:
+			scheduler.join(channel)
+		scheduler.join(channels[0])
+		await asyncio.sleep(0)
+		self.assertEqual(client.lines, [ "JOIN #chan0,#chan1,#chan2,#chan3,#chan4" ])
+
+		scheduler.joined("#CHAN0")
+		scheduler.joined("#chan1")
+		scheduler.banned("#chan2", "go away")
+		self.assertTrue(channels[0].joined)
+		self.assertEqual(scheduler.get_state("#chan2"), ChannelJoinState.Backoff)
+		self.assertEqual(scheduler.get_state("#chan3"), ChannelJoinState.Joining)
+
+		# #chan3 and #chan4 time out and are retried together, #chan2 is
+		# retried only after the longer ban delay.
+		await asyncio.sleep(0.15)
+		self.assertEqual(client.lines[1], "JOIN #chan3,#chan4")
+		self.assertEqual(channels[3].stats[StatEvent.ChannelJoinFailureTimeout.value], 1)
+		scheduler.joined("#chan3")
+		scheduler.joined("#chan4")
+		await asyncio.sleep(0.05)
+		self.assertEqual(len(client.lines), 2)
+		await asyncio.sleep(0.15)
+		self.assertEqual(client.lines[2:], [ "JOIN #chan2" ])
+		self.assertEqual(channels[2].stats[StatEvent.ChannelJoinFailureBanned.value], 1)
+
+		channels[0].joined = False
+		scheduler.kicked("#chan0")
+		await asyncio.sleep(0.05)
+		self.assertEqual(client.lines[-1], "JOIN #chan0")
+		scheduler.cancel_all()
+		await asyncio.sleep(0)
+		self.assertEqual(len(client.timer_wheel), 0)
+
+	async def test_join_with_server_targmax(self):
+		client = FakeClient()
+		client.isupport.feed(IRCMessageHandler().parse(b":irc.example.net 005 me CHANTYPES=# TARGMAX=NAMES:1,LIST:1,KICK:1,WHOIS:1,PRIVMSG:4,NOTICE:4 :are supported by this server\r\n"))
+		scheduler = JoinScheduler(client)
+		membership = MembershipStore()
+		for i in range(6):
+			scheduler.join(Channel(f"#chan{i}", membership))
+		await asyncio.sleep(0)
+		self.assertEqual(client.lines, [ "JOIN #chan0,#chan1,#chan2,#chan3,#chan4,#chan5" ])
+		scheduler.cancel_all()
@@ -0,0 +1,192 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from airc.MembershipStore import MembershipStore
+from airc.NicknamePool import NicknamePool
+from airc.ISupport import ISupport
+from airc.Channel import Channel
+from airc.Enums import MemberMode
+
+class MembershipStoreTests(unittest.TestCase):
+	def setUp(self):
+		self._pool = NicknamePool(fold = ISupport().fold)
+		self._store = MembershipStore(nickname_pool = self._pool)
+		self._a = Channel("#A", self._store)
+		self._b = Channel("#b", self._store)
+
+	def test_add_remove(self):
+		self._a.add_user("Joe")
+		self._b.add_user("joe")
+		self._a.add_user("ann")
+		self.assertEqual(set(self._a.users), set([ "joe", "ann" ]))
+		self.assertTrue(self._store.is_member("#a", "JOE"))
+		self.assertEqual(set(self._store.channels_of("Joe")), set([ "#a", "#b" ]))
+		self._a.remove_user("JOE")
+		self.assertEqual(set(self._a.users), set([ "ann" ]))
+		self.assertEqual(set(self._store.channels_of("joe")), set([ "#b" ]))
+		self._b.remove_user("joe")
+		self.assertEqual(self._store.user_count, 1)
+		self.assertEqual(len(self._pool), 1)
+
+	def test_untracked_channel(self):
+		self._store.add("#other", "joe")
+		self.assertEqual(self._store.user_count, 0)
+		self.assertEqual(list(self._store.members("#other")), [ ])
+
+	def test_quit(self):
+		self._a.add_user("joe")
+		self._b.add_user("joe")
+		self._b.add_user("ann")
+		self.assertEqual(self._store.quit("JOE"), set([ "#a", "#b" ]))
+		self.assertEqual(self._a.user_count, 0)
+		self.assertEqual(list(self._b.users), [ "ann" ])
+		self.assertEqual(self._store.quit("joe"), set())
+		self.assertEqual(self._pool.refcount("joe"), 0)
+		self.assertEqual(self._pool.refcount("ann"), 1)
+
+	def test_rename(self):
+		self._a.add_user("joe")
+		self._b.add_user("joe")
+		self._store.rename("joe", "Joe[away]")
+		self.assertEqual(list(self._a.users), [ "Joe[away]" ])
+		self.assertTrue(self._b.has_user("joe{away}"))
+		self.assertFalse(self._b.has_user("joe"))
+		self._store.rename("joe{AWAY}", "JOE[away]")
+		self.assertEqual(list(self._b.users), [ "JOE[away]" ])
+		self.assertEqual(self._store.user_count, 1)
+		self.assertEqual(self._pool.refcount("joe{away}"), 2)
+		self.assertEqual(len(self._pool), 1)
+
+	def test_clear_channel(self):
+		self._a.add_user("joe")
+		self._a.add_user("ann")
+		self._b.add_user("joe")
+		self._a.clear_users()
+		self.assertEqual(self._a.user_count, 0)
+		self.assertEqual(set(self._store.channels_of("joe")), set([ "#b" ]))
+		self.assertEqual(self._store.user_count, 1)
+
+	def test_modes(self):
+		self._a.add_user("op", MemberMode.Op | MemberMode.Voice)
+		self._a.add_user("voice", MemberMode.Voice)
+		self._a.add_user("regular")
+		self._b.add_user("regular", MemberMode.Op)
+		self.assertEqual(list(self._a.ops), [ "op" ])
+		self.assertEqual(set(self._a.voiced), set([ "op", "voice" ]))
+		self.assertEqual(self._a.get_user_modes("REGULAR"), MemberMode.Regular)
+		self.assertEqual(self._b.get_user_modes("regular"), MemberMode.Op)
+		self.assertIsNone(self._b.get_user_modes("op"))
+
+		self._a.change_user_modes("regular", set_modes = MemberMode.Op)
+		self._a.change_user_modes("op", clear_modes = MemberMode.Op)
+		self.assertEqual(list(self._a.ops), [ "regular" ])
+		self.assertEqual(self._a.get_user_modes("op"), MemberMode.Voice)
+
+		self._store.rename("regular", "renamed")
+		self.assertEqual(self._a.get_user_modes("renamed"), MemberMode.Op)
+
+	def test_replace_members(self):
+		self._a.add_user("stale")
+		self._a.add_user("joe")
+		self._b.add_user("stale")
+		self._a.replace_users([ ("Joe", MemberMode.Op), ("ann", 0), ("ann", MemberMode.Voice) ])
+		self.assertEqual(set(self._a.users), set([ "Joe", "ann" ]))
+		self.assertEqual(self._a.get_user_modes("joe"), MemberMode.Op)
+		self.assertEqual(self._a.get_user_modes("ann"), MemberMode.Voice)
+		self.assertEqual(set(self._store.channels_of("stale")), set([ "#b" ]))
+		self.assertEqual(self._pool.refcount("stale"), 1)
+		self.assertEqual(self._pool.refcount("joe"), 1)
+		self.assertEqual(self._pool.refcount("ann"), 1)
+		self._a.replace_users([ ])
+		self.assertEqual(self._a.user_count, 0)
+		self.assertEqual(len(self._pool), 1)
+
+	def test_snapshot(self):
+		self._a.add_user("joe")
+		snapshot = self._a.users
+		self.assertIsInstance(snapshot, frozenset)
+		self.assertIs(self._a.users, snapshot)
+		self._a.add_user("joe", MemberMode.Op)
+		self.assertIs(self._a.users, snapshot)
+		self._a.add_user("ann")
+		self.assertEqual(snapshot, frozenset([ "joe" ]))
+		self.assertEqual(self._a.users, frozenset([ "joe", "ann" ]))
+		self._store.quit("joe")
+		self.assertEqual(self._a.users, frozenset([ "ann" ]))
+
+	def test_added_since(self):
+		(version, added) = self._a.users_added_since(0)
+		self.assertEqual(added, set())
+		self._a.add_user("joe")
+		self._a.add_user("ann")
+		(version, added) = self._a.users_added_since(version)
+		self.assertEqual(added, set([ "joe", "ann" ]))
+		(version, added) = self._a.users_added_since(version)
+		self.assertEqual(added, set())
+
+		self._a.add_user("bob")
+		self._a.remove_user("ann")
+		self._store.rename("joe", "joe2")
+		self._a.add_user("gone")
+		self._store.quit("gone")
+		(version, added) = self._a.users_added_since(version)
+		self.assertEqual(added, set([ "bob", "joe2" ]))
+
+		self._a.replace_users([ ("bob", 0), ("joe2", 0), ("new", 0) ])
+		(version, added) = self._a.users_added_since(version)
+		self.assertEqual(added, set([ "new" ]))
+		self.assertEqual(self._a.users_added_since(0)[1], set([ "bob", "joe2", "new" ]))
+
+	def test_added_since_compaction(self):
+		self._a.add_user("stays")
+		(version, added) = self._a.users_added_since(0)
+		for i in range(1000):
+			self._a.add_user(f"user{i}")
+			self._a.remove_user(f"user{i}")
+		self._a.add_user("last")
+		self.assertEqual(self._a.users_added_since(version)[1], set([ "last" ]))
+		self.assertEqual(self._a.users_added_since(0)[1], set([ "stays", "last" ]))
+
+	def test_netsplit(self):
+		for i in range(10000):
+			self._a.add_user(f"user{i}")
+			if (i % 2) == 0:
+				self._b.add_user(f"user{i}")
+		for i in range(10000):
+			self._store.quit(f"user{i}")
+		self.assertEqual(self._a.user_count, 0)
+		self.assertEqual(self._b.user_count, 0)
+		self.assertEqual(self._store.user_count, 0)
+		self.assertEqual(len(self._pool), 0)
+
+	def test_interning(self):
+		self._a.add_user("joe")
+		self._b.add_user("Joe")
+		self.assertEqual(self._pool.refcount("JOE"), 2)
+		self.assertIs(next(iter(self._a.users)), next(iter(self._b.users)))
+		self.assertIs(self._pool.intern("".join([ "J", "oe" ])), next(iter(self._a.users)))
+		self.assertEqual(self._pool.intern("unknown"), "unknown")
+		self._a.add_user("joe", MemberMode.Op)
+		self.assertEqual(self._pool.refcount("joe"), 2)
+		self._a.clear_users()
+		self._b.clear_users()
+		self.assertEqual(len(self._pool), 0)
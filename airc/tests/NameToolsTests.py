@@ -0,0 +1,49 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from airc.Tools import NameTools
+from airc.Enums import Usermode, MemberMode
+
+class NameToolsTests(unittest.TestCase):
+	def test_single_prefix(self):
+		self.assertEqual(NameTools.parse_nickname("@op"), ("op", Usermode.Op, None, MemberMode.Op))
+		self.assertEqual(NameTools.parse_nickname("+voice"), ("voice", Usermode.Voice, None, MemberMode.Voice))
+		self.assertEqual(NameTools.parse_nickname("regular"), ("regular", Usermode.Regular, None, MemberMode.Regular))
+
+	def test_multi_prefix(self):
+		self.assertEqual(NameTools.parse_nickname("@+both").nickname, "both")
+		self.assertEqual(NameTools.parse_nickname("@+both").mode, Usermode.Op)
+		self.assertEqual(NameTools.parse_nickname("@+both").modes, MemberMode.Op | MemberMode.Voice)
+		self.assertEqual(NameTools.parse_nickname("%+halfop").mode, Usermode.Voice)
+		self.assertEqual(NameTools.parse_nickname("~owner").mode, Usermode.Op)
+
+	def test_userhost_in_names(self):
+		nickname = NameTools.parse_nickname("@+nick!~user@host.example.com")
+		self.assertEqual(nickname.nickname, "nick")
+		self.assertEqual(nickname.mode, Usermode.Op)
+		self.assertEqual(nickname.userhost, "~user@host.example.com")
+		self.assertEqual(NameTools.parse_nickname("nick!u@h"), ("nick", Usermode.Regular, "u@h", 0))
+
+	def test_parse_names(self):
+		self.assertEqual(NameTools.parse_names([ "@+op", "+voice", "regular", "", "~&owner" ]), [ ("op", MemberMode.Op | MemberMode.Voice), ("voice", MemberMode.Voice), ("regular", 0), ("owner", MemberMode.Owner | MemberMode.Admin) ])
+		self.assertEqual(NameTools.parse_names([ "@op!~u@h", "regular!u@h" ]), [ ("op", MemberMode.Op), ("regular", 0) ])
+		self.assertEqual(NameTools.parse_names([ ]), [ ])
@@ -0,0 +1,85 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from airc.Origin import Origin
+from airc.OriginCache import OriginCache
+from airc.IRCMessageHandler import IRCMessageHandler
+
+class OriginTests(unittest.TestCase):
+	def _assert_same(self, text):
+		eager = Origin.parse(text)
+		deferred = Origin.deferred(text)
+		self.assertEqual(eager.nickname, deferred.nickname)
+		self.assertEqual(eager.is_user_msg, deferred.is_user_msg)
+		self.assertEqual(eager.username, deferred.username)
+		self.assertEqual(eager.hostname, deferred.hostname)
+		self.assertEqual(eager.username_is_alias, deferred.username_is_alias)
+		self.assertEqual(str(eager), str(deferred))
+
+	def test_deferred_user(self):
+		self._assert_same(":nick!~user@host.example.com")
+		self._assert_same(":nick!user@host.example.com")
+		self._assert_same(":nick!~@host")
+
+	def test_deferred_server(self):
+		self._assert_same(":irc.example.com")
+		self._assert_same(":nick!@a@b")
+		self._assert_same(":!user@host")
+		self._assert_same(":nick!user")
+
+	def test_nickname_only_access(self):
+		origin = Origin.deferred(":nick!~user@host")
+		self.assertTrue(origin.has_nickname("NICK"))
+		self.assertEqual(origin.hostname, "host")
+		self.assertEqual(origin.nickname, "nick")
+
+	def test_slots(self):
+		origin = Origin.deferred(":nick!~user@host")
+		with self.assertRaises(AttributeError):
+			origin.foo = "bar"
+
+	def test_cache_shared(self):
+		cache = OriginCache(maxsize = 2)
+		imh = IRCMessageHandler(origin_cache = cache)
+		msg1 = imh.parse(b":nick!~user@host PRIVMSG #chan :one\r\n")
+		msg2 = imh.parse(b":nick!~user@host PRIVMSG #chan :two\r\n")
+		self.assertIs(msg1.origin, msg2.origin)
+		self.assertEqual(msg1.origin.nickname, "nick")
+		self.assertEqual((cache.hits, cache.misses), (1, 1))
+		self.assertAlmostEqual(cache.hit_rate, 0.5)
+
+	def test_cache_bounded(self):
+		cache = OriginCache(maxsize = 2)
+		first = cache.get(b":a!~a@host")
+		cache.get(b":b!~b@host")
+		cache.get(b":c!~c@host")
+		self.assertEqual(cache.get_status()["size"], 2)
+		self.assertIsNot(cache.get(b":a!~a@host"), first)
+		self.assertEqual(cache.hits, 0)
+
+	def test_interned_nickname(self):
+		nickname = "nick"
+		origin = Origin.deferred(":" + "".join([ "ni", "ck" ]) + "!user@host", intern = { nickname: nickname }.get)
+		self.assertIs(origin.nickname, nickname)
+		origin = Origin.deferred(":" + "".join([ "ni", "ck" ]) + "!user@host", intern = lambda text: { nickname: nickname }.get(text, text))
+		self.assertEqual(origin.hostname, "host")
+		self.assertIs(origin.nickname, nickname)
@@ -0,0 +1,135 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import asyncio
+import unittest
+from airc.TokenBucket import TokenBucket
+from airc.OutboundQueue import OutboundQueue
+from airc.Enums import TxPriority
+
+class FakeClock():
+	def __init__(self):
+		self.now = 0
+
+	def __call__(self):
+		return self.now
+
+class FakeProtocol():
+	def __init__(self):
+		self.writes = [ ]
+
+	def write(self, data):
+		self.writes.append(data)
+
+	async def drain(self):
+		pass
+
+class OutboundQueueTests(unittest.IsolatedAsyncioTestCase):
+	def test_token_bucket(self):
+		clock = FakeClock()
+		bucket = TokenBucket(rate = 0.5, burst = 5, clock = clock)
+		for _ in range(5):
+			self.assertTrue(bucket.consume())
+		self.assertFalse(bucket.consume())
+		self.assertAlmostEqual(bucket.delay(), 2)
+		clock.now = 3
+		self.assertTrue(bucket.consume())
+		self.assertAlmostEqual(bucket.delay(), 1)
+		clock.now = 1000
+		self.assertAlmostEqual(bucket.tokens, 5)
+
+	async def _run_until_idle(self, queue):
+		task = asyncio.create_task(queue.run())
+		for _ in range(10):
+			await asyncio.sleep(0)
+		return task
+
+	async def test_coalescing(self):
+		protocol = FakeProtocol()
+		sent = [ ]
+		queue = OutboundQueue(protocol, sent_callback = sent.append)
+		queue.put(b"A\r\n")
+		queue.put(b"B\r\n", expect = "expect")
+		queue.put(b"C\r\n")
+		self.assertEqual(queue.depth, 3)
+		task = await self._run_until_idle(queue)
+		task.cancel()
+		self.assertEqual(protocol.writes, [ b"A\r\nB\r\nC\r\n" ])
+		self.assertEqual(sent, [ "expect" ])
+		self.assertEqual(queue.depth, 0)
+		self.assertEqual(queue.get_status()["lines_sent"], 3)
+
+	async def test_flood_control(self):
+		protocol = FakeProtocol()
+		clock = FakeClock()
+		queue = OutboundQueue(protocol, token_bucket = TokenBucket(rate = 100, burst = 2, clock = clock))
+		for i in range(5):
+			queue.put(f"{i}\r\n".encode())
+		task = await self._run_until_idle(queue)
+		self.assertEqual(protocol.writes, [ b"0\r\n1\r\n" ])
+		self.assertEqual(queue.depth, 3)
+		clock.now = 1
+		await asyncio.sleep(0.02)
+		self.assertEqual(protocol.writes, [ b"0\r\n1\r\n", b"2\r\n3\r\n" ])
+		clock.now = 2
+		await asyncio.sleep(0.05)
+		task.cancel()
+		self.assertEqual(protocol.writes, [ b"0\r\n1\r\n", b"2\r\n3\r\n", b"4\r\n" ])
+
+	async def test_priorities(self):
+		protocol = FakeProtocol()
+		clock = FakeClock()
+		queue = OutboundQueue(protocol, token_bucket = TokenBucket(rate = 100, burst = 3, clock = clock))
+		for i in range(5):
+			queue.put(f"PRIVMSG {i}\r\n".encode(), priority = TxPriority.Bulk)
+		queue.put(b"JOIN #foo\r\n", priority = TxPriority.Control)
+		queue.put(b"PONG :x\r\n", priority = TxPriority.Urgent)
+		task = await self._run_until_idle(queue)
+		self.assertEqual(protocol.writes, [ b"PONG :x\r\nJOIN #foo\r\n" ])
+		self.assertEqual(queue.class_depth(TxPriority.Bulk), 5)
+
+		# Bulk traffic may not use the last token, keepalive can still go out
+		clock.now = 0.03
+		await asyncio.sleep(0.02)
+		self.assertEqual(protocol.writes[1:], [ b"PRIVMSG 0\r\nPRIVMSG 1\r\n" ])
+		queue.put(b"PONG :y\r\n", priority = TxPriority.Urgent)
+		await asyncio.sleep(0)
+		await asyncio.sleep(0)
+		task.cancel()
+		self.assertEqual(protocol.writes[2:], [ b"PONG :y\r\n" ])
+		status = queue.get_status()
+		self.assertEqual(status["classes"]["urgent"]["sent"], 2)
+		self.assertEqual(status["classes"]["bulk"]["sent"], 2)
+		self.assertEqual(status["classes"]["bulk"]["depth"], 3)
+
+	async def test_bulk_with_single_token_burst(self):
+		protocol = FakeProtocol()
+		clock = FakeClock()
+		queue = OutboundQueue(protocol, token_bucket = TokenBucket(rate = 20, burst = 1, clock = clock))
+		queue.put(b"PRIVMSG 0\r\n", priority = TxPriority.Bulk)
+		queue.put(b"PRIVMSG 1\r\n", priority = TxPriority.Bulk)
+		task = await self._run_until_idle(queue)
+		self.assertEqual(protocol.writes, [ b"PRIVMSG 0\r\n" ])
+		clock.now = 1
+		await asyncio.sleep(0.08)
+		task.cancel()
+		self.assertEqual(protocol.writes, [ b"PRIVMSG 0\r\n", b"PRIVMSG 1\r\n" ])
+		self.assertEqual(queue.depth, 0)
@@ -0,0 +1,164 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import asyncio
+import unittest
+from airc.IRCMessageHandler import IRCMessageHandler
+from airc.ExpectedResponse import ExpectedResponse
+from airc.PendingResponses import PendingResponses
+from airc.ISupport import ISupport
+from airc.ReplyCode import ReplyCode
+
+class CountingExpectedResponse(ExpectedResponse):
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.feed_count = 0
+
+	def feed(self, msg):
+		self.feed_count += 1
+		return super().feed(msg)
+
+class PendingResponsesTests(unittest.IsolatedAsyncioTestCase):
+	def setUp(self):
+		self._imh = IRCMessageHandler()
+
+	def _parse(self, line):
+		return self._imh.parse(line.encode() + b"\r\n")
+
+	def _join_response(self, channel_name):
+		expect = ExpectedResponse.on_join(channel_name)
+		return CountingExpectedResponse(finish_conditions = expect.finish_conditions, index_keys = expect.index_keys)
+
+	async def test_join_by_channel(self):
+		pending = PendingResponses()
+		responses = { name: self._join_response(name) for name in [ "#foo", "#bar", "#baz" ] }
+		for response in responses.values():
+			pending.add(response)
+		self.assertEqual(len(pending), 3)
+
+		pending.feed(self._parse(":me!~me@host JOIN #FOO"))
+		self.assertEqual(len(pending), 2)
+		self.assertTrue(responses["#foo"].future.done())
+		self.assertEqual(responses["#bar"].feed_count, 0)
+		self.assertEqual(responses["#baz"].feed_count, 0)
+
+		pending.feed(self._parse(":srv 474 me #bar :Cannot join channel (+b)"))
+		self.assertEqual(len(pending), 1)
+		self.assertTrue(responses["#bar"].future.result()[0].is_cmdcode(ReplyCode.ERR_BANNEDFROMCHAN))
+
+		pending.feed(self._parse(":someone!~x@host PRIVMSG #baz :hello"))
+		self.assertEqual(responses["#baz"].feed_count, 0)
+
+	async def test_privmsg_from(self):
+		pending = PendingResponses()
+		expect = ExpectedResponse.on_privmsg_from("Peer", ctcp_message = True)
+		pending.add(expect)
+		pending.feed(self._parse(":other!~x@host PRIVMSG me :\x01DCC ACCEPT\x01"))
+		pending.feed(self._parse(":peer!~x@host PRIVMSG me :no ctcp"))
+		self.assertFalse(expect.future.done())
+		pending.feed(self._parse(":peer!~x@host PRIVMSG me :\x01DCC ACCEPT\x01"))
+		self.assertTrue(expect.future.done())
+		self.assertEqual(len(pending), 0)
+
+	async def test_server_casemapping(self):
+		isupport = ISupport()
+		pending = PendingResponses(fold = isupport.fold)
+		privmsg = ExpectedResponse.on_privmsg_from("foo{", fold = isupport.fold)
+		join = ExpectedResponse.on_join("#bar|", fold = isupport.fold)
+		pending.add(privmsg)
+		pending.add(join)
+		pending.feed(self._parse(":Foo[!~x@host PRIVMSG me :hello"))
+		pending.feed(self._parse(":me!~me@host JOIN #BAR\\"))
+		self.assertTrue(privmsg.future.done())
+		self.assertTrue(join.future.done())
+		self.assertEqual(len(pending), 0)
+
+	async def test_cmdcode_with_record(self):
+		pending = PendingResponses()
+		expect = ExpectedResponse.on_cmdcode(finish_cmdcodes = (ReplyCode.RPL_LISTEND, ), record_cmdcodes = (ReplyCode.RPL_LIST, ))
+		pending.add(expect)
+		pending.feed(self._parse(":srv 322 me #a 5 :topic a"))
+		pending.feed(self._parse(":srv 322 me #b 7 :topic b"))
+		pending.feed(self._parse(":srv 323 me :End of LIST"))
+		self.assertEqual([ msg.get_param(1) for msg in expect.future.result() ], [ "#a", "#b" ])
+		self.assertEqual(len(pending), 0)
+
+	async def test_unindexed(self):
+		pending = PendingResponses()
+		expect = ExpectedResponse(finish_conditions = (lambda msg: msg.is_cmdcode("PONG"), ))
+		pending.add(expect)
+		pending.feed(self._parse(":srv PONG srv :token"))
+		self.assertTrue(expect.future.done())
+		self.assertEqual(len(pending), 0)
+
+	async def test_remove(self):
+		pending = PendingResponses()
+		expect = ExpectedResponse.on_cmdcode(finish_cmdcodes = ("MODE", "mode"))
+		pending.add(expect)
+		pending.remove(expect)
+		pending.remove(expect)
+		self.assertEqual(len(pending), 0)
+		pending.feed(self._parse(":me MODE me :+i"))
+		self.assertFalse(expect.future.done())
+
+	async def test_timeout(self):
+		pending = PendingResponses()
+		short = ExpectedResponse.on_join("#short", timeout = 0.01)
+		long = ExpectedResponse.on_join("#long", timeout = 10)
+		pending.add(long)
+		pending.add(short)
+		with self.assertRaises(asyncio.exceptions.TimeoutError):
+			await short.future
+		self.assertEqual(len(pending), 1)
+		self.assertFalse(long.future.done())
+		pending.feed(self._parse(":me!~me@host JOIN #long"))
+		self.assertTrue(long.future.done())
+		self.assertEqual(len(pending), 0)
+
+	async def test_cancel_by_awaiter(self):
+		pending = PendingResponses()
+		expect = ExpectedResponse.on_join("#chan")
+		pending.add(expect)
+		with self.assertRaises(asyncio.exceptions.TimeoutError):
+			await asyncio.wait_for(expect.future, timeout = 0.01)
+		await asyncio.sleep(0)
+		self.assertEqual(len(pending), 0)
+
+	async def test_cancel_all(self):
+		pending = PendingResponses()
+		expects = [ ExpectedResponse.on_join(f"#chan{i}", timeout = 10) for i in range(10) ]
+		for expect in expects:
+			pending.add(expect)
+		pending.cancel_all()
+		await asyncio.sleep(0)
+		self.assertTrue(all(expect.future.cancelled() for expect in expects))
+		self.assertEqual(len(pending), 0)
+
+	async def test_wants_cmdcode(self):
+		pending = PendingResponses()
+		self.assertFalse(pending.wants_cmdcode("JOIN"))
+		expect = ExpectedResponse.on_join("#chan")
+		pending.add(expect)
+		self.assertTrue(pending.wants_cmdcode("JOIN"))
+		self.assertTrue(pending.wants_cmdcode(ReplyCode.ERR_BANNEDFROMCHAN))
+		self.assertFalse(pending.wants_cmdcode("PRIVMSG"))
+		pending.remove(expect)
+		self.assertFalse(pending.wants_cmdcode("JOIN"))
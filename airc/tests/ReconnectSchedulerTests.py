@@ -0,0 +1,94 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import random
+import unittest
+from airc.ReconnectScheduler import ReconnectScheduler
+
+class ReconnectSchedulerTests(unittest.TestCase):
+	def test_ordering(self):
+		scheduler = ReconnectScheduler([ "a", "b", "c", "d" ])
+		self.assertEqual(scheduler.ordered_servers(), [ "a", "b", "c", "d" ])
+		scheduler.record_success("c", 0.5)
+		scheduler.record_success("d", 0.1)
+		scheduler.record_failure("a")
+		self.assertEqual(scheduler.ordered_servers(), [ "d", "c", "b", "a" ])
+
+		scheduler.record_failure("d")
+		scheduler.record_failure("a")
+		self.assertEqual(scheduler.ordered_servers(), [ "c", "b", "d", "a" ])
+
+		# Latency is averaged, failures only forgotten once stable
+		scheduler.record_success("d", 1.1)
+		self.assertEqual(scheduler.ordered_servers(), [ "c", "b", "d", "a" ])
+		scheduler.record_stable("d")
+		self.assertAlmostEqual(scheduler.get_status()["servers"][0]["latency"], 0.4)
+		self.assertEqual(scheduler.ordered_servers(), [ "d", "c", "b", "a" ])
+
+	def test_backoff(self):
+		scheduler = ReconnectScheduler([ "a" ], backoff_cap_secs = 100, clean_close_jitter_secs = 3, rng = random.Random(1))
+		previous = 5
+		delays = [ ]
+		for _ in range(50):
+			delay = scheduler.next_delay(5)
+			self.assertGreaterEqual(delay, 5)
+			self.assertLessEqual(delay, min(100, 3 * previous))
+			delays.append(delay)
+			previous = delay
+		self.assertEqual(max(delays), 100)
+		self.assertGreater(len(set(delays)), 10)
+
+		scheduler.record_success("a", 1)
+		self.assertGreater(scheduler.get_status()["previous_delay"], 15)
+		scheduler.record_stable("a")
+		self.assertLessEqual(scheduler.next_delay(5), 15)
+
+	def test_flapping_server(self):
+		# Server "a" accepts registration, but drops us every time
+		scheduler = ReconnectScheduler([ "a", "b" ], backoff_cap_secs = 100, rng = random.Random(1))
+		delays = [ ]
+		for _ in range(20):
+			scheduler.record_success("a", 0.1)
+			scheduler.record_failure("a")
+			delays.append(scheduler.next_delay(5))
+		self.assertEqual(scheduler.ordered_servers(), [ "b", "a" ])
+		self.assertEqual(scheduler.get_status()["servers"][1]["consecutive_failures"], 20)
+		# Without a stable connection the backoff is never reset and grows
+		# beyond three times the base delay
+		self.assertEqual(delays[:3], sorted(delays[:3]))
+		self.assertEqual(max(delays), 100)
+		self.assertGreater(len([ delay for delay in delays if delay > 15 ]), 10)
+
+	def test_clean_close(self):
+		scheduler = ReconnectScheduler([ "a" ], clean_close_jitter_secs = 3, rng = random.Random(1))
+		delays = [ scheduler.next_delay(0) for _ in range(50) ]
+		for delay in delays:
+			self.assertGreaterEqual(delay, 0)
+			self.assertLessEqual(delay, 3)
+		self.assertGreater(len(set(delays)), 10)
+		self.assertGreater(max(delays), 0)
+
+		# Clean closes do not feed into the backoff
+		self.assertIsNone(scheduler.get_status()["previous_delay"])
+		self.assertLessEqual(scheduler.next_delay(5), 15)
+
+		scheduler.clean_close_jitter_secs = 0
+		self.assertEqual(scheduler.next_delay(0), 0)
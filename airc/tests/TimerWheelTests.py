@@ -0,0 +1,119 @@
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import random
+import asyncio
+import unittest
+from airc.TimerWheel import TimerWheel
+
+class TimerWheelTests(unittest.IsolatedAsyncioTestCase):
+	async def test_order(self):
+		wheel = TimerWheel(resolution = 1)
+		fired = [ ]
+		now = wheel.time()
+		for delay in [ 5, 3, 70, 1, 5000, 64, 300000, 4096 ]:
+			wheel.call_at(now + delay, fired.append, delay)
+		self.assertEqual(len(wheel), 8)
+		wheel.expire(now + 4)
+		self.assertEqual(fired, [ 1, 3 ])
+		wheel.expire(now + 100)
+		self.assertEqual(fired, [ 1, 3, 5, 64, 70 ])
+		wheel.expire(now + 10000)
+		self.assertEqual(fired, [ 1, 3, 5, 64, 70, 4096, 5000 ])
+		self.assertEqual(len(wheel), 1)
+		wheel.expire(now + 299998)
+		self.assertEqual(len(fired), 7)
+		wheel.expire(now + 300001)
+		self.assertEqual(fired[-1], 300000)
+		self.assertEqual(len(wheel), 0)
+
+	async def test_never_early(self):
+		wheel = TimerWheel(resolution = 1)
+		fired = [ ]
+		now = wheel.time()
+		wheel.call_at(now + 200.5, fired.append, True)
+		wheel.expire(now + 200)
+		self.assertEqual(fired, [ ])
+		wheel.expire(now + 202)
+		self.assertEqual(fired, [ True ])
+
+	async def test_cancel(self):
+		wheel = TimerWheel(resolution = 1)
+		fired = [ ]
+		now = wheel.time()
+		handles = [ wheel.call_at(now + delay, fired.append, delay) for delay in range(1, 200) ]
+		for handle in handles[::2]:
+			handle.cancel()
+		self.assertTrue(handles[0].cancelled)
+		self.assertTrue(handles[1].active)
+		wheel.expire(now + 1000)
+		self.assertEqual(fired, list(range(2, 200, 2)))
+		self.assertEqual(len(wheel), 0)
+
+	async def test_reschedule_from_callback(self):
+		wheel = TimerWheel(resolution = 1)
+		fired = [ ]
+		now = wheel.time()
+		def callback(count):
+			fired.append(count)
+			if count < 3:
+				wheel.call_at(now + 10 * (count + 1), callback, count + 1)
+		wheel.call_at(now + 1, callback, 0)
+		wheel.expire(now + 100)
+		self.assertEqual(fired, [ 0, 1, 2, 3 ])
+
+	async def test_random(self):
+		wheel = TimerWheel(resolution = 1, slot_bits = 3, levels = 3)
+		rng = random.Random(1)
+		now = wheel.time()
+		fired = [ ]
+		deadlines = [ ]
+		for i in range(2000):
+			deadline = now + rng.choice([ 10, 100, 1000, 10000 ]) * rng.random()
+			deadlines.append(deadline)
+			wheel.call_at(deadline, lambda deadline: fired.append((deadline, current)), deadline)
+		current = now
+		while len(wheel) > 0:
+			current += rng.random() * 50
+			wheel.expire(current)
+		self.assertEqual(sorted(deadline for (deadline, when) in fired), sorted(deadlines))
+		for (deadline, when) in fired:
+			self.assertLessEqual(deadline, when)
+			self.assertLess(when - deadline, 51)
+
+	async def test_sleep(self):
+		wheel = TimerWheel(resolution = 0.01)
+		before = wheel.time()
+		await wheel.sleep(0.05)
+		self.assertGreaterEqual(wheel.time() - before, 0.05)
+		self.assertEqual(len(wheel), 0)
+
+	async def test_wait_for(self):
+		wheel = TimerWheel(resolution = 0.01)
+		future = asyncio.get_running_loop().create_future()
+		with self.assertRaises(asyncio.exceptions.TimeoutError):
+			await wheel.wait_for(future, timeout = 0.02)
+		self.assertTrue(future.cancelled())
+
+		future = asyncio.get_running_loop().create_future()
+		asyncio.get_running_loop().call_soon(future.set_result, 123)
+		self.assertEqual(await wheel.wait_for(future, timeout = 10), 123)
+		self.assertEqual(len(wheel), 0)
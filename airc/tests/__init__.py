@@ -26,3 +26,19 @@ from .IRCMessageHandlerTests import IRCMessageHandlerTests
 from .DCCRequestTests import DCCRequestTests
 from .AnonymousIdentityGeneratorTests import AnonymousIdentityGeneratorTests
 from .TextToolTests import TextToolTests
+from .OriginTests import OriginTests
+from .IRCProtocolTests import IRCProtocolTests
+from .IRCConnectionTests import IRCConnectionTests
+from .PendingResponsesTests import PendingResponsesTests
+from .OutboundQueueTests import OutboundQueueTests
+from .CommandDispatcherTests import CommandDispatcherTests
+from .NameToolsTests import NameToolsTests
+from .IRCBatchTests import IRCBatchTests
+from .ISupportTests import ISupportTests
+from .MembershipStoreTests import MembershipStoreTests
+from .TimerWheelTests import TimerWheelTests
+from .JoinSchedulerTests import JoinSchedulerTests
+from .IRCNetworkTests import IRCNetworkTests
+from .ReconnectSchedulerTests import ReconnectSchedulerTests
+from .IRCNetworkSupervisorTests import IRCNetworkSupervisorTests
+from .DNSCacheTests import DNSCacheTests
@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2016-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import sys
+import time
+import asyncio
+import logging
+import resource
+import tracemalloc
+import multiprocessing
+from FriendlyArgumentParser import FriendlyArgumentParser
+import airc
+
+class IdleIRCServer():
+	"""Minimal IRC server that registers every client and then keeps quiet.
+	Runs in a separate process so that it is not accounted to the clients."""
+
+	def __init__(self, port: int):
+		self._port = port
+
+	async def _handle(self, reader, writer):
+		nickname = "*"
+		while True:
+			line = await reader.readline()
+			if len(line) == 0:
+				break
+			words = line.decode("utf-8", errors = "replace").rstrip("\r\n").split(" ")
+			command = words[0].upper()
+			if (command == "CAP") and (len(words) > 1) and (words[1].upper() == "LS"):
+				writer.write(b":srv CAP * LS :\r\n")
+			elif (command == "NICK") and (len(words) > 1):
+				nickname = words[1]
+			elif command == "USER":
+				writer.write(f":srv 001 {nickname} :Welcome\r\n:srv 376 {nickname} :End of MOTD\r\n".encode())
+			elif command == "PING":
+				writer.write(f":srv PONG srv :{' '.join(words[1:])}\r\n".encode())
+		writer.close()
+
+	async def _serve(self, ready):
+		server = await asyncio.start_server(self._handle, "127.0.0.1", self._port, backlog = 4096)
+		ready.set()
+		async with server:
+			await server.serve_forever()
+
+	def run(self, ready):
+		asyncio.run(self._serve(ready))
+
+class NetworkBenchmark():
+	def __init__(self, args):
+		self._args = args
+
+	@staticmethod
+	def _rss_bytes():
+		try:
+			with open("/proc/self/status") as f:
+				for line in f:
+					if line.startswith("VmRSS:"):
+						return int(line.split()[1]) * 1024
+		except FileNotFoundError:
+			pass
+		return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+	async def _run(self):
+		supervisor = airc.IRCNetworkSupervisor()
+		for i in range(self._args.networks):
+			config = airc.client.ClientConfiguration()
+			config.selective_parsing = self._args.selective_parsing
+			identities = airc.ListIRCIdentityGenerator([ airc.IRCIdentity(nickname = f"bot{i}") ])
+			supervisor.create_network(irc_client_class = airc.client.BasicIRCClient, irc_servers = [ airc.IRCServer("127.0.0.1", self._args.port) ], identity_generator = identities, client_configuration = config, identifier = f"net{i}")
+
+		rss_before = self._rss_bytes()
+		if self._args.tracemalloc:
+			tracemalloc.start()
+		t0 = time.monotonic()
+		supervisor.start()
+		await asyncio.wait_for(supervisor.all_connected(), timeout = self._args.connect_timeout)
+		connect_time = time.monotonic() - t0
+		await asyncio.sleep(1)
+		rss_after = self._rss_bytes()
+		if self._args.tracemalloc:
+			(heap_size, heap_peak) = tracemalloc.get_traced_memory()
+			tracemalloc.stop()
+
+		cpu_before = time.process_time()
+		t0 = time.monotonic()
+		await asyncio.sleep(self._args.idle_secs)
+		idle_wall = time.monotonic() - t0
+		idle_cpu = time.process_time() - cpu_before
+
+		count = self._args.networks
+		health = supervisor.get_health()
+		print(f"{count} networks registered in {connect_time:.2f} sec ({health['connected']} connected)")
+		print(f"Memory:   {(rss_after - rss_before) / 1024 / 1024:.1f} MiB RSS total, {(rss_after - rss_before) / count / 1024:.1f} KiB RSS per connection")
+		if self._args.tracemalloc:
+			print(f"          {heap_size / count / 1024:.1f} KiB Python heap per connection")
+		print(f"Idle CPU: {idle_cpu * 1000:.1f} ms over {idle_wall:.1f} sec, {idle_cpu / idle_wall / count * 1e6:.2f} µs/sec per connection ({100 * idle_cpu / idle_wall:.2f}% of one core)")
+		print(f"Timers:   {supervisor.timer_wheel.get_status()}")
+		supervisor.stop()
+		await asyncio.sleep(0.5)
+
+	def run(self):
+		ready = multiprocessing.Event()
+		server = multiprocessing.Process(target = IdleIRCServer(self._args.port).run, args = (ready, ), daemon = True)
+		server.start()
+		try:
+			if not ready.wait(timeout = 10):
+				raise TimeoutError("Benchmark IRC server did not come up.")
+			asyncio.run(self._run())
+		finally:
+			server.terminate()
+			server.join()
+
+parser = FriendlyArgumentParser(description = "Benchmark memory and CPU usage of many idle IRC networks run by a single supervisor against a local server.")
+parser.add_argument("-n", "--networks", metavar = "count", type = int, default = 1000, help = "Number of networks (i.e., connections) to run. Defaults to %(default)d.")
+parser.add_argument("-i", "--idle-secs", metavar = "secs", type = float, default = 10, help = "Time to measure CPU usage of the idle connections for. Defaults to %(default).0f seconds.")
+parser.add_argument("-p", "--port", metavar = "port", type = int, default = 16667, help = "Local port the benchmark IRC server listens on. Defaults to %(default)d.")
+parser.add_argument("-t", "--connect-timeout", metavar = "secs", type = float, default = 120, help = "Time after which the benchmark is aborted if not all networks are registered. Defaults to %(default).0f seconds.")
+parser.add_argument("-s", "--selective-parsing", action = "store_true", help = "Enable selective parsing for all clients.")
+parser.add_argument("-m", "--tracemalloc", action = "store_true", help = "Additionally trace Python heap allocations during connection setup (slows down setup).")
+args = parser.parse_args(sys.argv[1:])
+
+logging.basicConfig(level = logging.ERROR)
+NetworkBenchmark(args).run()
@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+#	airc - Python asynchronous IRC client library with DCC support
+#	Copyright (C) 2016-2022 Johannes Bauer
+#
+#	This file is part of airc.
+#
+#	airc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	airc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with airc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import sys
+import time
+import random
+from FriendlyArgumentParser import FriendlyArgumentParser
+from airc.IRCMessageHandler import IRCMessageHandler, IRCMessage
+from airc.OriginCache import OriginCache
+from airc.ReplyCode import ReplyCode
+from airc.Origin import Origin
+from airc.Exceptions import InvalidOriginException
+
+class LegacyIRCMessage():
+	def __init__(self, tags, origin, cmdcode, params):
+		self.tags = tags
+		self.origin = origin
+		self.cmdcode = cmdcode
+		self.params = params
+
+	def get_tag(self, key, default_value = None):
+		return self.tags.get(key, default_value)
+
+class LegacyIRCMessageHandler():
+	"""Eager parser as it was used before the offset-based lazy parser was
+	introduced; kept here as the baseline for comparison. IRCv3 tags are
+	decoded eagerly as well so that tagged traffic can be compared."""
+
+	def __init__(self, codec: str = "utf-8"):
+		self._codec = codec
+
+	def parse(self, text):
+		msg = text.decode(self._codec, errors = "replace").rstrip("\r\n")
+		tags = { }
+		if msg.startswith("@"):
+			(tags_text, msg) = msg.split(" ", maxsplit = 1)
+			for tag in tags_text[1:].split(";"):
+				(key, _, value) = tag.partition("=")
+				tags[key] = IRCMessage._unescape_tag_value(value)
+
+		if msg.startswith(":"):
+			(origin_text, msg) = msg.split(" ", maxsplit = 1)
+			try:
+				origin = Origin.parse(origin_text)
+			except InvalidOriginException:
+				origin = Origin(hostname = origin_text, nickname = None, username = None)
+		else:
+			origin = None
+
+		(cmdcode, params) = msg.split(" ", maxsplit = 1)
+		if (len(cmdcode) == 3) and (cmdcode.isdigit()):
+			cmdcode = int(cmdcode)
+			try:
+				cmdcode = ReplyCode(cmdcode)
+			except ValueError:
+				pass
+
+		if params.startswith(":"):
+			params = [ params[1:] ]
+		elif " :" in params:
+			(pre, post) = params.split(" :", maxsplit = 1)
+			params = pre.split(" ") + [ post ]
+		else:
+			params = params.split(" ")
+		return LegacyIRCMessage(tags = tags, origin = origin, cmdcode = cmdcode, params = params)
+
+class ParserBenchmark():
+	def __init__(self, args):
+		self._args = args
+		self._lines = self._generate_corpus()
+
+	def _generate_corpus(self):
+		rng = random.Random(self._args.seed)
+		nicknames = [ f"user{i}" for i in range(300) ]
+		templates = [
+			lambda nick: f":{nick}!~{nick}@host-{len(nick)}.example.com PRIVMSG #channel :hello there, this is a fairly typical chat line",
+			lambda nick: f":{nick}!~{nick}@host-{len(nick)}.example.com JOIN #channel",
+			lambda nick: f":{nick}!~{nick}@host-{len(nick)}.example.com QUIT :Ping timeout: 240 seconds",
+			lambda nick: f":{nick}!~{nick}@host-{len(nick)}.example.com NOTICE ourself :\x01VERSION HexChat 2.16.0\x01",
+			lambda nick: f":irc.example.com 353 ourself = #channel :@{nick} +{nick}_ {nick}__ {nick}___",
+			lambda nick: f":irc.example.com 372 ourself :- message of the day line for {nick}",
+			lambda nick: f":irc.example.com 399 ourself {nick} :vendor specific numeric",
+			lambda nick: "PING :irc.example.com",
+		]
+		lines = [ ]
+		for msgid in range(self._args.lines):
+			line = rng.choice(templates)(rng.choice(nicknames))
+			if self._args.tags:
+				tags = f"@time=2022-05-{rng.randint(1, 28):02d}T12:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}.{rng.randint(0, 999):03d}Z;msgid=Xk{msgid:08x}\\sAb\\:z"
+				if rng.random() < 0.3:
+					tags += f";batch=b{rng.randint(0, 9)};account={rng.choice(nicknames)}"
+				line = tags + " " + line
+			lines.append((line + "\r\n").encode("utf-8"))
+		return lines
+
+	def _access_none(self, msg):
+		pass
+
+	def _access_cmdcode(self, msg):
+		msg.cmdcode
+
+	def _access_nickname(self, msg):
+		(msg.cmdcode, msg.origin is not None and msg.origin.nickname)
+
+	def _access_time(self, msg):
+		(msg.cmdcode, msg.get_tag("time"))
+
+	def _access_all(self, msg):
+		(msg.origin, msg.cmdcode, msg.params)
+
+	def _measure(self, parser, access):
+		best = None
+		for _ in range(self._args.rounds):
+			t0 = time.perf_counter()
+			for line in self._lines:
+				access(parser.parse(line))
+			tdiff = time.perf_counter() - t0
+			if (best is None) or (tdiff < best):
+				best = tdiff
+		return len(self._lines) / best
+
+	def run(self):
+		parsers = [
+			("legacy", lambda: LegacyIRCMessageHandler()),
+			("lazy", lambda: IRCMessageHandler()),
+			("cached", lambda: IRCMessageHandler(origin_cache = OriginCache(maxsize = self._args.origin_cache_size))),
+		]
+		accesses = [
+			("parse only", self._access_none),
+			("cmdcode", self._access_cmdcode),
+			("nickname", self._access_nickname),
+			("all fields", self._access_all),
+		]
+		if self._args.tags:
+			accesses.insert(3, ("server-time", self._access_time))
+		print(f"{len(self._lines)} {'tagged ' if self._args.tags else ''}lines, best of {self._args.rounds} rounds")
+		for (access_name, access) in accesses:
+			results = { parser_name: self._measure(parser_factory(), access) for (parser_name, parser_factory) in parsers }
+			result_strs = [ f"{parser_name} {results[parser_name] / 1e3:7.1f} k lines/sec ({results[parser_name] / results['legacy']:.2f}x)" for (parser_name, parser_factory) in parsers ]
+			print(f"{access_name:<12s} " + "   ".join(result_strs))
+
+parser = FriendlyArgumentParser(description = "Benchmark throughput of the IRC message parser against the legacy eager parser.")
+parser.add_argument("-l", "--lines", metavar = "count", type = int, default = 100000, help = "Number of lines in the generated corpus. Defaults to %(default)d.")
+parser.add_argument("-r", "--rounds", metavar = "count", type = int, default = 5, help = "Number of rounds to run, the best one is reported. Defaults to %(default)d.")
+parser.add_argument("-c", "--origin-cache-size", metavar = "entries", type = int, default = 1024, help = "Size of the origin cache for the cached parser. Defaults to %(default)d.")
+parser.add_argument("-t", "--tags", action = "store_true", help = "Prefix every line with IRCv3 message tags (time, msgid and occasionally batch and account) as modern networks do.")
+parser.add_argument("-s", "--seed", metavar = "seed", type = int, default = 0, help = "Seed for corpus generation. Defaults to %(default)d.")
+args = parser.parse_args(sys.argv[1:])
+
+ParserBenchmark(args).run()
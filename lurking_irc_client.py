@@ -105,10 +105,18 @@ class SimpleIRCClient():
 
 		async def query_users():
 			queried_users = set()
+			client = None
+			channel_versions = { }
 			while True:
 				if network.client is not None:
-					for chan in list(network.client.channels):
-						new_users = set(chan.users) - queried_users
+					if network.client is not client:
+						# Versions are only meaningful per client (i.e., per
+						# connection), start from scratch after a reconnect.
+						client = network.client
+						channel_versions = { }
+					for chan in list(client.channels):
+						(channel_versions[chan.name], new_users) = chan.users_added_since(channel_versions.get(chan.name, 0))
+						new_users -= queried_users
 						queried_users |= new_users
 						new_users = list(new_users)
 						random.shuffle(new_users)